@@ -7,6 +7,7 @@ import MessagingPanel from "./messaging-panel"
 import AdminPanel from "./admin-panel"
 import "./dashboard.css"
 import { API_BASE_URL } from "@/config/api"
+import { clearSecureSession } from "@/utils/encryption"
 
 interface DashboardProps {
   session: Session
@@ -31,6 +32,7 @@ export default function Dashboard({ session, onLogout }: DashboardProps) {
     } catch (error) {
       console.error("Logout error:", error)
     } finally {
+      clearSecureSession()
       onLogout()
     }
   }
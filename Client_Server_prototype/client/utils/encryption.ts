@@ -90,45 +90,77 @@ async function decryptPayload(
   return JSON.parse(decryptedText);
 };
 
+// Session key agreed at /login; later requests skip the RSA key wrap
+let activeSession: { id: string; key: CryptoKey } | null = null;
+
+export const clearSecureSession = () => {
+  activeSession = null;
+};
+
+async function postEnvelope(endpoint: string, requestBody: object): Promise<Response> {
+  return fetch(`${API_BASE_URL}${endpoint}`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(requestBody),
+  });
+}
+
 /**
  * Performs a full end-to-end encrypted fetch request.
+ * After a successful /login the same AES key is reused by session id,
+ * so only the login pays for RSA-OAEP.
  */
 export const secureFetch = async (endpoint: string, payload: object): Promise<any> => {
-  const publicKey = await getPublicKey();
-  
-  const symmetricKey = await crypto.subtle.generateKey(
-    { name: "AES-GCM", length: 256 },
-    true,
-    ["encrypt", "decrypt"]
-  );
-
   const iv = crypto.getRandomValues(new Uint8Array(12));
   const encodedPayload = new TextEncoder().encode(JSON.stringify(payload));
-  const ciphertextBuffer = await crypto.subtle.encrypt({ name: "AES-GCM", iv }, symmetricKey, encodedPayload);
 
-  const wrappedKeyBuffer = await crypto.subtle.wrapKey("raw", symmetricKey, publicKey, "RSA-OAEP");
-
-  const requestBody = {
-    encrypted_key: btoa(String.fromCharCode(...new Uint8Array(wrappedKeyBuffer))),
-    nonce: btoa(String.fromCharCode(...new Uint8Array(iv))),
-    ciphertext: btoa(String.fromCharCode(...new Uint8Array(ciphertextBuffer))),
-  };
-
-  const response = await fetch(`${API_BASE_URL}${endpoint}`, {
-    method: "POST",
-    headers: { "Content-Type": "application/json" },
-    body: JSON.stringify(requestBody),
-  });
+  let symmetricKey: CryptoKey;
+  let requestBody: object;
+  const session = endpoint === "/login" ? null : activeSession;
+
+  if (session) {
+    symmetricKey = session.key;
+    const ciphertextBuffer = await crypto.subtle.encrypt({ name: "AES-GCM", iv }, symmetricKey, encodedPayload);
+    requestBody = {
+      session_id: session.id,
+      nonce: btoa(String.fromCharCode(...iv)),
+      ciphertext: btoa(String.fromCharCode(...new Uint8Array(ciphertextBuffer))),
+    };
+  } else {
+    const publicKey = await getPublicKey();
+    symmetricKey = await crypto.subtle.generateKey(
+      { name: "AES-GCM", length: 256 },
+      true,
+      ["encrypt", "decrypt"]
+    );
+    const ciphertextBuffer = await crypto.subtle.encrypt({ name: "AES-GCM", iv }, symmetricKey, encodedPayload);
+    const wrappedKeyBuffer = await crypto.subtle.wrapKey("raw", symmetricKey, publicKey, "RSA-OAEP");
+    requestBody = {
+      encrypted_key: btoa(String.fromCharCode(...new Uint8Array(wrappedKeyBuffer))),
+      nonce: btoa(String.fromCharCode(...iv)),
+      ciphertext: btoa(String.fromCharCode(...new Uint8Array(ciphertextBuffer))),
+    };
+  }
 
+  const response = await postEnvelope(endpoint, requestBody);
   const responseData = await response.json();
 
   if (!response.ok) {
+    // an expired or unknown session falls back to a fresh RSA-wrapped key once
+    if (session && response.status === 401 && responseData.detail !== "Invalid credentials.") {
+      clearSecureSession();
+      return secureFetch(endpoint, payload);
+    }
     return responseData;
   }
 
+  if (endpoint === "/login" && responseData.session_id) {
+    activeSession = { id: responseData.session_id, key: symmetricKey };
+  }
+
   if (responseData.ciphertext && responseData.nonce) {
     return await decryptPayload(responseData, symmetricKey);
   }
 
   return responseData;
-};
\ No newline at end of file
+};
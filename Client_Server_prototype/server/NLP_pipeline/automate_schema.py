@@ -1,4 +1,5 @@
 import mysql.connector
+import hashlib
 import json
 import os
 
@@ -13,58 +14,85 @@ TARGET_DATABASES = [
     "stars_db"
 ]
 
-def generate_schema_json_from_selected_dbs(
-    host="localhost",
-    user="root",
-    password="root",
-    output_path="plugin_schema.json",
-    individual_dir="db_schemas"
-):
-    # Create output directory for individual DB schemas
-    os.makedirs(individual_dir, exist_ok=True)
-
+def fetch_schema(host="localhost", user="root", password="root"):
+    """
+    Read every table and column of TARGET_DATABASES with one
+    information_schema.COLUMNS query instead of USE/SHOW TABLES/DESCRIBE per table.
+    """
     conn = mysql.connector.connect(host=host, user=user, password=password)
-    cursor = conn.cursor()
+    try:
+        cursor = conn.cursor()
+        placeholders = ", ".join(["%s"] * len(TARGET_DATABASES))
+        cursor.execute(
+            "SELECT TABLE_SCHEMA, TABLE_NAME, COLUMN_NAME FROM information_schema.COLUMNS "
+            f"WHERE TABLE_SCHEMA IN ({placeholders}) "
+            "ORDER BY TABLE_SCHEMA, TABLE_NAME, ORDINAL_POSITION",
+            TARGET_DATABASES
+        )
+        rows = cursor.fetchall()
+        cursor.close()
+    finally:
+        conn.close()
 
-    schema_json = {"databases": []}
+    tables_by_db = {}
+    for db, tbl, col in rows:
+        tables_by_db.setdefault(db, {}).setdefault(tbl, []).append(col)
 
+    schema_json = {"databases": []}
     for db in TARGET_DATABASES:
-        try:
-            cursor.execute(f"USE `{db}`;")
-            cursor.execute("SHOW TABLES;")
-            tables = [tbl[0] for tbl in cursor.fetchall()]
-
-            db_entry = {"name": db, "tables": []}
-
-            for tbl in tables:
-                cursor.execute(f"DESCRIBE `{tbl}`;")
-                columns = [col[0] for col in cursor.fetchall()]
+        if db not in tables_by_db:
+            print(f"Skipping {db}: not found on server")
+            continue
+        schema_json["databases"].append({
+            "name": db,
+            "tables": [{"name": tbl, "columns": cols} for tbl, cols in tables_by_db[db].items()]
+        })
+    return schema_json
 
-                db_entry["tables"].append({
-                    "name": tbl,
-                    "columns": columns
-                })
+def schema_fingerprint(schema_json):
+    return hashlib.sha256(json.dumps(schema_json, sort_keys=True).encode()).hexdigest()
 
-            # Add to combined plugin_schema.json
-            schema_json["databases"].append(db_entry)
+def _cached_fingerprint(output_path):
+    try:
+        with open(output_path, "r") as f:
+            return schema_fingerprint(json.load(f))
+    except (OSError, ValueError):
+        return None
 
-            # Write individual db_name.json
-            individual_path = os.path.join(individual_dir, f"{db}.json")
-            with open(individual_path, "w") as f:
-                json.dump(db_entry, f, indent=2)
-            print(f"Saved: {individual_path}")
+def _write_json(path, data):
+    # write-then-rename so readers never see a half-written schema file
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
 
-        except mysql.connector.Error as e:
-            print(f"Skipping {db} due to error: {e}")
-            continue
+def generate_schema_json_from_selected_dbs(
+    host="localhost",
+    user="root",
+    password="root",
+    output_path="plugin_schema.json",
+    individual_dir="db_schemas"
+):
+    """
+    Refresh plugin_schema.json and db_schemas/*.json from the live server.
+    Returns True when the schema changed and the files were rewritten,
+    False when the cached JSON already matched.
+    """
+    schema_json = fetch_schema(host, user, password)
 
-    cursor.close()
-    conn.close()
+    if schema_fingerprint(schema_json) == _cached_fingerprint(output_path):
+        print(f"Schema unchanged; keeping {output_path}")
+        return False
 
-    with open(output_path, "w") as f:
-        json.dump(schema_json, f, indent=2)
+    os.makedirs(individual_dir, exist_ok=True)
+    for db_entry in schema_json["databases"]:
+        individual_path = os.path.join(individual_dir, f"{db_entry['name']}.json")
+        _write_json(individual_path, db_entry)
+        print(f"Saved: {individual_path}")
 
+    _write_json(output_path, schema_json)
     print(f"Combined schema saved to: {output_path}")
+    return True
 
 if __name__ == "__main__":
     generate_schema_json_from_selected_dbs()
@@ -0,0 +1,188 @@
+import os
+import re
+import json
+import math
+
+INTENT_MODEL_PATH = os.path.join(os.path.dirname(__file__), "json", "intent_model.json")
+# the classifier only sees questions with no pattern or schema match, which are often chat;
+# these classes let it say so (query_pipeline treats them as general chat) instead of guessing SQL
+CHAT_EXAMPLES_PATH = os.path.join(os.path.dirname(__file__), "json", "chat_examples.json")
+# below this confidence the classifier defers to the LLM
+INTENT_CONFIDENCE_THRESHOLD = float(os.environ.get("CONVERSQL_INTENT_CONFIDENCE", "0.8"))
+SMOOTHING_ALPHA = 0.5
+
+WORD_PATTERN = re.compile(r"[a-z_]+|\d+")
+
+# generated SQL -> the intent that produced it, for labelling query_log.txt
+SQL_INTENT_PATTERNS = [
+    (re.compile(r"^\s*DROP\s+DATABASE", re.I), "DROP_DATABASE"),
+    (re.compile(r"^\s*DROP\s+TABLE", re.I), "DROP_TABLE"),
+    (re.compile(r"^\s*TRUNCATE", re.I), "TRUNCATE_TABLE"),
+    (re.compile(r"^\s*INSERT", re.I), "INSERT_ROWS"),
+    (re.compile(r"^\s*UPDATE", re.I), "UPDATE_ROWS"),
+    (re.compile(r"^\s*DELETE", re.I), "DELETE_ROWS"),
+    (re.compile(r"^\s*SELECT\s+COUNT\(", re.I), "COUNT_ROWS"),
+    (re.compile(r"^\s*SELECT\s+AVG\(", re.I), "AGGREGATE_AVG"),
+    (re.compile(r"^\s*SELECT\s+SUM\(", re.I), "AGGREGATE_SUM"),
+    (re.compile(r"^\s*SELECT\s+MIN\(", re.I), "AGGREGATE_MIN"),
+    (re.compile(r"^\s*SELECT\s+MAX\(", re.I), "AGGREGATE_MAX"),
+    (re.compile(r"\bORDER\s+BY\b", re.I), "ORDER_BY"),
+    (re.compile(r"^\s*SHOW\s+TABLES", re.I), "DESCRIPTION"),
+    (re.compile(r"^\s*SELECT", re.I), "SELECT_ROWS"),
+]
+
+def features(text: str) -> list:
+    """Unigrams and bigrams of the lower-cased words, with numbers collapsed to <num>"""
+    words = ["<num>" if w.isdigit() else w for w in WORD_PATTERN.findall(text.lower())]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+def text_key(text: str) -> str:
+    """The words of a text as features() reads them, so "Thanks a lot!" and "thanks a lot" share a key"""
+    return " ".join(f for f in features(text) if " " not in f)
+
+class IntentClassifier:
+    """
+    Multinomial naive Bayes over word n-grams. The artifact stores raw
+    counts; log-probabilities are derived once at load so predict() is a
+    handful of dict lookups per intent. It is trained on whole questions, so
+    it must be given the question text, not stopword-stripped lemmas.
+    Questions seen in training with a single label ("hi", "thanks") are
+    answered from that label: one or two words are too little evidence for
+    the n-gram model to be confident.
+    """
+    def __init__(self, counts: dict, doc_counts: dict, alpha: float = SMOOTHING_ALPHA, exact: dict = None):
+        self.counts = counts            # intent -> {feature: count}
+        self.doc_counts = doc_counts    # intent -> training examples
+        self.alpha = alpha
+        self.exact = exact or {}        # text_key -> intent, for unambiguous training questions
+        vocab = {f for feature_counts in counts.values() for f in feature_counts}
+        total_docs = sum(doc_counts.values())
+        self._priors = {i: math.log(n / total_docs) for i, n in doc_counts.items()}
+        self._log_probs = {}
+        self._unseen = {}
+        for intent, feature_counts in counts.items():
+            denominator = sum(feature_counts.values()) + alpha * (len(vocab) + 1)
+            self._log_probs[intent] = {f: math.log((c + alpha) / denominator) for f, c in feature_counts.items()}
+            self._unseen[intent] = math.log(alpha / denominator)
+        self._vocab = vocab
+
+    @classmethod
+    def train(cls, examples, alpha: float = SMOOTHING_ALPHA):
+        """examples: iterable of (text, intent)"""
+        counts, doc_counts, labels = {}, {}, {}
+        for text, intent in examples:
+            doc_counts[intent] = doc_counts.get(intent, 0) + 1
+            feature_counts = counts.setdefault(intent, {})
+            for f in features(text):
+                feature_counts[f] = feature_counts.get(f, 0) + 1
+            labels.setdefault(text_key(text), set()).add(intent)
+        exact = {key: intents.pop() for key, intents in labels.items() if key and len(intents) == 1}
+        return cls(counts, doc_counts, alpha, exact)
+
+    def predict(self, text: str):
+        """
+        (intent, confidence) or (None, 0.0) when the text has no known words.
+        Confidence is the posterior scaled by the share of words seen in
+        training, so a question made mostly of unknown words is never confident.
+        """
+        exact = self.exact.get(text_key(text))
+        if exact is not None:
+            return exact, 1.0
+        all_features = features(text)
+        known = [f for f in all_features if f in self._vocab]
+        if not known:
+            return None, 0.0
+        words = [f for f in all_features if " " not in f]
+        coverage = sum(1 for w in words if w in self._vocab) / len(words)
+        scores = {}
+        for intent, log_probs in self._log_probs.items():
+            unseen = self._unseen[intent]
+            scores[intent] = self._priors[intent] + sum(log_probs.get(f, unseen) for f in known)
+        best = max(scores, key=scores.get)
+        # softmax over the log scores gives the posterior of the best intent
+        normaliser = sum(math.exp(s - scores[best]) for s in scores.values())
+        return best, coverage / normaliser
+
+    def save(self, path: str = INTENT_MODEL_PATH):
+        data = {"version": 2, "alpha": self.alpha, "doc_counts": self.doc_counts, "counts": self.counts, "exact": self.exact}
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, separators=(",", ":"), sort_keys=True)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str = INTENT_MODEL_PATH):
+        """The trained classifier, or None when no artifact has been built"""
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        return cls(data["counts"], data["doc_counts"], data.get("alpha", SMOOTHING_ALPHA), data.get("exact"))
+
+def _phrase_examples(intent_file):
+    """intent.json phrases; regex phrases like 'first \\d+' get a sample number"""
+    with open(intent_file, "r") as f:
+        patterns_dict = json.load(f)
+    for intent, phrases in patterns_dict.items():
+        for phrase in phrases:
+            yield phrase.replace("\\d+", "10"), intent
+
+def _test_query_examples():
+    from Query_Builder.test_queries import ALL_TEST_QUERIES
+    for queries in ALL_TEST_QUERIES.values():
+        for query in queries:
+            yield query["description"], query["intent"][0]
+
+def _query_log_examples(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) < 7 or not fields[5].strip():
+                continue
+            sql = fields[6].replace("[QUERY_BUILDER] ", "").replace("[RESPONSE_CACHE] ", "")
+            for pattern, intent in SQL_INTENT_PATTERNS:
+                if pattern.search(sql):
+                    yield fields[5].strip(), intent
+                    break
+
+def _chat_examples(path):
+    with open(path, "r") as f:
+        for intent, texts in json.load(f).items():
+            for text in texts:
+                yield text, intent
+
+def training_examples(intent_file, query_log, chat_file=CHAT_EXAMPLES_PATH):
+    """Labelled examples restricted to the intents intent.json defines, plus the chat classes"""
+    with open(intent_file, "r") as f:
+        known_intents = set(json.load(f))
+    chat = list(_chat_examples(chat_file))
+    known_intents.update(intent for _, intent in chat)
+    examples = list(_phrase_examples(intent_file)) + list(_test_query_examples()) + list(_query_log_examples(query_log)) + chat
+    return [(text, intent) for text, intent in examples if intent in known_intents]
+
+if __name__ == "__main__":
+    # Retrain the shipped artifact: python -m NLP_pipeline.intent_classifier (from the server directory).
+    # Accuracy is measured on every 5th example held out of a separate model; exact
+    # lookups would make the shipped model's accuracy on its own examples meaningless.
+    import time
+
+    intent_file = os.path.join(os.path.dirname(__file__), "json", "intent.json")
+    examples = training_examples(intent_file, "Query_Builder/query_log.txt")
+    held_out = examples[::5]
+    trial = IntentClassifier.train([e for i, e in enumerate(examples) if i % 5])
+    predictions = [(trial.predict(text), intent) for text, intent in held_out]
+    confident = [(predicted, intent) for (predicted, confidence), intent in predictions if confidence >= INTENT_CONFIDENCE_THRESHOLD]
+    print(f"Held out {len(held_out)} of {len(examples)} examples: accuracy "
+          f"{sum(1 for (predicted, _), intent in predictions if predicted == intent) / len(held_out):.3f}")
+    print(f"Above threshold {INTENT_CONFIDENCE_THRESHOLD}: {len(confident)} held-out examples, accuracy "
+          f"{sum(1 for predicted, intent in confident if predicted == intent) / max(1, len(confident)):.3f}")
+
+    classifier = IntentClassifier.train(examples)
+    classifier.save()
+    started = time.perf_counter()
+    for text, _ in examples:
+        classifier.predict(text)
+    per_call_us = (time.perf_counter() - started) / len(examples) * 1e6
+    print(f"Trained on {len(examples)} examples, {len(classifier._vocab)} features -> {INTENT_MODEL_PATH}")
+    print(f"Mean predict time: {per_call_us:.1f}us")
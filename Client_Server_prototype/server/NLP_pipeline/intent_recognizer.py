@@ -1,36 +1,38 @@
 import os
 import json
-import re
-import httpx
 import asyncio
-from typing import List, Tuple
+from typing import List, Tuple, Optional
+from common.llm_gateway import LLMGateway, LLMUnavailable
+from NLP_pipeline.intent_classifier import IntentClassifier, INTENT_CONFIDENCE_THRESHOLD
+from NLP_pipeline.lexicon_matcher import LexiconMatcher, get_lexicon, add_intent_lexicon, INTENT_FILE, INTENT_LEXICON
+
+AI_INTENT_DEADLINE_SECONDS = 5.0
 
 class IntentRecognizer:
-    def __init__(self, json_file: str = None, use_ai_fallback: bool = True):
+    def __init__(self, json_file: str = None, use_ai_fallback: bool = True, llm=None):
         if json_file is None:
-            base_dir = os.path.dirname(__file__)
-            json_file = os.path.join(base_dir, "json", "intent.json")
+            json_file = INTENT_FILE
         
         with open(json_file, "r") as f:
             patterns_dict = json.load(f)
         
-        self.patterns = []
-        for intent, phrases in patterns_dict.items():
-            for phrase in phrases:
-                pattern = re.compile(rf"\b({phrase})\b", re.IGNORECASE)
-                self.patterns.append((pattern, intent))
+        # every intent phrase is found in one automaton scan; the default lexicon is shared with the operator recognizer
+        if os.path.abspath(json_file) == os.path.abspath(INTENT_FILE):
+            self.lexicon = get_lexicon()
+        else:
+            self.lexicon = LexiconMatcher()
+            add_intent_lexicon(self.lexicon, patterns_dict)
+            self.lexicon.build()
         
         self.use_ai_fallback = use_ai_fallback
         self.available_intents = list(patterns_dict.keys())
-        
-        # Initialize Ollama client for AI fallback
-        if use_ai_fallback:
-            self.ollama_client = httpx.AsyncClient(timeout=10.0)
-        else:
-            self.ollama_client = None
-        
-        # Track AI usage to enforce single call per query
-        self.ai_used_for_current_query = False
+
+        # shared LLMGateway for the AI fallback; set by the server, None disables it
+        self.llm = llm
+        # local classifier consulted before the LLM (NLP_pipeline/json/intent_model.json)
+        self.classifier = IntentClassifier.load()
+        self.classifier_hits = 0
+        self.classifier_deferrals = 0
 
     def has_schema_entities(self, entities: List[dict]) -> bool:
         """
@@ -44,71 +46,126 @@ class IntentRecognizer:
         ]
         return len(meaningful_entities) > 0
 
-    def predict_from_tokens(self, tokens: List[str], entities: List[dict] = None) -> Tuple[List[str], bool]:
+    def match_from_tokens(self, tokens: List[str], entities: List[dict] = None) -> Optional[List[str]]:
         """
-        Predict intent from tokens using pattern matching first,
-        then AI fallback only if no schema entities detected
-        
-        Returns: (intents, ai_was_used)
+        Intents found by pattern matching, SELECT_ROWS when only schema entities
+        were found, or None when nothing matched and only the AI could tell
         """
         text = " ".join(tokens).lower()
-        found_intents = set()
-        ai_was_used = False
-        
-        # Reset AI usage tracker for new query
-        self.ai_used_for_current_query = False
-        
-        # First, try pattern matching
-        for regex, intent in self.patterns:
-            if regex.search(text):
-                found_intents.add(intent)
-        
-        # If patterns found intents, return them
+        found_intents = {intent for _, intent, _, _, _ in self.lexicon.find(text, INTENT_LEXICON)}
+
         if found_intents:
             print(f"[DEBUG] Intent found via patterns: {sorted(found_intents)}")
-            return sorted(found_intents), ai_was_used
-        
+            return sorted(found_intents)
+
         # Check if we have schema entities - if yes, don't use AI fallback
         if entities and self.has_schema_entities(entities):
             print(f"[DEBUG] Schema entities detected, skipping AI fallback. Using SELECT_ROWS.")
-            return ["SELECT_ROWS"], ai_was_used
-        
-        # Only use AI fallback if:
-        # 1. AI fallback is enabled
-        # 2. No schema entities detected (likely general chat)
-        # 3. AI hasn't been used for this query yet
-        if (self.use_ai_fallback and 
-            self.ollama_client and 
-            not self.ai_used_for_current_query):
-            
+            return ["SELECT_ROWS"]
+        return None
+
+    def predict_from_tokens(self, tokens: List[str], entities: List[dict] = None, text: str = None) -> Tuple[List[str], bool]:
+        """
+        Synchronous apredict_from_tokens for scripts: the same steps, including
+        the single AI call, made on a private event loop with its own gateway
+        (the server's gateway belongs to the server loop). Not for use inside
+        a running event loop; there the AI step fails and SELECT_ROWS is returned.
+
+        Returns: (intents, ai_was_used)
+        """
+        intents = self.match_or_classify(tokens, entities, text)
+        if intents:
+            return intents, False
+
+        if self.use_ai_fallback:
+            text = " ".join(tokens).lower()
             print(f"[DEBUG] No patterns or schema entities found, trying AI fallback for: '{text}'")
             try:
-                # Run async AI prediction in sync context
-                ai_intents = asyncio.run(self._predict_with_ai(text))
-                if ai_intents:
-                    print(f"[DEBUG] AI fallback determined intents: {ai_intents}")
-                    self.ai_used_for_current_query = True
-                    ai_was_used = True
-                    return ai_intents, ai_was_used
+                ai_intents = asyncio.run(self._predict_with_own_gateway(text))
             except Exception as e:
                 print(f"[DEBUG] AI fallback failed: {e}")
-        
+                ai_intents = []
+            if ai_intents:
+                print(f"[DEBUG] AI fallback determined intents: {ai_intents}")
+                return ai_intents, True
+
+        print(f"[DEBUG] Using final fallback: SELECT_ROWS")
+        return ["SELECT_ROWS"], False
+
+    async def _predict_with_own_gateway(self, text: str) -> List[str]:
+        llm = LLMGateway()
+        try:
+            return await self._predict_with_ai(text, llm)
+        finally:
+            await llm.close()
+
+    def classify(self, text: str) -> Optional[List[str]]:
+        """
+        The local classifier's intent for the question text when it is confident
+        enough, otherwise None. It is trained on questions as asked, so it gets
+        the text, not the stopword-stripped lemmas the patterns match on.
+        """
+        if self.classifier is None:
+            return None
+        intent, confidence = self.classifier.predict(text)
+        if intent and confidence >= INTENT_CONFIDENCE_THRESHOLD:
+            self.classifier_hits += 1
+            print(f"[DEBUG] Intent from local classifier: {intent} ({confidence:.2f})")
+            return [intent]
+        self.classifier_deferrals += 1
+        return None
+
+    def classifier_stats(self):
+        return {
+            "loaded": self.classifier is not None,
+            "threshold": INTENT_CONFIDENCE_THRESHOLD,
+            "hits": self.classifier_hits,
+            "deferred_to_llm": self.classifier_deferrals,
+        }
+
+    async def apredict_from_tokens(self, tokens: List[str], entities: List[dict] = None, text: str = None) -> Tuple[List[str], bool]:
+        """
+        Predict intent from tokens using pattern matching first, then the local
+        classifier on the question text (the joined tokens when text is not
+        given), then at most one AI call when the classifier is unsure
+
+        Returns: (intents, ai_was_used)
+        """
+        intents = self.match_or_classify(tokens, entities, text)
+        if intents:
+            return intents, False
+        return await self.apredict_with_ai(tokens)
+
+    def match_or_classify(self, tokens: List[str], entities: List[dict] = None, text: str = None) -> Optional[List[str]]:
+        """
+        The CPU-only steps of apredict_from_tokens: patterns, schema entities,
+        then the local classifier. None when only the AI can tell.
+        """
+        return self.match_from_tokens(tokens, entities) or self.classify(text if text is not None else " ".join(tokens))
+
+    async def apredict_with_ai(self, tokens: List[str]) -> Tuple[List[str], bool]:
+        """
+        The last step of apredict_from_tokens, for callers that already ran
+        match_or_classify (off the event loop) and got None
+
+        Returns: (intents, ai_was_used)
+        """
+        if self.use_ai_fallback and self.llm is not None:
+            text = " ".join(tokens).lower()
+            print(f"[DEBUG] No patterns or schema entities found, trying AI fallback for: '{text}'")
+            ai_intents = await self._predict_with_ai(text)
+            if ai_intents:
+                print(f"[DEBUG] AI fallback determined intents: {ai_intents}")
+                return ai_intents, True
+
         # Final fallback to SELECT_ROWS
         print(f"[DEBUG] Using final fallback: SELECT_ROWS")
-        return ["SELECT_ROWS"], ai_was_used
+        return ["SELECT_ROWS"], False
 
-    async def _predict_with_ai(self, text: str) -> List[str]:
+    async def _predict_with_ai(self, text: str, llm=None) -> List[str]:
         """
         Use AI to predict intent when pattern matching fails and no schema entities detected
         """
-        try:
-            # Check if Ollama is available
-            health_response = await self.ollama_client.get("http://localhost:11434/api/tags")
-            health_response.raise_for_status()
-        except:
-            print("[DEBUG] Ollama not available for AI intent prediction")
-            return []
-
         # Create a focused prompt for intent classification
         available_intents_str = ", ".join(self.available_intents)
         
@@ -131,35 +188,25 @@ Rules:
 Return only the intent name (e.g., "SELECT_ROWS"):"""
 
         try:
-            response = await self.ollama_client.post(
-                "http://localhost:11434/api/generate",
-                json={
-                    "prompt": prompt,
-                    "model": "gemma:2b",
-                    "stream": False,
-                    "options": {
-                        "temperature": 0.1,  # Very low temperature for consistent classification
-                        "top_p": 0.8,
-                        "num_predict": 20,   # Very short response expected
-                        "stop": ["\n", ":", "Explanation"]
-                    }
-                }
+            ai_response = await (llm or self.llm).generate(
+                prompt,
+                options={
+                    "temperature": 0.1,  # Very low temperature for consistent classification
+                    "top_p": 0.8,
+                    "num_predict": 20,   # Very short response expected
+                    "stop": ["\n", ":", "Explanation"]
+                },
+                deadline=AI_INTENT_DEADLINE_SECONDS
             )
-            response.raise_for_status()
-            
-            json_response = response.json()
-            ai_response = json_response.get("response", "").strip()
-            
-            print(f"[DEBUG] AI raw response: '{ai_response}'")
-            
-            # Parse the AI response to extract valid intents
-            predicted_intents = self._parse_ai_response(ai_response)
-            return predicted_intents
-            
-        except Exception as e:
-            print(f"[DEBUG] Error in AI intent prediction: {e}")
+        except LLMUnavailable as e:
+            print(f"[DEBUG] AI intent prediction unavailable: {e}")
             return []
 
+        print(f"[DEBUG] AI raw response: '{ai_response}'")
+
+        # Parse the AI response to extract valid intents
+        return self._parse_ai_response(ai_response)
+
     def _parse_ai_response(self, ai_response: str) -> List[str]:
         """
         Parse AI response to extract valid intent names
@@ -174,16 +221,3 @@ Return only the intent name (e.g., "SELECT_ROWS"):"""
         
         # Final fallback
         return ["SELECT_ROWS"]
-
-    async def close(self):
-        """Close the HTTP client"""
-        if self.ollama_client:
-            await self.ollama_client.aclose()
-
-    def __del__(self):
-        """Cleanup when object is destroyed"""
-        if self.ollama_client:
-            try:
-                asyncio.run(self.close())
-            except:
-                pass
@@ -0,0 +1,190 @@
+import os
+import re
+import json
+import threading
+
+LEMMA_CACHE_PATH = os.environ.get("CONVERSQL_LEMMA_CACHE", "lemma_cache.json")
+# a word is only answered from the cache after stanza agreed on it this many times
+LEMMA_CACHE_MIN_SEEN = int(os.environ.get("CONVERSQL_LEMMA_CACHE_MIN_SEEN", "2"))
+SAVE_EVERY_NEW_WORDS = 200
+
+# the only shapes the fast path tokenizes itself: plain words, integers and sentence punctuation
+FAST_TOKEN_PATTERN = re.compile(r"[a-z]+|\d+|[?.!,]")
+FAST_TEXT_PATTERN = re.compile(r"(?:\s*(?:[a-z]+|\d+|[?.!,]))*\s*")
+# shapes stanza may keep as one token (3.5, 1,000, u.s.) or split differently
+UNSAFE_PATTERN = re.compile(r"\d[.,]\d|[a-z]\.[a-z]")
+NUMBER_CLASS = "<NUM>"
+
+def fast_tokens(text: str):
+    """Regex tokenization that matches stanza's, or None when the text needs a real parse"""
+    if not FAST_TEXT_PATTERN.fullmatch(text) or UNSAFE_PATTERN.search(text):
+        return None
+    return FAST_TOKEN_PATTERN.findall(text)
+
+class LemmaCache:
+    """
+    Word-level (xpos, lemma) memory learned from full stanza parses and kept
+    on disk between restarts. A question is answered without stanza only when
+    every token is a known, unambiguous word; a word stanza has tagged two
+    different ways is marked ambiguous and always sends its question to stanza.
+    """
+    def __init__(self, path: str = LEMMA_CACHE_PATH, min_seen: int = LEMMA_CACHE_MIN_SEEN):
+        self.path = path
+        self.min_seen = min_seen
+        self._words = {}        # language -> {word: [xpos, lemma, seen] or None when ambiguous}
+        self._lock = threading.Lock()
+        # one writer at a time per process; the temp name is per process so workers sharing the file never collide
+        self._save_lock = threading.Lock()
+        self._unsaved = 0
+        self.text_hits = 0
+        self.text_misses = 0
+        self.token_hits = 0
+        self.token_misses = 0
+        self._load()
+
+    def _load(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            self._words = data.get("languages", {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"[WARN] Ignoring unreadable lemma cache {self.path}: {e}")
+
+    def save(self):
+        """Write the cache to disk (blocking file I/O; the server calls it through run_io)"""
+        with self._save_lock:
+            with self._lock:
+                body = json.dumps({"version": 1, "languages": self._words})
+                self._unsaved = 0
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                f.write(body)
+            os.replace(tmp_path, self.path)
+
+    def _entry_key(self, token: str) -> str:
+        return NUMBER_CLASS if token.isdigit() else token
+
+    def lookup(self, text: str, language: str):
+        """(pos_tags, lemmas) exactly as stanza would give them, or None to fall back to stanza"""
+        tokens = fast_tokens(text)
+        with self._lock:
+            if not tokens:
+                self.text_misses += 1
+                return None
+            words = self._words.get(language, {})
+            pos_tags, lemmas = [], []
+            for token in tokens:
+                entry = words.get(self._entry_key(token))
+                if not entry or entry[2] < self.min_seen:
+                    self.token_misses += 1
+                    self.text_misses += 1
+                    return None
+                self.token_hits += 1
+                xpos, lemma = entry[0], entry[1]
+                pos_tags.append((token, xpos))
+                lemmas.append(token if lemma is None else lemma)
+            self.text_hits += 1
+            return pos_tags, lemmas
+
+    def learn(self, text: str, language: str, pos_tags: list, lemmas: list) -> bool:
+        """
+        Record a full stanza parse when its tokens line up one-to-one with the
+        fast tokenizer. Only touches memory; returns True once enough new words
+        have built up that the caller should save().
+        """
+        tokens = fast_tokens(text)
+        if tokens is None or tokens != [token for token, _ in pos_tags]:
+            return False
+        new_words = 0
+        with self._lock:
+            words = self._words.setdefault(language, {})
+            for token, (_, xpos), lemma in zip(tokens, pos_tags, lemmas):
+                key = self._entry_key(token)
+                # numbers are stored as "lemma is the token itself" so one entry covers them all
+                stored_lemma = None if key == NUMBER_CLASS and lemma == token else lemma
+                if key == NUMBER_CLASS and stored_lemma is not None:
+                    words[key] = None
+                    continue
+                if key not in words:
+                    words[key] = [xpos, stored_lemma, 1]
+                    new_words += 1
+                    continue
+                entry = words[key]
+                if entry is None:
+                    continue
+                if entry[0] != xpos or entry[1] != stored_lemma:
+                    # context-dependent word: never answer it from the cache
+                    words[key] = None
+                else:
+                    entry[2] += 1
+            self._unsaved += new_words
+            return self._unsaved >= SAVE_EVERY_NEW_WORDS
+
+    def stats(self):
+        with self._lock:
+            texts = self.text_hits + self.text_misses
+            tokens = self.token_hits + self.token_misses
+            entries = sum(len(words) for words in self._words.values())
+            ambiguous = sum(1 for words in self._words.values() for entry in words.values() if entry is None)
+            return {
+                "entries": entries,
+                "ambiguous": ambiguous,
+                "min_seen": self.min_seen,
+                "text_hits": self.text_hits,
+                "text_misses": self.text_misses,
+                "text_hit_rate": round(self.text_hits / texts, 4) if texts else 0.0,
+                "token_hits": self.token_hits,
+                "token_misses": self.token_misses,
+                "token_hit_rate": round(self.token_hits / tokens, 4) if tokens else 0.0,
+            }
+
+def _logged_questions(path="Query_Builder/query_log.txt"):
+    questions = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) > 5 and fields[5].strip():
+                questions.append(fields[5].strip().lower())
+    return questions
+
+def split_questions(questions, holdout_every=5):
+    """Distinct questions split into (learn, held out): every holdout_every-th one is held out"""
+    distinct = list(dict.fromkeys(questions))
+    learn = [q for i, q in enumerate(distinct) if i % holdout_every]
+    held_out = [q for i, q in enumerate(distinct) if not i % holdout_every]
+    return learn, held_out
+
+if __name__ == "__main__":
+    # Warm the cache from logged questions, then check the fast path against stanza on
+    # questions it never learned from; the shipped cache is then rebuilt from all of them
+    from NLP_pipeline import tokenizer_stanza
+
+    learn_set, held_out = split_questions(_logged_questions())
+    parses = {}
+    for text, (_, pos_tags, lemmas) in zip(learn_set + held_out, tokenizer_stanza.stanza_tokenize_batch(learn_set + held_out)):
+        parses[text] = (pos_tags, lemmas)
+
+    cache = LemmaCache(path=None)
+    for text in learn_set:
+        cache.learn(text, tokenizer_stanza.lang, *parses[text])
+    answered = mismatches = 0
+    for text in held_out:
+        fast = cache.lookup(text, tokenizer_stanza.lang)
+        if fast is None:
+            continue
+        answered += 1
+        if fast != parses[text]:
+            mismatches += 1
+            print(f"MISMATCH: {text!r}\n  stanza: {parses[text][1]}\n  cache:  {fast[1]}")
+    print(f"Held out {len(held_out)} of {len(parses)} distinct questions: "
+          f"{answered} answered by the fast path, {mismatches} mismatches")
+
+    cache = LemmaCache()
+    for text, (pos_tags, lemmas) in parses.items():
+        cache.learn(text, tokenizer_stanza.lang, pos_tags, lemmas)
+    cache.save()
+    print(cache.stats())
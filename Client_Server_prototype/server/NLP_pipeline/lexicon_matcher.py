@@ -0,0 +1,169 @@
+import os
+import re
+import json
+
+JSON_DIR = os.path.join(os.path.dirname(__file__), "json")
+INTENT_FILE = os.path.join(JSON_DIR, "intent.json")
+OPERATOR_FILE = os.path.join(JSON_DIR, "comparison_operators.json")
+
+INTENT_LEXICON = "intent"
+OPERATOR_LEXICON = "operator"
+
+# \b on both ends, as in rf"\b{phrase}\b"
+BOUNDARY_WORD = "word"
+# not touching a word character on either side, as in (?<!\w)phrase(?!\w)
+BOUNDARY_ISOLATED = "isolated"
+
+REGEX_META_CHARS = set("\\[](){}*+?|^$.")
+
+def _is_word_char(c: str) -> bool:
+    return c.isalnum() or c == "_"
+
+def _fold_case(text: str) -> str:
+    """Lower-case without changing the length, so match offsets index the original text"""
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return "".join(c.lower() if len(c.lower()) == 1 else c for c in text)
+
+class LexiconMatcher:
+    """
+    Several phrase lexicons compiled into one Aho-Corasick automaton, so one
+    scan of a text finds every occurrence of every phrase no matter how many
+    synonyms the lexicons hold. Overlapping hits are all reported; word
+    boundaries are checked per hit exactly as the equivalent regexes would.
+    Phrases that are themselves regexes (e.g. 'first \\d+') are few and are
+    searched individually.
+    """
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._own = [[]]        # (entry index, length) of phrases ending exactly at each state
+        self._out = [[]]        # _own plus everything reachable through failure links
+        self._entries = []      # (kind, value, boundary)
+        self._regexes = []      # (entry index, compiled regex)
+        self._built = True
+
+    def add(self, kind: str, value: str, phrase: str, boundary: str = BOUNDARY_WORD, is_regex: bool = False):
+        """Register a phrase; hits are reported in the order phrases were added when they share a span"""
+        index = len(self._entries)
+        self._entries.append((kind, value, boundary))
+        if is_regex:
+            if boundary == BOUNDARY_WORD:
+                regex = re.compile(rf"\b({phrase})\b", re.IGNORECASE)
+            else:
+                regex = re.compile(rf"(?<!\w)({phrase})(?!\w)", re.IGNORECASE)
+            self._regexes.append((index, regex))
+            return
+        state = 0
+        for c in _fold_case(phrase):
+            next_state = self._goto[state].get(c)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][c] = next_state
+                self._goto.append({})
+                self._own.append([])
+            state = next_state
+        self._own[state].append((index, len(phrase)))
+        self._built = False
+
+    def build(self):
+        """Compile the automaton now instead of on the first find() (do this before sharing across threads)"""
+        if not self._built:
+            self._build()
+
+    def _build(self):
+        # breadth-first failure links; each state also inherits the outputs of its failure state
+        self._fail = [0] * len(self._goto)
+        self._out = [list(own) for own in self._own]
+        queue = list(self._goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for c, child in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and c not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(c, 0)
+                self._out[child] += self._out[self._fail[child]]
+                queue.append(child)
+        self._built = True
+
+    def _boundary_ok(self, text: str, start: int, end: int, boundary: str) -> bool:
+        before = start > 0 and _is_word_char(text[start - 1])
+        after = end < len(text) and _is_word_char(text[end])
+        if boundary == BOUNDARY_ISOLATED:
+            return not before and not after
+        return before != _is_word_char(text[start]) and after != _is_word_char(text[end - 1])
+
+    def find(self, text: str, kind: str = None) -> list:
+        """
+        (kind, value, start, end, order) for every hit, sorted by start then
+        registration order. Like re.finditer, one phrase never overlaps itself.
+        """
+        if not self._built:
+            self._build()
+        folded = _fold_case(text)
+        hits = []
+        last_end = {}
+        state = 0
+        goto, fail, out, entries = self._goto, self._fail, self._out, self._entries
+        for i, c in enumerate(folded):
+            while state and c not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(c, 0)
+            for index, length in out[state]:
+                entry_kind, value, boundary = entries[index]
+                if kind is not None and entry_kind != kind:
+                    continue
+                start, end = i + 1 - length, i + 1
+                if start < last_end.get(index, 0) or not self._boundary_ok(text, start, end, boundary):
+                    continue
+                last_end[index] = end
+                hits.append((entry_kind, value, start, end, index))
+        for index, regex in self._regexes:
+            entry_kind, value, _ = entries[index]
+            if kind is not None and entry_kind != kind:
+                continue
+            for m in regex.finditer(text):
+                hits.append((entry_kind, value, m.start(), m.end(), index))
+        hits.sort(key=lambda hit: (hit[2], hit[4]))
+        return hits
+
+def is_regex_phrase(phrase: str) -> bool:
+    return any(c in REGEX_META_CHARS for c in phrase)
+
+def add_intent_lexicon(matcher: LexiconMatcher, patterns_dict: dict):
+    """intent.json: {intent: [phrase, ...]}, each matched like rf"\\b({phrase})\\b" """
+    for intent, phrases in patterns_dict.items():
+        for phrase in phrases:
+            matcher.add(INTENT_LEXICON, intent, phrase, BOUNDARY_WORD, is_regex=is_regex_phrase(phrase))
+
+def _legacy_operator_order(item):
+    # comparison_operator_recognizer tried phrases longest compiled regex first; ties on a span keep that order
+    _, phrase = item
+    escaped = re.escape(phrase.strip())
+    return -(len(escaped) + (4 if " " in phrase else 13))
+
+def add_operator_lexicon(matcher: LexiconMatcher, synonyms: dict):
+    """comparison_operators.json: {operator: [synonym, ...]}; synonyms are literal text"""
+    items = [(op, phrase) for op, phrases in synonyms.items() for phrase in phrases]
+    for op, phrase in sorted(items, key=_legacy_operator_order):
+        boundary = BOUNDARY_WORD if " " in phrase else BOUNDARY_ISOLATED
+        matcher.add(OPERATOR_LEXICON, op, phrase.strip(), boundary)
+
+_shared = None
+
+def get_lexicon() -> LexiconMatcher:
+    """The intent and comparison-operator lexicons compiled into one matcher"""
+    global _shared
+    if _shared is None:
+        matcher = LexiconMatcher()
+        with open(INTENT_FILE, "r") as f:
+            add_intent_lexicon(matcher, json.load(f))
+        with open(OPERATOR_FILE, "r") as f:
+            add_operator_lexicon(matcher, json.load(f))
+        matcher.build()
+        _shared = matcher
+    return _shared
@@ -1,12 +1,10 @@
 import re
-import sys
-import subprocess
 
 try:
     from dateutil import parser as _p
-except ImportError:
-    subprocess.check_call([sys.executable, "-m", "pip", "install", "python-dateutil"])
-    from dateutil import parser as _p
+except ImportError as e:
+    # installing packages at import time is not this module's job
+    raise ImportError("normalize_dates requires python-dateutil (pip install python-dateutil)") from e
 
 _DATE_PATTERNS = [
     r"\b\d{4}-\d{2}-\d{2}\b",                 # 2025-06-23
@@ -0,0 +1,48 @@
+_PHRASE = object()   # key marking "a phrase ends here" inside a trie node
+
+class PhraseTrie:
+    """
+    Token-level trie of schema phrases. Each phrase may be reachable through
+    several token sequences (as written, and as the lemmatizer sees it);
+    every path ends at the phrase itself, so callers always get the schema name.
+    """
+    def __init__(self):
+        self._root = {}
+        self.paths = 0
+
+    def add(self, tokens, phrase: str, replace: bool = True):
+        """Map a token sequence to phrase; replace=False keeps an existing mapping"""
+        if not tokens:
+            return
+        node = self._root
+        for token in tokens:
+            node = node.setdefault(token, {})
+        if replace or _PHRASE not in node:
+            if _PHRASE not in node:
+                self.paths += 1
+            node[_PHRASE] = phrase
+
+    def combine(self, tokens: list) -> list:
+        """Greedy left-to-right longest match: matched runs become their phrase, other tokens pass through"""
+        combined = []
+        i, n = 0, len(tokens)
+        root = self._root
+        while i < n:
+            node = root
+            match, match_end = None, i
+            j = i
+            while j < n:
+                node = node.get(tokens[j])
+                if node is None:
+                    break
+                j += 1
+                phrase = node.get(_PHRASE)
+                if phrase is not None:
+                    match, match_end = phrase, j
+            if match is None:
+                combined.append(tokens[i])
+                i += 1
+            else:
+                combined.append(match)
+                i = match_end
+        return combined
@@ -1,28 +1,16 @@
-import json
-import re
 import os
 from difflib import SequenceMatcher
 
-from NLP_pipeline.tokenizer_stanza import SCHEMA_PHRASES, SCHEMA_MAP
+from NLP_pipeline.schema_index import SchemaIndex, get_schema_index, normalize, STOP_WORDS
+from NLP_pipeline.tokenizer_stanza import SCHEMA_MAP
 
-MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
-COMP_MAP_PATH = os.path.join(MODULE_DIR, 'json/comparison_operators.json')
-INTENT_MAP_PATH = os.path.join(MODULE_DIR, 'json/intent.json')
-
-def normalize(text):
-    """Enhanced normalization for better matching"""
-    return re.sub(r'[\s_().-]', '', text.lower())
+# Typo-tolerant linking in the query path ("eccentricty" -> eccentricity); set to 0 to require exact names
+FUZZY_SCHEMA_LINKING = os.environ.get("CONVERSQL_FUZZY_SCHEMA_LINKING", "1") == "1"
 
 def similarity_score(a, b):
     """Calculate similarity between two strings"""
     return SequenceMatcher(None, a, b).ratio()
 
-def load_json(path):
-    if os.path.exists(path):
-        with open(path, 'r') as f:
-            return json.load(f)
-    return {}
-
 def find_fuzzy_matches(token, schema_terms, threshold=0.8):
     """Find fuzzy matches for tokens that don't match exactly"""
     matches = []
@@ -37,104 +25,55 @@ def find_fuzzy_matches(token, schema_terms, threshold=0.8):
     return sorted(matches, key=lambda x: x[1], reverse=True)
 
 def get_entity_type_from_schema_map(original_term):
-    """Determine entity type using SCHEMA_MAP with enhanced logic"""
-    # Check direct mappings first
-    if original_term in SCHEMA_MAP["db_to_tables"]:
-        return "database"
-    elif original_term in SCHEMA_MAP["table_to_db"]:
-        return "table"
-    elif original_term in SCHEMA_MAP["column_to_table_db"]:
-        return "column"
-    
-    # Check case-insensitive matches
-    lower_term = original_term.lower()
-    
-    # Check databases (case-insensitive)
-    for db in SCHEMA_MAP["db_to_tables"]:
-        if db.lower() == lower_term:
-            return "database"
-    
-    # Check tables (case-insensitive)
-    for table in SCHEMA_MAP["table_to_db"]:
-        if table.lower() == lower_term:
-            return "table"
-    
-    # Check columns (case-insensitive)
-    for col in SCHEMA_MAP["column_to_table_db"]:
-        if col.lower() == lower_term:
-            return "column"
-    
-    return "unknown"
+    """Determine entity type: database, then table, then column, case-insensitively"""
+    return get_schema_index().entity_type(original_term)
 
 def enhanced_schema_entity_recognizer(tokens, schema_terms=None, enable_fuzzy=True, fuzzy_threshold=0.8):
     """
     Enhanced entity recognizer with fuzzy matching and better context resolution
     """
-    comp_map = load_json(COMP_MAP_PATH)
-    intent_map = load_json(INTENT_MAP_PATH)
-
-    # Build stop words set
-    stop_words = set()
-    for phrase in comp_map.keys():
-        stop_words.add(normalize(phrase))
-    for phrase in intent_map.keys():
-        stop_words.add(normalize(phrase))
-
-    # Use provided schema terms or default to SCHEMA_PHRASES
-    schema_terms_to_use = schema_terms if schema_terms else SCHEMA_PHRASES
-    
-    # Create normalized schema mapping
-    normalized_schema = {
-        normalize(term): term for term in schema_terms_to_use
-    }
-
-    matched_entities = []
-    unmatched_tokens = []
+    # Precomputed for the loaded schema; custom term lists get a throwaway index
+    index = SchemaIndex(SCHEMA_MAP, schema_terms) if schema_terms else get_schema_index()
 
+    resolved = []
     for token in tokens:
         norm_token = normalize(token)
-        
+        entry = index.lookup_normalized(norm_token)
+
         # Skip stop words (unless they're schema terms)
-        if norm_token in stop_words and norm_token not in normalized_schema:
+        if entry is None and norm_token in STOP_WORDS:
             continue
+        resolved.append((token, entry))
+
+    # Typo candidates for every token without a direct match, looked up in one pass
+    fuzzy_by_token = {}
+    if enable_fuzzy:
+        fuzzy_by_token = index.fuzzy_matches_many([token for token, entry in resolved if entry is None], fuzzy_threshold)
 
+    matched_entities = []
+    unmatched_tokens = []
+
+    for token, entry in resolved:
         # Direct match
-        if norm_token in normalized_schema:
-            original = normalized_schema[norm_token]
-            ent_type = get_entity_type_from_schema_map(original)
-            
+        if entry is not None:
             matched_entities.append({
-                "type": ent_type,
-                "value": original,
+                "type": entry.type,
+                "value": entry.original,
                 "matched_token": token,
                 "match_method": "direct",
                 "confidence": 1.0
             })
         
         # Fuzzy matching for unmatched tokens
-        elif enable_fuzzy:
-            fuzzy_matches = find_fuzzy_matches(token, schema_terms_to_use, fuzzy_threshold)
-            
-            if fuzzy_matches:
-                best_match, confidence = fuzzy_matches[0]
-                ent_type = get_entity_type_from_schema_map(best_match)
-                
-                matched_entities.append({
-                    "type": ent_type,
-                    "value": best_match,
-                    "matched_token": token,
-                    "match_method": "fuzzy",
-                    "confidence": confidence
-                })
-            else:
-                unmatched_tokens.append(token)
-                matched_entities.append({
-                    "type": "unmatched",
-                    "value": None,
-                    "matched_token": token,
-                    "match_method": "none",
-                    "confidence": 0.0
-                })
+        elif fuzzy_by_token.get(token):
+            best_match, confidence = fuzzy_by_token[token][0]
+            matched_entities.append({
+                "type": best_match.type,
+                "value": best_match.original,
+                "matched_token": token,
+                "match_method": "fuzzy",
+                "confidence": confidence
+            })
         else:
             unmatched_tokens.append(token)
             matched_entities.append({
@@ -158,5 +97,5 @@ def enhanced_schema_entity_recognizer(tokens, schema_terms=None, enable_fuzzy=Tr
 # Backward compatibility function
 def schema_entity_recognizer(tokens, schema_terms=None):
     """Original function signature for backward compatibility"""
-    result = enhanced_schema_entity_recognizer(tokens, schema_terms, enable_fuzzy=False)
+    result = enhanced_schema_entity_recognizer(tokens, schema_terms, enable_fuzzy=FUZZY_SCHEMA_LINKING)
     return result["entities"]
@@ -0,0 +1,229 @@
+import re
+import json
+import math
+import os
+import threading
+from collections import namedtuple, Counter
+from difflib import SequenceMatcher
+
+from NLP_pipeline import tokenizer_stanza
+
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+COMP_MAP_PATH = os.path.join(MODULE_DIR, 'json/comparison_operators.json')
+INTENT_MAP_PATH = os.path.join(MODULE_DIR, 'json/intent.json')
+
+SchemaTerm = namedtuple("SchemaTerm", ["type", "original", "db", "table"])
+
+NORMALIZE_PATTERN = re.compile(r'[\s_().-]')
+
+def normalize(text):
+    """Enhanced normalization for better matching"""
+    return NORMALIZE_PATTERN.sub('', text.lower())
+
+def _bigrams(text):
+    return Counter(text[i:i + 2] for i in range(len(text) - 1))
+
+def min_shared_bigrams(total_length: int, threshold: float) -> int:
+    """
+    Fewest bigrams two strings of combined length total_length can share (as
+    multisets) when their SequenceMatcher ratio reaches threshold. The ratio is
+    2M / total_length for M matched characters, which form at most
+    total_length - 2M + 1 blocks, and a block of n characters holds n - 1
+    shared bigrams. Zero or less means the bigrams cannot rule a term out.
+    """
+    matched = math.ceil(threshold * total_length / 2 - 1e-9)
+    return 3 * matched - total_length - 1
+
+def _load_json(path):
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            return json.load(f)
+    return {}
+
+def _load_stop_words():
+    stop_words = set()
+    for phrase in _load_json(COMP_MAP_PATH).keys():
+        stop_words.add(normalize(phrase))
+    for phrase in _load_json(INTENT_MAP_PATH).keys():
+        stop_words.add(normalize(phrase))
+    return frozenset(stop_words)
+
+# operator symbols and intent names never count as schema tokens; read once, not per call
+STOP_WORDS = _load_stop_words()
+
+class SchemaIndex:
+    """
+    Read-only lookup tables for one version of the schema: normalized term ->
+    SchemaTerm(type, original, db, table). A term naming both a database and a
+    table or column resolves to the database, then the table, as before.
+    A new index is built when the schema is reloaded; existing ones never change.
+    """
+    __slots__ = ("version", "terms", "_by_normalized", "_by_original", "first_db",
+                 "_fuzzy_terms", "_ids_by_length", "_bigram_postings")
+
+    def __init__(self, schema_map: dict, terms, version: int = 0):
+        by_original = {}
+        for col, (db, table) in schema_map["column_to_table_db"].items():
+            by_original[col] = SchemaTerm("column", col, db, table)
+        for table, db in schema_map["table_to_db"].items():
+            by_original[table] = SchemaTerm("table", table, db, table)
+        for db in schema_map["db_to_tables"]:
+            by_original[db] = SchemaTerm("database", db, db, None)
+
+        self.version = version
+        self.terms = tuple(terms)
+        self._by_original = by_original
+        self._by_normalized = {}
+        # fuzzy candidates: term id -> (normalized term, character counts, [(position, SchemaTerm)]),
+        # found through their normalized length and inverted lists of their bigrams,
+        # bigram -> normalized length -> ([term ids], [times the bigram occurs in each])
+        self._fuzzy_terms = []
+        self._ids_by_length = {}
+        self._bigram_postings = {}
+        ids = {}
+        for position, term in enumerate(self.terms):
+            entry = by_original.get(term) or by_original.get(term.lower())
+            if entry is None:
+                entry = SchemaTerm("unknown", term, None, None)
+            elif entry.original != term:
+                entry = entry._replace(original=term)
+            norm_term = normalize(term)
+            self._by_normalized[norm_term] = entry
+            if norm_term not in ids:
+                ids[norm_term] = term_id = len(self._fuzzy_terms)
+                self._fuzzy_terms.append((norm_term, Counter(norm_term), []))
+                self._ids_by_length.setdefault(len(norm_term), []).append(term_id)
+                for gram, count in _bigrams(norm_term).items():
+                    term_ids, counts = self._bigram_postings.setdefault(gram, {}).setdefault(len(norm_term), ([], []))
+                    term_ids.append(term_id)
+                    counts.append(count)
+            self._fuzzy_terms[ids[norm_term]][2].append((position, entry))
+        self.first_db = next(iter(schema_map["db_to_tables"]), None)
+
+    def lookup(self, token: str):
+        """SchemaTerm for a token, or None"""
+        return self._by_normalized.get(normalize(token))
+
+    def lookup_normalized(self, norm_token: str):
+        return self._by_normalized.get(norm_token)
+
+    def fuzzy_matches(self, token: str, threshold: float = 0.8):
+        """
+        (SchemaTerm, score) for every schema term whose SequenceMatcher ratio
+        against token reaches threshold, best first and in term order on ties,
+        exactly like scanning all terms
+        """
+        return self.fuzzy_matches_many([token], threshold)[token]
+
+    def fuzzy_matches_many(self, tokens, threshold: float = 0.8) -> dict:
+        """
+        fuzzy_matches for every distinct token of a question at once: token -> matches.
+        Only terms of a length that can reach threshold are considered (difflib's
+        real_quick_ratio bound). Of those, a term must share min_shared_bigrams
+        with the token, counted in one walk over the bigram lists the batch
+        touches; terms too short for that bound are all kept. Survivors pass the
+        character-count bound (quick_ratio) before the exact SequenceMatcher
+        ratio, computed with one matcher per term for the whole batch.
+        """
+        tokens_by_norm = {}
+        for token in dict.fromkeys(tokens):
+            tokens_by_norm.setdefault(normalize(token), []).append(token)
+
+        # lengths each token can reach the threshold with: those needing no shared bigram are
+        # taken whole, the rest come from the bigram lists
+        token_counts = {}
+        scan_lengths = {}
+        bigram_lengths = {}
+        for norm_token in tokens_by_norm:
+            token_counts[norm_token] = Counter(norm_token)
+            token_length = len(norm_token)
+            scan_lengths[norm_token], bigram_lengths[norm_token] = scan, by_bigrams = [], {}
+            for term_length in self._ids_by_length:
+                total = token_length + term_length
+                if total and 2.0 * min(token_length, term_length) / total < threshold:
+                    continue
+                needed = min_shared_bigrams(total, threshold)
+                if needed <= 0:
+                    scan.append(term_length)
+                else:
+                    by_bigrams[term_length] = needed
+
+        # bigrams shared between each token and each term, walking every list once per batch
+        asking = {}
+        for norm_token in tokens_by_norm:
+            if bigram_lengths[norm_token]:
+                for gram, count in _bigrams(norm_token).items():
+                    asking.setdefault(gram, []).append((norm_token, count))
+        shared_bigrams = {norm_token: Counter() for norm_token in tokens_by_norm}
+        for gram, askers in asking.items():
+            postings = self._bigram_postings.get(gram)
+            if postings is None:
+                continue
+            for norm_token, count in askers:
+                shared = shared_bigrams[norm_token]
+                for term_length in bigram_lengths[norm_token]:
+                    posting = postings.get(term_length)
+                    if posting is None:
+                        continue
+                    if count == 1:
+                        shared.update(posting[0])
+                    else:
+                        for term_id, term_count in zip(*posting):
+                            shared[term_id] += min(count, term_count)
+
+        tokens_by_term = {}
+        for norm_token, shared in shared_bigrams.items():
+            needed = bigram_lengths[norm_token]
+            candidates = [term_id for term_length in scan_lengths[norm_token] for term_id in self._ids_by_length[term_length]]
+            candidates += [term_id for term_id, count in shared.items()
+                           if count >= needed[len(self._fuzzy_terms[term_id][0])]]
+            for term_id in candidates:
+                tokens_by_term.setdefault(term_id, []).append(norm_token)
+
+        scored = {norm_token: [] for norm_token in tokens_by_norm}
+        for term_id, norm_tokens in tokens_by_term.items():
+            norm_term, term_counts, entries = self._fuzzy_terms[term_id]
+            matcher = SequenceMatcher(None, "", norm_term)
+            for norm_token in norm_tokens:
+                total = len(norm_token) + len(norm_term)
+                shared = sum(min(count, term_counts[char]) for char, count in token_counts[norm_token].items())
+                if total and 2.0 * shared / total < threshold:
+                    continue
+                matcher.set_seq1(norm_token)
+                score = matcher.ratio()
+                if score >= threshold:
+                    scored[norm_token].extend((position, entry, score) for position, entry in entries)
+
+        matches = {}
+        for norm_token, found in scored.items():
+            found.sort(key=lambda match: (-match[2], match[0]))
+            for token in tokens_by_norm[norm_token]:
+                matches[token] = [(entry, score) for _, entry, score in found]
+        return matches
+
+    def entry_for(self, original_term: str):
+        """SchemaTerm for a schema name as written in the schema (case-insensitive), or None"""
+        return self._by_original.get(original_term) or self._by_original.get(original_term.lower())
+
+    def entity_type(self, original_term: str) -> str:
+        entry = self.entry_for(original_term)
+        return entry.type if entry else "unknown"
+
+    def db_for(self, original_term: str):
+        entry = self.entry_for(original_term)
+        return entry.db if entry else None
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_schema_index() -> SchemaIndex:
+    """The index for the currently loaded schema, rebuilt only after load_schema() ran again"""
+    global _index
+    version = tokenizer_stanza.schema_version()
+    index = _index
+    if index is not None and index.version == version:
+        return index
+    with _index_lock:
+        if _index is None or _index.version != version:
+            _index = SchemaIndex(tokenizer_stanza.SCHEMA_MAP, sorted(tokenizer_stanza.SCHEMA_PHRASES), version)
+        return _index
@@ -0,0 +1,325 @@
+import os
+import sys
+import pickle
+import asyncio
+import threading
+import subprocess
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from NLP_pipeline import tokenizer_stanza, tokenizer_worker
+from NLP_pipeline.tokenizer_stanza import _build_token_result
+from common.executors import run_cpu, run_io
+from common.micro_batcher import MicroBatcher
+from NLP_pipeline.lemma_cache import LemmaCache
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKER_MODULE = "NLP_pipeline.tokenizer_worker"
+
+# 0 keeps stanza in the server process (the default); N > 0 starts N parser processes
+TOKENIZER_WORKERS = int(os.environ.get("CONVERSQL_TOKENIZER_WORKERS", "0"))
+# e.g. "2-5" or "2,3,6"; worker i is pinned to the i-th listed CPU (round robin)
+TOKENIZER_CPU_AFFINITY = os.environ.get("CONVERSQL_TOKENIZER_CPUS", "")
+
+# concurrent single-question tokenizations are held up to this long to share one stanza call; 0 disables
+TOKENIZE_BATCH_WAIT_MS = float(os.environ.get("CONVERSQL_TOKENIZE_BATCH_WAIT_MS", "2"))
+TOKENIZE_BATCH_MAX = int(os.environ.get("CONVERSQL_TOKENIZE_BATCH_MAX", "16"))
+
+# tier one: answer questions made only of already-seen words without stanza
+LEMMA_CACHE_ENABLED = os.environ.get("CONVERSQL_LEMMA_CACHE_ENABLED", "1") == "1"
+
+_pool = None
+_batcher = None
+_save_task = None
+# language -> schema version whose phrases have been lemmatized (or attempted)
+_phrase_lemmas_learned = {}
+lemma_cache = LemmaCache() if LEMMA_CACHE_ENABLED else None
+
+def parse_cpu_list(spec: str) -> list:
+    cpus = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            lo, hi = part.split("-", 1)
+            cpus.extend(range(int(lo), int(hi) + 1))
+        else:
+            cpus.append(int(part))
+    return cpus
+
+class WorkerProcess:
+    """One tokenizer worker (`python -m WORKER_MODULE`) and the pipes its pickled requests travel on"""
+    def __init__(self, index: int, cpu=None):
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(p for p in (SERVER_DIR, env.get("PYTHONPATH")) if p)
+        args = [sys.executable, "-m", WORKER_MODULE, str(index)] + ([str(cpu)] if cpu is not None else [])
+        self.index = index
+        self.process = subprocess.Popen(args, stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=env)
+
+    def _receive(self):
+        try:
+            return pickle.load(self.process.stdout)
+        except EOFError:
+            raise RuntimeError(f"tokenizer worker {self.index} exited (code {self.process.wait()})") from None
+
+    def wait_ready(self) -> int:
+        """Block until stanza is loaded in the worker; its pid"""
+        status, value = self._receive()
+        if status != "ready":
+            raise RuntimeError(f"tokenizer worker {self.index} failed to start: {value}")
+        return value
+
+    def call(self, texts, language):
+        try:
+            pickle.dump((texts, language), self.process.stdin)
+            self.process.stdin.flush()
+        except OSError:
+            raise RuntimeError(f"tokenizer worker {self.index} exited (code {self.process.wait()})") from None
+        status, value = self._receive()
+        if status != "ok":
+            raise ValueError(f"tokenizer worker {self.index}: {value}")
+        return value
+
+    def stop(self, timeout: float = 5.0):
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout)
+        except (OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+
+class WorkerPool:
+    """
+    Tokenizer worker processes, each handed one request at a time. warmups
+    holds one future per worker that resolves (to its pid) once it has loaded
+    stanza. A worker that fails to start or exits breaks the pool: every call
+    then raises instead of waiting for a worker that will never be free.
+    """
+    def __init__(self, count: int, cpus=()):
+        self._cond = threading.Condition()
+        self._idle = []
+        self._broken = None
+        self._threads = ThreadPoolExecutor(max_workers=count, thread_name_prefix="conversql-tokenizer")
+        self.workers = [WorkerProcess(i, cpus[i % len(cpus)] if cpus else None) for i in range(count)]
+        self.warmups = []
+        for worker in self.workers:
+            warmup = Future()
+            self.warmups.append(warmup)
+            threading.Thread(target=self._warm_up, args=(worker, warmup), name="conversql-tokenizer-warmup", daemon=True).start()
+
+    def _warm_up(self, worker: WorkerProcess, warmup: Future):
+        try:
+            pid = worker.wait_ready()
+        except Exception as e:
+            self._break(str(e))
+            warmup.set_exception(e)
+            return
+        with self._cond:
+            self._idle.append(worker)
+            self._cond.notify()
+        warmup.set_result(pid)
+
+    def _break(self, reason: str, log: bool = True):
+        with self._cond:
+            if self._broken is not None:
+                return
+            self._broken = reason
+            self._cond.notify_all()
+        if log:
+            print(f"[ERROR] Tokenizer worker pool broken: {reason}")
+
+    def is_ready(self) -> bool:
+        return all(w.done() and w.exception() is None for w in self.warmups)
+
+    def error(self):
+        return self._broken
+
+    def _call(self, texts, language):
+        with self._cond:
+            while not self._idle and self._broken is None:
+                self._cond.wait()
+            if self._broken is not None:
+                raise RuntimeError(f"tokenizer worker pool is broken: {self._broken}")
+            worker = self._idle.pop()
+        try:
+            result = worker.call(texts, language)
+        except RuntimeError as e:
+            self._break(str(e))
+            raise
+        except Exception:
+            self._release(worker)
+            raise
+        self._release(worker)
+        return result
+
+    def _release(self, worker: WorkerProcess):
+        with self._cond:
+            self._idle.append(worker)
+            self._cond.notify()
+
+    def submit(self, texts, language=None) -> Future:
+        return self._threads.submit(self._call, texts, language)
+
+    def shutdown(self):
+        self._break("shut down", log=False)
+        self._threads.shutdown(wait=False, cancel_futures=True)
+        for worker in self.workers:
+            worker.stop()
+
+def start():
+    """Start the tokenizer workers, or warm stanza in process when no workers are configured"""
+    global _pool
+    if TOKENIZER_WORKERS <= 0:
+        tokenizer_stanza.init_in_background()
+        return
+    if _pool is not None:
+        return
+    # separate interpreters, not forks: a forked copy of a process that already touched torch can deadlock.
+    # all workers start now so the stanza load is paid at boot, not by the first queries
+    _pool = WorkerPool(TOKENIZER_WORKERS, parse_cpu_list(TOKENIZER_CPU_AFFINITY))
+    print(f"[INFO] Started {TOKENIZER_WORKERS} tokenizer worker processes")
+
+def shutdown():
+    global _pool
+    if lemma_cache is not None:
+        try:
+            lemma_cache.save()
+        except OSError as e:
+            print(f"[WARN] Could not persist lemma cache: {e}")
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
+
+def is_ready():
+    """True once stanza is loaded: in every worker process, or in this one when there are none"""
+    if _pool is not None:
+        return _pool.is_ready()
+    return tokenizer_stanza.is_ready()
+
+def init_error():
+    """Why stanza could not be loaded, in a worker or in this process; None when it could"""
+    if _pool is not None:
+        return _pool.error()
+    return tokenizer_stanza.init_error()
+
+async def parse_texts(texts, language=None):
+    """(pos_tags, lemmas) per text, parsed by the worker processes or on the CPU thread pool"""
+    if _pool is None:
+        return await run_cpu(tokenizer_worker.parse, texts, language)
+    # spread the batch over the workers instead of parsing it all in one process
+    chunk = -(-len(texts) // TOKENIZER_WORKERS)
+    chunks = [texts[i:i + chunk] for i in range(0, len(texts), chunk)]
+    parts = await asyncio.gather(*(asyncio.wrap_future(_pool.submit(c, language)) for c in chunks))
+    return [item for part in parts for item in part]
+
+async def _parse_batched_items(items):
+    """Batcher callback: items are (text, language); each language gets its own stanza call"""
+    by_language = {}
+    for i, (_, language) in enumerate(items):
+        by_language.setdefault(language, []).append(i)
+    parts = await asyncio.gather(*(
+        parse_texts([items[i][0] for i in indexes], language)
+        for language, indexes in by_language.items()
+    ))
+    results = [None] * len(items)
+    for indexes, parsed in zip(by_language.values(), parts):
+        for i, result in zip(indexes, parsed):
+            results[i] = result
+    return results
+
+def get_batcher():
+    global _batcher
+    if _batcher is None:
+        _batcher = MicroBatcher(_parse_batched_items, max_batch_size=TOKENIZE_BATCH_MAX, max_wait_ms=TOKENIZE_BATCH_WAIT_MS)
+    return _batcher
+
+def lemma_cache_stats():
+    if lemma_cache is None:
+        return {"enabled": False}
+    return dict(lemma_cache.stats(), enabled=True)
+
+def _cached_parse(text, language):
+    if lemma_cache is None:
+        return None
+    return lemma_cache.lookup(text, language)
+
+def _learn(text, language, pos_tags, lemmas):
+    if lemma_cache is not None and lemma_cache.learn(text, language, pos_tags, lemmas):
+        _schedule_lemma_cache_save()
+
+def _schedule_lemma_cache_save():
+    """Persist the lemma cache on the I/O pool; at most one save is in flight"""
+    global _save_task
+    if _save_task is None or _save_task.done():
+        _save_task = asyncio.ensure_future(_save_lemma_cache())
+
+async def _save_lemma_cache():
+    try:
+        await run_io(lemma_cache.save)
+    except OSError as e:
+        print(f"[WARN] Could not persist lemma cache: {e}")
+
+async def learn_schema_phrase_lemmas(language=None):
+    """
+    Lemmatize the schema phrases with the same pipeline as questions, so the
+    phrase trie also matches inflected forms ("missions status" for "mission status").
+    """
+    language = language or tokenizer_stanza.lang
+    version = tokenizer_stanza.schema_version()
+    if _phrase_lemmas_learned.get(language) == version:
+        return
+    # marked up front so concurrent callers and failures do not start it again for this schema
+    _phrase_lemmas_learned[language] = version
+    phrases = tokenizer_stanza.phrases_missing_lemmas(language)
+    if not phrases:
+        return
+    try:
+        parsed = await parse_texts(phrases, language)
+    except Exception as e:
+        print(f"[WARN] Could not lemmatize schema phrases for '{language}': {e}")
+        return
+    tokenizer_stanza.set_phrase_lemmas(language, phrases, [lemmas for _, lemmas in parsed])
+    print(f"[INFO] Lemmatized {len(phrases)} schema phrases for '{language}'")
+
+def _ensure_phrase_lemmas(language):
+    if _phrase_lemmas_learned.get(language) != tokenizer_stanza.schema_version():
+        asyncio.ensure_future(learn_schema_phrase_lemmas(language))
+
+def batcher_stats():
+    if TOKENIZE_BATCH_WAIT_MS <= 0:
+        return {"enabled": False}
+    return dict(get_batcher().stats(), enabled=True)
+
+async def tokenize_async(text, language=None):
+    """
+    tokenize() without blocking the event loop. Concurrent callers are
+    micro-batched into one multi-document stanza call per language; questions
+    whose every word is in the lemma cache skip stanza altogether.
+    """
+    language = language or tokenizer_stanza.lang
+    _ensure_phrase_lemmas(language)
+    cached = _cached_parse(text, language)
+    if cached is not None:
+        return _build_token_result(text, *cached, language=language)
+    if TOKENIZE_BATCH_WAIT_MS > 0:
+        pos_tags, lemmas = await get_batcher().submit((text, language))
+    else:
+        (pos_tags, lemmas), = await parse_texts([text], language)
+    _learn(text, language, pos_tags, lemmas)
+    return _build_token_result(text, pos_tags, lemmas, language=language)
+
+async def tokenize_batch_async(texts, language=None):
+    if not texts:
+        return []
+    language = language or tokenizer_stanza.lang
+    _ensure_phrase_lemmas(language)
+    parsed = [_cached_parse(text, language) for text in texts]
+    misses = [i for i, result in enumerate(parsed) if result is None]
+    if misses:
+        fresh = await parse_texts([texts[i] for i in misses], language)
+        for i, (pos_tags, lemmas) in zip(misses, fresh):
+            parsed[i] = (pos_tags, lemmas)
+            _learn(texts[i], language, pos_tags, lemmas)
+    return [
+        _build_token_result(text, pos_tags, lemmas, language=language)
+        for text, (pos_tags, lemmas) in zip(texts, parsed)
+    ]
@@ -1,10 +1,11 @@
+import os
 import re
-import stanza
-import nltk
+import threading
 import json
-from nltk.corpus import stopwords
+from collections import OrderedDict
+from NLP_pipeline.phrase_trie import PhraseTrie
 
-nltk.download('stopwords')
+# stanza (torch) and nltk are imported lazily by init() so importing this module stays cheap
 
 lang = "en"
 
@@ -15,9 +16,25 @@ SCHEMA_MAP = {
     "table_to_columns": {},
     "column_to_table_db": {},
 }
+_schema_version = 0
+
+def schema_version():
+    """Bumped by every load_schema(); caches derived from the schema rebuild when it changes"""
+    return _schema_version
+
+def load_schema(path="plugin_schema.json"):
+    """
+    (Re)build SCHEMA_PHRASES and SCHEMA_MAP from the schema JSON. The containers
+    are updated in place because other modules hold references to them.
+    """
+    global _schema_version
+    with open(path, "r") as f:
+        plugin_data = json.load(f)
+
+    SCHEMA_PHRASES.clear()
+    for mapping in SCHEMA_MAP.values():
+        mapping.clear()
 
-with open("plugin_schema.json", "r") as f:
-    plugin_data = json.load(f)
     for db in plugin_data["databases"]:
         db_name = db["name"].lower()
         SCHEMA_PHRASES.add(db_name)
@@ -35,23 +52,168 @@ with open("plugin_schema.json", "r") as f:
                 SCHEMA_PHRASES.add(col_name)
                 SCHEMA_MAP["table_to_columns"][table_name].append(col_name)
                 SCHEMA_MAP["column_to_table_db"][col_name] = (db_name, table_name)
+    _schema_version += 1
+
+load_schema()
+
+# languages a request may ask for, and how much model memory the loaded pipelines may use
+SUPPORTED_LANGUAGES = tuple(l.strip() for l in os.environ.get("CONVERSQL_NLP_LANGUAGES", "en,hi").split(",") if l.strip())
+PIPELINE_MEMORY_BUDGET_MB = float(os.environ.get("CONVERSQL_NLP_MEMORY_BUDGET_MB", "2048"))
+
+_READY = threading.Event()
+_init_error = None
 
 def get_pipeline(language):
-    return stanza.Pipeline(language, processors='tokenize,pos,lemma')
+    import stanza
+    # download_method=None: never fetch models at runtime, use what install_stanza_components.py put on disk
+    return stanza.Pipeline(language, processors='tokenize,pos,lemma', download_method=None)
+
+def _load_stopwords(language):
+    if language == "hi":
+        return set()
+    from nltk.corpus import stopwords
+    return set(stopwords.words('english'))
+
+_stopwords_by_language = {}
+
+def stopwords_for(language):
+    """Stopwords are loaded apart from the stanza pipeline so tokenizer workers' parents need no models"""
+    stopword_set = _stopwords_by_language.get(language)
+    if stopword_set is None:
+        stopword_set = _stopwords_by_language.setdefault(language, _load_stopwords(language))
+    return stopword_set
+
+def _resources_dir():
+    import stanza
+    return os.environ.get("STANZA_RESOURCES_DIR", stanza.resources.common.DEFAULT_MODEL_DIR)
+
+def _model_size_mb(language):
+    """On-disk size of a language's stanza models, used as its memory estimate"""
+    total = 0
+    for root, _, files in os.walk(os.path.join(_resources_dir(), language)):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total / (1024 * 1024)
+
+def verify_artifacts(language=None):
+    """Names of offline NLP resources missing for a language (empty when all are installed)"""
+    language = language or lang
+    missing = []
+    resources_dir = _resources_dir()
+    if not os.path.isdir(os.path.join(resources_dir, language)):
+        missing.append(f"stanza models for '{language}' in {resources_dir} (run NLP_pipeline/install_stanza_components.py)")
+    if language != "hi":
+        import nltk
+        try:
+            nltk.data.find("corpora/stopwords")
+        except LookupError:
+            missing.append("nltk stopwords corpus (run NLP_pipeline/install_nltk_components.py)")
+    return missing
+
+class _LoadedPipeline:
+    def __init__(self, language, pipeline, size_mb):
+        self.language = language
+        self.pipeline = pipeline
+        self.size_mb = size_mb
+        # one stanza pipeline is not safe to call from several threads at once
+        self.lock = threading.Lock()
+
+class PipelinePool:
+    """
+    Loaded stanza pipelines keyed by language, kept under a memory budget with
+    LRU eviction. Each language is built at most once at a time, and different
+    languages can parse concurrently.
+    """
+    def __init__(self, budget_mb: float = PIPELINE_MEMORY_BUDGET_MB):
+        self.budget_mb = budget_mb
+        self._loaded = OrderedDict()
+        self._lock = threading.Lock()
+        self._build_locks = {}
+        self.loads = 0
+        self.evictions = 0
+
+    def get(self, language):
+        with self._lock:
+            entry = self._loaded.get(language)
+            if entry is not None:
+                self._loaded.move_to_end(language)
+                return entry
+            build_lock = self._build_locks.setdefault(language, threading.Lock())
+        with build_lock:
+            with self._lock:
+                entry = self._loaded.get(language)
+                if entry is not None:
+                    return entry
+            missing = verify_artifacts(language)
+            if missing:
+                raise RuntimeError("Missing NLP resources: " + "; ".join(missing))
+            entry = _LoadedPipeline(language, get_pipeline(language), _model_size_mb(language))
+            with self._lock:
+                self._loaded[language] = entry
+                self.loads += 1
+                self._evict(keep=language)
+            print(f"[INFO] Loaded stanza pipeline '{language}' (~{entry.size_mb:.0f}MB)")
+            return entry
+
+    def _evict(self, keep):
+        # callers still holding an evicted pipeline finish with it; it is freed afterwards
+        while sum(e.size_mb for e in self._loaded.values()) > self.budget_mb and len(self._loaded) > 1:
+            oldest = next(iter(self._loaded))
+            if oldest == keep:
+                break
+            del self._loaded[oldest]
+            self.evictions += 1
+            print(f"[INFO] Evicted stanza pipeline '{oldest}' to stay under {self.budget_mb:.0f}MB")
 
-nlp = get_pipeline(lang)
+    def stats(self):
+        with self._lock:
+            return {
+                "loaded": list(self._loaded),
+                "memory_mb": round(sum(e.size_mb for e in self._loaded.values()), 1),
+                "budget_mb": self.budget_mb,
+                "loads": self.loads,
+                "evictions": self.evictions,
+            }
+
+pipelines = PipelinePool()
+
+def init(language=None):
+    """
+    Load the pipeline and stopwords for a language (the default one if not
+    given). Safe to call from several threads; each pipeline is built once.
+    """
+    global _init_error
+    try:
+        language = language or lang
+        pipelines.get(language)
+        stopwords_for(language)
+    except Exception as e:
+        _init_error = e
+        raise
+    _init_error = None
+    _READY.set()
+
+def init_in_background():
+    """Warm the pipeline on a daemon thread; is_ready() flips once it is loaded"""
+    def _warm():
+        try:
+            init()
+        except Exception as e:
+            print(f"[ERROR] NLP warm-up failed: {e}")
+    thread = threading.Thread(target=_warm, name="nlp-warmup", daemon=True)
+    thread.start()
+    return thread
+
+def is_ready():
+    return _READY.is_set()
+
+def init_error():
+    return str(_init_error) if _init_error else None
 
 def set_language(new_lang):
-    global lang, nlp, STOPWORDS
+    """Change the default language used when a caller does not pass one"""
+    global lang
+    init(new_lang)
     lang = new_lang
-    nlp = get_pipeline(lang)
-    if lang == "hi":
-        STOPWORDS = set()
-    else:
-        STOPWORDS = set(stopwords.words('english'))
-
-set_language(lang)
-STOPWORDS = set(stopwords.words('english'))
 
 POS_TAGS_MAP = {
     'NN': 'Noun (Singular)', 'NNS': 'Noun (Plural)',
@@ -70,8 +232,7 @@ def base_tokenize(text):
     text = text.lower()
     return re.findall(r'\b\w+\b', text)
 
-def stanza_tokenize(text):
-    doc = nlp(text)
+def _doc_to_tokens(doc):
     tokens, pos_tags, lemmas = [], [], []
     for sent in doc.sentences:
         for word in sent.words:
@@ -80,37 +241,93 @@ def stanza_tokenize(text):
             lemmas.append(word.text.lower() if word.xpos in ('NNP', 'NNPS') else word.lemma.lower())
     return tokens, pos_tags, lemmas
 
-def combine_schema_tokens(tokens):
-    combined = []
-    i = 0
-    max_len = 6
-    while i < len(tokens):
-        match = False
-        for j in range(max_len, 0, -1):
-            if i + j <= len(tokens):
-                phrase = " ".join(tokens[i:i + j])
-                if phrase in SCHEMA_PHRASES:
-                    combined.append(phrase)
-                    i += j
-                    match = True
-                    break
-        if not match:
-            combined.append(tokens[i])
-            i += 1
-    return combined
-
-def remove_stopwords(tokens):
-    return [t for t in tokens if t not in STOPWORDS or t in SCHEMA_PHRASES]
+def stanza_tokenize(text, language=None):
+    entry = pipelines.get(language or lang)
+    with entry.lock:
+        doc = entry.pipeline(text)
+    return _doc_to_tokens(doc)
+
+def stanza_tokenize_batch(texts, language=None):
+    """Parse several texts in one multi-document stanza call"""
+    if not texts:
+        return []
+    import stanza
+    entry = pipelines.get(language or lang)
+    in_docs = [stanza.Document([], text=t) for t in texts]
+    with entry.lock:
+        out_docs = entry.pipeline(in_docs)
+    return [_doc_to_tokens(doc) for doc in out_docs]
+
+# language -> {schema phrase: its lemma tokens}, filled by tokenizer_pool.learn_schema_phrase_lemmas
+_phrase_lemmas = {}
+# language -> bumped whenever set_phrase_lemmas changes what the trie would match
+_phrase_generation = {}
+# language -> (phrase_version, PhraseTrie)
+_phrase_tries = {}
+_phrase_lock = threading.Lock()
+
+def phrases_missing_lemmas(language=None):
+    known = _phrase_lemmas.get(language or lang, {})
+    return sorted(p for p in SCHEMA_PHRASES if p not in known)
+
+def set_phrase_lemmas(language, phrases, lemma_lists):
+    """Record how the lemmatizer reads each schema phrase; the trie picks them up on next use"""
+    with _phrase_lock:
+        known = _phrase_lemmas.setdefault(language, {})
+        changed = False
+        for phrase, lemmas in zip(phrases, lemma_lists):
+            if known.get(phrase) != tuple(lemmas):
+                known[phrase] = tuple(lemmas)
+                changed = True
+        if changed:
+            _phrase_generation[language] = _phrase_generation.get(language, 0) + 1
+
+def phrase_version(language=None):
+    """
+    Changes whenever combine_schema_tokens may combine the same lemmas
+    differently: on a schema reload and when phrase lemmas are learned.
+    Caches of anything derived from combined tokens key on it.
+    """
+    return (_schema_version, _phrase_generation.get(language or lang, 0))
+
+def phrase_trie(language=None):
+    """Trie of the schema phrases as written and, once learned, as lemmatized; rebuilt on schema or lemma changes"""
+    language = language or lang
+    cached = _phrase_tries.get(language)
+    if cached and cached[0] == phrase_version(language):
+        return cached[1]
+    with _phrase_lock:
+        version = phrase_version(language)
+        lemmas = dict(_phrase_lemmas.get(language, {}))
+        trie = PhraseTrie()
+        for phrase in sorted(SCHEMA_PHRASES):
+            lemma_tokens = lemmas.get(phrase)
+            if lemma_tokens:
+                trie.add(lemma_tokens, phrase, replace=False)
+        # a phrase as written always wins over another phrase's lemmatized form
+        for phrase in sorted(SCHEMA_PHRASES):
+            parts = phrase.split(" ")
+            if all(parts):
+                trie.add(parts, phrase)
+        _phrase_tries[language] = (version, trie)
+        return trie
+
+def combine_schema_tokens(tokens, language=None):
+    """Merge runs of (lemmatized) tokens that spell a schema phrase into that phrase"""
+    return phrase_trie(language).combine(tokens)
+
+def remove_stopwords(tokens, language=None):
+    stopword_set = stopwords_for(language or lang)
+    return [t for t in tokens if t not in stopword_set or t in SCHEMA_PHRASES]
 
 def expand_pos_tags(pos_tags):
     return [(token, POS_TAGS_MAP.get(tag, tag)) for token, tag in pos_tags]
 
-def tokenize(text):
+def _build_token_result(text, pos_tags, lemmas, language=None):
     base_tokens = base_tokenize(text)
-    tokens, pos_tags, lemmas = stanza_tokenize(text)
     expanded_pos = expand_pos_tags(pos_tags)
-    combined = combine_schema_tokens(lemmas)
-    filtered = remove_stopwords(combined)
+    combined = combine_schema_tokens(lemmas, language)
+    filtered = remove_stopwords(combined, language)
     return {
         "Base Tokens": base_tokens,
         "POS Tags": expanded_pos,
@@ -118,3 +335,15 @@ def tokenize(text):
         "Schema Combined": combined,
         "Final Tokens": filtered
     }
+
+def tokenize(text, language=None):
+    tokens, pos_tags, lemmas = stanza_tokenize(text, language)
+    return _build_token_result(text, pos_tags, lemmas, language)
+
+def tokenize_batch(texts, language=None):
+    """tokenize() for a list of texts, sharing a single stanza pass"""
+    parsed = stanza_tokenize_batch(texts, language)
+    return [
+        _build_token_result(text, pos_tags, lemmas, language)
+        for text, (tokens, pos_tags, lemmas) in zip(texts, parsed)
+    ]
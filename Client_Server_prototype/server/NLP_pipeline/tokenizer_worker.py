@@ -0,0 +1,56 @@
+import os
+import sys
+import pickle
+
+# Entry module of a tokenizer worker process, started by tokenizer_pool as
+# `python -m NLP_pipeline.tokenizer_worker INDEX [CPU]`, so nothing of the
+# server's own __main__ runs in it. It imports nothing but tokenizer_stanza.
+from NLP_pipeline import tokenizer_stanza
+
+def init_worker(cpu=None):
+    """Runs once in each worker process: pin it to a CPU, then load stanza"""
+    if cpu is not None and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, {cpu})
+    # parallelism comes from the worker count; keep torch from oversubscribing cores inside each one
+    import torch
+    torch.set_num_threads(1)
+    tokenizer_stanza.init()
+
+def parse(texts, language=None):
+    """Only POS tags and lemmas cross the process boundary; schema combining happens in the server"""
+    return [(pos_tags, lemmas) for _, pos_tags, lemmas in tokenizer_stanza.stanza_tokenize_batch(texts, language)]
+
+def main(argv=None):
+    """
+    Warm up, report ("ready", pid), then answer each pickled (texts, language)
+    request on stdin with ("ok", parsed) or ("error", message) until stdin closes
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    cpu = int(argv[1]) if len(argv) > 1 else None
+    # replies own the real stdout; anything the libraries print goes to stderr instead
+    replies = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    requests = sys.stdin.buffer
+
+    def reply(message):
+        pickle.dump(message, replies)
+        replies.flush()
+
+    try:
+        init_worker(cpu)
+    except Exception as e:
+        reply(("error", f"{type(e).__name__}: {e}"))
+        return 1
+    reply(("ready", os.getpid()))
+    while True:
+        try:
+            texts, language = pickle.load(requests)
+        except EOFError:
+            return 0
+        try:
+            reply(("ok", parse(texts, language)))
+        except Exception as e:
+            reply(("error", f"{type(e).__name__}: {e}"))
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,5 @@
 import re
+from bisect import bisect_left, bisect_right
 from typing import List, Tuple
 
 # Regex patterns
@@ -34,88 +35,174 @@ VALUE_REGEX = re.compile(
     flags=re.IGNORECASE
 )
 
+# Compiled once; each VALUE_REGEX hit is classified by the first of these that fullmatches it
+VALUE_TYPE_PATTERNS = [
+    ("FLOAT", re.compile(FLOAT_PATTERN)),
+    ("INTEGER", re.compile(INTEGER_PATTERN)),
+    ("BOOLEAN", re.compile(BOOLEAN_PATTERN, re.IGNORECASE)),
+    ("STRING", re.compile(STRING_PATTERN)),
+] + [("DATE", re.compile(pat, re.IGNORECASE)) for pat in DATE_PATTERNS]
+
+UNQUOTED_STRING_GROUPS = ["proper_noun", "code", "mixed_identifier", "word"]
+
+# Every value pattern in one scan: at each token start the named lookahead groups hold what
+# VALUE_REGEX and each unquoted pattern would match there. Every match of those patterns starts
+# at a word, a quote or a '-', and no token skips past such a start, so replaying each group
+# left to right gives exactly the matches its own finditer would have found.
+VALUE_SCAN_REGEX = re.compile(
+    r"(?=[\w'\"-])"
+    + "(?=(?P<value>(?i:" + VALUE_REGEX.pattern + "))|)"
+    + "".join(f"(?=(?P<{name}>{pat})|)" for name, pat in zip(UNQUOTED_STRING_GROUPS, UNQUOTED_STRING_PATTERNS))
+    + r"(?:\w+|['\"-])"
+)
+VALUE_SCAN_GROUPS = ["value"] + UNQUOTED_STRING_GROUPS
+VALUE_SCAN_GROUP_NUMBERS = [VALUE_SCAN_REGEX.groupindex[name] for name in VALUE_SCAN_GROUPS]
+
+# Words that suggest the following word is a value. 'named', 'values' and 'equals'
+# are covered by their prefixes, and every "name Apophis"-style phrase contains one of these.
+# No indicator is a prefix of another, so one lookahead hit per position finds them all, overlaps included.
+VALUE_INDICATORS = ['name', 'called', 'title', 'with', 'value', 'equal', '=', 'set', 'to', 'as', 'is']
+VALUE_INDICATOR_REGEX = re.compile("|".join(re.escape(i) for i in VALUE_INDICATORS))
+VALUE_INDICATOR_STARTS = re.compile("(?=(" + "|".join(re.escape(i) for i in VALUE_INDICATORS) + "))")
+CONTEXT_WINDOW = 20
+
+def _lower_same_length(text: str) -> str:
+    """text.lower(), keeping characters whose lower case is longer so offsets still line up"""
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return "".join(c.lower() if len(c.lower()) == 1 else c for c in text)
+
 def is_likely_value_context(text: str, match_start: int, match_end: int) -> bool:
     """
-    Determine if a word appears in a context where it's likely to be a value
+    Determine if a word appears in a context where it's likely to be a value:
+    a value indicator within the 20 characters before it
     """
-    # Get surrounding context (20 chars before and after)
-    context_start = max(0, match_start - 20)
-    context_end = min(len(text), match_end + 20)
-    
-    # Value indicators - words that suggest the following word is a value
-    value_indicators = [
-        'name', 'called', 'named', 'title', 'with', 'values', 'value',
-        'equals', 'equal', '=', 'set', 'to', 'as', 'is'
-    ]
-    
-    # Check if any value indicator appears before our match
-    before_match = text[context_start:match_start].lower()
-    for indicator in value_indicators:
-        if indicator in before_match:
-            return True
-    
-    # Check for patterns like "name Apophis", "called Jupiter", etc.
-    word_before_patterns = [
-        r'\b(?:name|called|named|title)\s+$',
-        r'\bwith\s+(?:name\s+)?$',
-        r'\bvalues?\s+$',
-        r'\bequals?\s+$',
-        r'\bset\s+\w+\s+(?:to\s+)?$'
-    ]
-    
-    for pattern in word_before_patterns:
-        if re.search(pattern, before_match):
-            return True
-    
-    return False
+    before_match = text[max(0, match_start - CONTEXT_WINDOW):match_start].lower()
+    return VALUE_INDICATOR_REGEX.search(before_match) is not None
+
+class ValueContext:
+    """
+    Every value-indicator occurrence in a text, found in one scan, so each
+    candidate word is checked with a bisect instead of re-scanning its window.
+    """
+    def __init__(self, text: str):
+        self.starts = []
+        ends = []
+        for m in VALUE_INDICATOR_STARTS.finditer(_lower_same_length(text)):
+            self.starts.append(m.start())
+            ends.append(m.start() + len(m.group(1)))
+        # earliest end among the indicators starting at or after each position
+        for i in range(len(ends) - 2, -1, -1):
+            if ends[i + 1] < ends[i]:
+                ends[i] = ends[i + 1]
+        self.min_end_from = ends
+
+    def before(self, match_start: int) -> bool:
+        """Same answer as is_likely_value_context for a match starting at match_start"""
+        i = bisect_left(self.starts, match_start - CONTEXT_WINDOW)
+        return i < len(self.starts) and self.min_end_from[i] <= match_start
+
+class CoveredSpans:
+    """Sorted, merged character spans already claimed by a value"""
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+
+    def covers(self, pos: int) -> bool:
+        i = bisect_right(self.starts, pos) - 1
+        return i >= 0 and pos < self.ends[i]
+
+    def add(self, lo: int, hi: int):
+        if lo >= hi:
+            return
+        # merge with every span that overlaps or touches [lo, hi)
+        first = bisect_left(self.ends, lo)
+        last = bisect_right(self.starts, hi)
+        if first < last:
+            lo = min(lo, self.starts[first])
+            hi = max(hi, self.ends[last - 1])
+        self.starts[first:last] = [lo]
+        self.ends[first:last] = [hi]
+
+def _classify_value(raw: str):
+    for typ, pattern in VALUE_TYPE_PATTERNS:
+        if pattern.fullmatch(raw):
+            return typ
+    return None
+
+def _scan_spans(text: str) -> dict:
+    """Each pattern's non-overlapping matches, leftmost first, as finditer would give them"""
+    found = [[] for _ in VALUE_SCAN_GROUPS]
+    ends = [0] * len(VALUE_SCAN_GROUPS)
+    for m in VALUE_SCAN_REGEX.finditer(text):
+        for i, group in enumerate(VALUE_SCAN_GROUP_NUMBERS):
+            # unmatched groups start at -1; a pattern resumes after its previous match,
+            # so a start inside that match is not one of its own
+            lo = m.start(group)
+            if lo >= ends[i]:
+                hi = m.end(group)
+                found[i].append((lo, hi))
+                ends[i] = hi
+    return dict(zip(VALUE_SCAN_GROUPS, found))
 
 def value_entity_recognizer(text: str) -> List[Tuple[str, str, int, int]]:
     results: List[Tuple[str, str, int, int]] = []
+    covered = CoveredSpans()
+    spans = _scan_spans(text)
     
-    # First pass: Find quoted strings, numbers, dates, booleans
-    for m in VALUE_REGEX.finditer(text):
-        raw = m.group(0)
-        lo, hi = m.span()
-        raw_clean = raw.strip()
-        
-        if re.fullmatch(FLOAT_PATTERN, raw_clean):
-            typ = "FLOAT"
-        elif re.fullmatch(INTEGER_PATTERN, raw_clean):
-            typ = "INTEGER"
-        elif re.fullmatch(BOOLEAN_PATTERN, raw_clean, flags=re.IGNORECASE):
-            typ = "BOOLEAN"
-        elif re.fullmatch(STRING_PATTERN, raw_clean):
-            typ = "STRING"
-            raw_clean = raw_clean[1:-1]  # Remove quotes
-        elif any(re.fullmatch(pat, raw_clean, flags=re.IGNORECASE) for pat in DATE_PATTERNS):
-            typ = "DATE"
-        else:
+    # Quoted strings, numbers, dates, booleans
+    for lo, hi in spans["value"]:
+        raw_clean = text[lo:hi].strip()
+
+        typ = _classify_value(raw_clean)
+        if typ is None:
             continue
+        if typ == "STRING":
+            raw_clean = raw_clean[1:-1]  # Remove quotes
         
         results.append((typ, raw_clean, lo, hi))
+        covered.add(lo, hi)
     
-    # Second pass: Find unquoted string values (names, identifiers, etc.)
-    for pattern in UNQUOTED_STRING_PATTERNS:
-        for match in re.finditer(pattern, text):
-            word = match.group(0)
-            lo, hi = match.span()
-            
+    # Unquoted string values (names, identifiers, etc.).
+    # Patterns are resolved in order because an earlier pattern's word wins an overlap with a later one.
+    context = None
+    for name in UNQUOTED_STRING_GROUPS:
+        for lo, hi in spans[name]:
             # Skip if it's too short (likely not a meaningful value)
-            if len(word) < 2:
+            if hi - lo < 2:
                 continue
             
+            # Avoid duplicates: a word may not start or end inside a value already found
+            if covered.covers(lo) or covered.covers(hi - 1):
+                continue
+
             # Check if this word appears in a value context
-            if is_likely_value_context(text, lo, hi):
-                # Avoid duplicates from first pass
-                if not any(existing_lo <= lo < existing_hi or existing_lo < hi <= existing_hi
-                          for _, _, existing_lo, existing_hi in results):
-                    results.append(("STRING", word, lo, hi))
+            if context is None:
+                context = ValueContext(text)
+            if context.before(lo):
+                results.append(("STRING", text[lo:hi], lo, hi))
+                covered.add(lo, hi)
     
     # Sort results by position in text
     results.sort(key=lambda x: x[2])
     
     return results
 
+INSERT_VALUE_REGEXES = [re.compile(pat, re.IGNORECASE) for pat in [
+    # Pattern: "name Apophis" -> extract "Apophis"
+    r'\b(?:name|title|called|named)\s+([A-Za-z][A-Za-z0-9\s\-_]*?)(?:\s+(?:and|with|magnitude|mass|distance|radius)\b|$)',
+    
+    # Pattern: "with Apophis" -> extract "Apophis" 
+    r'\bwith\s+([A-Za-z][A-Za-z0-9\s\-_]*?)(?:\s+(?:and|magnitude|mass|distance|radius)\b|$)',
+    
+    # Pattern: "values Apophis and 19.7" -> extract "Apophis"
+    r'\bvalues?\s+([A-Za-z][A-Za-z0-9\s\-_]*?)(?:\s+(?:and|with)\b|$)',
+    
+    # Pattern: "Apophis and magnitude" -> extract "Apophis"
+    r'\b([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)\s+(?:and|with)\s+(?:magnitude|mass|distance|radius|absolute)',
+]]
+
 # Enhanced function for INSERT query context
 def extract_insert_values(text: str, columns: List[str]) -> List[Tuple[str, str, int, int]]:
     """
@@ -126,27 +213,13 @@ def extract_insert_values(text: str, columns: List[str]) -> List[Tuple[str, str,
     
     # For INSERT queries, try to be more aggressive about finding string values
     # Look for patterns like "name Apophis", "title Mars Mission", etc.
-    insert_value_patterns = [
-        # Pattern: "name Apophis" -> extract "Apophis"
-        r'\b(?:name|title|called|named)\s+([A-Za-z][A-Za-z0-9\s\-_]*?)(?:\s+(?:and|with|magnitude|mass|distance|radius)\b|$)',
-        
-        # Pattern: "with Apophis" -> extract "Apophis" 
-        r'\bwith\s+([A-Za-z][A-Za-z0-9\s\-_]*?)(?:\s+(?:and|magnitude|mass|distance|radius)\b|$)',
-        
-        # Pattern: "values Apophis and 19.7" -> extract "Apophis"
-        r'\bvalues?\s+([A-Za-z][A-Za-z0-9\s\-_]*?)(?:\s+(?:and|with)\b|$)',
-        
-        # Pattern: "Apophis and magnitude" -> extract "Apophis"
-        r'\b([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)\s+(?:and|with)\s+(?:magnitude|mass|distance|radius|absolute)',
-    ]
-    
-    for pattern in insert_value_patterns:
-        for match in re.finditer(pattern, text, re.IGNORECASE):
+    seen_values = {value for _, value, _, _ in all_values}
+    for regex in INSERT_VALUE_REGEXES:
+        for match in regex.finditer(text):
             value = match.group(1).strip()
-            if (len(value) > 1 and
-                not any(existing_value == value for _, existing_value, _, _ in all_values)):
-                
+            if len(value) > 1 and value not in seen_values:
                 all_values.append(("STRING", value, match.start(1), match.end(1)))
+                seen_values.add(value)
     
     # Sort by position and return
     all_values.sort(key=lambda x: x[2])
@@ -0,0 +1,99 @@
+import threading
+from mysql.connector import Error
+from .query_verifier import get_pooled_connection
+from .select_builder import parse_select
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+_primary_keys = {}
+_primary_keys_lock = threading.Lock()
+
+def get_primary_key(database: str, table: str, host, user, password):
+    """
+    Single-column primary key of a table, looked up once per table.
+    Returns None for tables without one (composite keys are not used for paging).
+    """
+    cache_key = (database.lower(), table.lower())
+    with _primary_keys_lock:
+        if cache_key in _primary_keys:
+            return _primary_keys[cache_key]
+
+    conn = None
+    key = None
+    try:
+        conn = get_pooled_connection(host, user, password)
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT COLUMN_NAME FROM information_schema.KEY_COLUMN_USAGE "
+            "WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s AND CONSTRAINT_NAME = 'PRIMARY' "
+            "ORDER BY ORDINAL_POSITION",
+            (database, table)
+        )
+        columns = [row[0] for row in cur.fetchall()]
+        cur.close()
+        key = columns[0] if len(columns) == 1 else None
+    except Error as e:
+        print(f"[ERROR] Primary key lookup failed for {database}.{table}: {e}")
+        return None
+    finally:
+        if conn and conn.is_connected():
+            conn.close()
+
+    with _primary_keys_lock:
+        _primary_keys[cache_key] = key
+    return key
+
+def clear_primary_key_cache():
+    with _primary_keys_lock:
+        _primary_keys.clear()
+
+def build_keyset_query(sql: str, key: str, has_cursor: bool):
+    """
+    Rewrite a generated SELECT into 'WHERE ... AND key > %s ORDER BY key LIMIT %s'.
+    The key column is appended to the select list so the last row's key can be read back.
+    """
+    parts = parse_select(sql)
+    if not parts:
+        return None
+    # literals already inlined by the builder must not be read as parameter markers
+    conditions = [f"({parts['where'].replace('%', '%%')})"] if parts["where"] else []
+    if has_cursor:
+        conditions.append(f"`{key}` > %s")
+    where_clause = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    return (
+        f"SELECT {parts['select'].replace('%', '%%')}, `{key}` FROM `{parts['db']}`.`{parts['table']}`"
+        f"{where_clause} ORDER BY `{key}` LIMIT %s"
+    )
+
+def fetch_page(sql: str, key: str, after, page_size: int, host, user, password, database=None):
+    """
+    Fetch one page of a generated SELECT in primary-key order, starting after
+    the key value `after` (None for the first page).
+    Returns (success, (columns, rows, last_key)) where last_key is None on the final page,
+    or (False, error_message).
+    """
+    keyset_sql = build_keyset_query(sql, key, after is not None)
+    if keyset_sql is None:
+        return False, "Query cannot be paged."
+    # one extra row tells us whether another page exists without a COUNT
+    params = ([after] if after is not None else []) + [page_size + 1]
+
+    conn = None
+    try:
+        conn = get_pooled_connection(host, user, password, database)
+        cur = conn.cursor()
+        cur.execute(keyset_sql, params)
+        columns = list(cur.column_names)[:-1]
+        rows = cur.fetchall()
+        cur.close()
+    except Error as e:
+        return False, str(e)
+    finally:
+        if conn and conn.is_connected():
+            conn.close()
+
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    last_key = rows[-1][-1] if has_more else None
+    return True, (columns, [row[:-1] for row in rows], last_key)
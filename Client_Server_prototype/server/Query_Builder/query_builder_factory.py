@@ -13,9 +13,10 @@ def is_destructive_operation(intent):
     return any(destructive_intent in intent for destructive_intent in destructive_intents)
 
 def build_query(intent, schema_entities, operators, values,
-                db_host='localhost', db_user='root', db_pass='root'):
+                db_host='localhost', db_user='root', db_pass='root', preview_limit=None):
     """
-    Enhanced query builder factory that routes to appropriate builder based on intent
+    Enhanced query builder factory that routes to appropriate builder based on intent.
+    preview_limit is pushed into SELECT queries as a LIMIT; other builders ignore it.
     """
     print(f"[DEBUG] Query Builder Factory - Intent: {intent}")
     print(f"[DEBUG] Schema entities: {schema_entities}")
@@ -42,7 +43,7 @@ def build_query(intent, schema_entities, operators, values,
     else:
         # Default to SELECT builder for all other cases
         builder = SelectQueryBuilder()
-        return builder.build_query(intent, schema_entities, operators, values)
+        return builder.build_query(intent, schema_entities, operators, values, preview_limit=preview_limit)
 
 # Export test queries for all builders
 from .test_queries import ALL_TEST_QUERIES
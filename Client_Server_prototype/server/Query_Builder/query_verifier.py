@@ -1,5 +1,34 @@
+import threading
 import mysql.connector
-from mysql.connector import Error
+from mysql.connector import Error, pooling
+from .select_builder import build_count_query, strip_preview_limit
+
+POOL_SIZE = 8
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_pooled_connection(host, user, password, database=None):
+    """
+    Borrow a connection from a per-database pool; close() hands it back.
+    Falls back to a direct connection when the pool is exhausted.
+    """
+    key = (host, user, database)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = pooling.MySQLConnectionPool(
+                pool_name=f"conversql_{database or 'server'}_{len(_pools)}",
+                pool_size=POOL_SIZE,
+                host=host, user=user, password=password, database=database
+            )
+            _pools[key] = pool
+    try:
+        return pool.get_connection()
+    except pooling.PoolError:
+        return mysql.connector.connect(
+            host=host, user=user, password=password, database=database
+        )
 
 def verify_query(sql, host, user, password, database=None):
     """
@@ -7,9 +36,7 @@ def verify_query(sql, host, user, password, database=None):
     """
     conn = None
     try:
-        conn = mysql.connector.connect(
-            host=host, user=user, password=password, database=database
-        )
+        conn = get_pooled_connection(host, user, password, database)
         cur = conn.cursor()
         
         # Check if it's a destructive operation
@@ -42,6 +69,70 @@ def verify_query(sql, host, user, password, database=None):
         if conn and conn.is_connected():
             conn.close()
 
+def stream_query(sql, host, user, password, database=None, batch_size=500):
+    """
+    Execute a read-only query on an unbuffered (server-side) cursor and yield
+    the column names followed by row batches, so the full result set is
+    never held in memory. Rows are only fetched as the consumer asks for them.
+    """
+    sql_upper = sql.upper().strip()
+    if any(sql_upper.startswith(op) for op in ['INSERT', 'UPDATE', 'DELETE', 'DROP', 'TRUNCATE', 'ALTER', 'CREATE']):
+        raise ValueError("Streaming is only supported for read queries")
+
+    # a dedicated connection: an abandoned unbuffered result would poison a pooled one
+    conn = mysql.connector.connect(
+        host=host, user=user, password=password, database=database
+    )
+    cur = None
+    try:
+        cur = conn.cursor(buffered=False)
+        cur.execute(sql)
+        yield list(cur.column_names)
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        if cur is not None:
+            try:
+                cur.close()
+            except Error:
+                # closing with unread rows left (client went away) is expected
+                pass
+        if conn.is_connected():
+            conn.close()
+
+def count_rows(sql, host, user, password, database=None, exact=True):
+    """
+    Total rows a generated SELECT would return, without fetching them.
+    exact=True runs a separate COUNT(*); otherwise the optimizer's EXPLAIN
+    estimate (rows * filtered%) is used, which costs no table scan.
+    Returns (success, count_or_error).
+    """
+    conn = None
+    try:
+        conn = get_pooled_connection(host, user, password, database)
+        cur = conn.cursor(dictionary=True)
+        if exact:
+            count_sql = build_count_query(sql)
+            if count_sql is None:
+                return False, "Query does not return rows."
+            cur.execute(count_sql)
+            count = list(cur.fetchone().values())[0]
+        else:
+            cur.execute(f"EXPLAIN {strip_preview_limit(sql).rstrip(';')}")
+            plan = cur.fetchall()
+            first = plan[0] if plan else {}
+            count = int((first.get("rows") or 0) * float(first.get("filtered") or 100.0) / 100.0)
+        cur.close()
+        return True, int(count)
+    except Error as e:
+        return False, str(e)
+    finally:
+        if conn and conn.is_connected():
+            conn.close()
+
 def verify_query_safe_mode(sql, host, user, password, database=None):
     """
     Safe mode query verifier - only allows SELECT operations
@@ -20,6 +20,36 @@ OPERATOR_MAP = {
     "<=": "<=",
 }
 
+# matches the plain SELECT statements produced by SelectQueryBuilder.build_query
+SELECT_PATTERN = re.compile(
+    r"^SELECT (?P<select>.+?) FROM `(?P<db>[^`]+)`\.`(?P<table>[^`]+)`(?: WHERE (?P<where>.+?))?(?: LIMIT (?P<limit>\d+))?;?$",
+    re.DOTALL
+)
+AGGREGATE_SELECT_PATTERN = re.compile(r"^(COUNT|AVG|SUM|MIN|MAX)\(", re.IGNORECASE)
+
+def parse_select(sql):
+    """Split a generated row-returning SELECT into its parts, or None for aggregates and other statements"""
+    match = SELECT_PATTERN.match(sql.strip())
+    if not match or AGGREGATE_SELECT_PATTERN.match(match.group("select")):
+        return None
+    return match.groupdict()
+
+def strip_preview_limit(sql):
+    """The generated SELECT without the preview LIMIT, for consumers that want every row"""
+    parts = parse_select(sql)
+    if not parts or not parts["limit"]:
+        return sql
+    where_clause = f" WHERE {parts['where']}" if parts["where"] else ""
+    return f"SELECT {parts['select']} FROM `{parts['db']}`.`{parts['table']}`{where_clause};"
+
+def build_count_query(sql):
+    """COUNT(*) over the same table and filter as a generated SELECT, or None if it is not a row query"""
+    parts = parse_select(sql)
+    if not parts:
+        return None
+    where_clause = f" WHERE {parts['where']}" if parts["where"] else ""
+    return f"SELECT COUNT(*) FROM `{parts['db']}`.`{parts['table']}`{where_clause};"
+
 class SelectQueryBuilder:
     def normalize_for_lookup(self, text):
         """Normalize text for schema lookups - handles spaces and case"""
@@ -219,8 +249,8 @@ class SelectQueryBuilder:
     
         return f" WHERE {' AND '.join(where_clauses)}" if where_clauses else ""
 
-    def build_query(self, intent, schema_entities, operators, values):
-        """Build SELECT query"""
+    def build_query(self, intent, schema_entities, operators, values, preview_limit=None):
+        """Build SELECT query; preview_limit caps row-returning queries at the rows the caller will show"""
         database, table, columns, resolved_entities = self.resolve_schema_context(schema_entities)
         
         # Handle different query scenarios for SELECT operations
@@ -237,5 +267,8 @@ class SelectQueryBuilder:
         full_table = f"`{database}`.`{table}`"
         select_clause = self.build_select_clause(intent, columns)
         where_clause = self.build_where_clause(table, columns, operators, values, intent)
-        query = f"SELECT {select_clause} FROM {full_table}{where_clause};"
+        limit_clause = ""
+        if preview_limit and not AGGREGATE_SELECT_PATTERN.match(select_clause):
+            limit_clause = f" LIMIT {int(preview_limit)}"
+        query = f"SELECT {select_clause} FROM {full_table}{where_clause}{limit_clause};"
         return query, database
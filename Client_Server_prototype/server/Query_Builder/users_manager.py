@@ -1,11 +1,41 @@
+import os
+import time
+import hmac
+import hashlib
+import threading
 import mysql.connector
 from mysql.connector import Error
 import secrets
+from common.session_store import ALL_USERS
 
 MYSQL_HOST     = "localhost"
 MYSQL_USER     = "root"
 MYSQL_PASSWORD = "root"
 
+USER_CACHE_TTL_SECONDS = float(os.environ.get("CONVERSQL_USER_CACHE_TTL", "60"))
+
+# username -> (expires_at, password digest, user dict, version); passwords are never kept in the clear
+_user_cache = {}
+_user_cache_lock = threading.Lock()
+_user_cache_counters = {"hits": 0, "misses": 0, "invalidations": 0}
+_user_cache_key = os.urandom(32)
+# shared store holding per-user version counters, so every worker sees invalidations
+_version_store = None
+
+def share_invalidations(store):
+    """
+    Check cached users against the version counters in store (a session store).
+    invalidate_user() bumps them, so with the shared SQLite store a role change
+    in one worker evicts the cached user in every worker on its next request
+    rather than after USER_CACHE_TTL_SECONDS. Without a store invalidation
+    only reaches the current process.
+    """
+    global _version_store
+    _version_store = store
+
+def _user_version(username: str) -> int:
+    return _version_store.user_version(username) if _version_store is not None else 0
+
 def get_db_connection():
     return mysql.connector.connect(
         host=MYSQL_HOST,
@@ -14,7 +44,57 @@ def get_db_connection():
         database="your_auth_db"
     )
 
+def _password_digest(password: str) -> bytes:
+    return hmac.new(_user_cache_key, password.encode(), hashlib.sha256).digest()
+
+def _cached_user(username: str, password: str):
+    version = _user_version(username) if username in _user_cache else None
+    with _user_cache_lock:
+        entry = _user_cache.get(username)
+        if entry is not None:
+            expires_at, digest, user, cached_version = entry
+            if expires_at < time.monotonic() or cached_version != version:
+                del _user_cache[username]
+            elif hmac.compare_digest(digest, _password_digest(password)):
+                _user_cache_counters["hits"] += 1
+                return dict(user)
+        # a wrong password is re-checked against MySQL in case it was changed there
+        _user_cache_counters["misses"] += 1
+        return None
+
+def invalidate_user(username: str = None):
+    """Drop one cached user, or every cached user when no name is given, in every worker sharing the store"""
+    if _version_store is not None:
+        _version_store.bump_user_version(username if username is not None else ALL_USERS)
+    with _user_cache_lock:
+        if username is None:
+            dropped = len(_user_cache)
+            _user_cache.clear()
+        else:
+            dropped = 1 if _user_cache.pop(username, None) else 0
+        _user_cache_counters["invalidations"] += dropped
+        return dropped
+
+def user_cache_stats():
+    with _user_cache_lock:
+        lookups = _user_cache_counters["hits"] + _user_cache_counters["misses"]
+        return {
+            "entries": len(_user_cache),
+            "ttl_seconds": USER_CACHE_TTL_SECONDS,
+            "hits": _user_cache_counters["hits"],
+            "misses": _user_cache_counters["misses"],
+            "hit_rate": round(_user_cache_counters["hits"] / lookups, 4) if lookups else 0.0,
+            "invalidations": _user_cache_counters["invalidations"],
+        }
+
 def get_user(username: str, password: str):
+    """Check credentials, answering from the in-process cache while the entry is fresh"""
+    user = _cached_user(username, password)
+    if user is not None:
+        return user
+
+    # read before MySQL so a bump racing with this lookup leaves the entry stale, not fresh
+    version = _user_version(username)
     conn = None
     try:
         conn = get_db_connection()
@@ -25,7 +105,10 @@ def get_user(username: str, password: str):
         )
         row = cur.fetchone()
         if row and row["password"] == password:
-            return {"username": row["username"], "role": row["role"]}
+            user = {"username": row["username"], "role": row["role"]}
+            with _user_cache_lock:
+                _user_cache[username] = (time.monotonic() + USER_CACHE_TTL_SECONDS, _password_digest(password), dict(user), version)
+            return user
     except Error as e:
         print("users_manager MySQL error:", e)
     finally:
@@ -64,6 +147,7 @@ def create_user(new_username: str, role: str, position: str):
             (new_username, password, role, position)
         )
         conn.commit()
+        invalidate_user(new_username)
         return password
     except Error as e:
         print("users_manager MySQL error:", e)
@@ -73,6 +157,27 @@ def create_user(new_username: str, role: str, position: str):
             conn.close()
     return None
 
+def update_user_role(username: str, role: str):
+    conn = None
+    try:
+        conn = get_db_connection()
+        cur = conn.cursor()
+        cur.execute(
+            "UPDATE users SET role=%s WHERE username=%s",
+            (role, username)
+        )
+        conn.commit()
+        return True
+    except Error as e:
+        print("users_manager MySQL error:", e)
+    finally:
+        if conn and conn.is_connected():
+            cur.close()
+            conn.close()
+        # cached credentials must not keep serving the old role
+        invalidate_user(username)
+    return False
+
 def get_user_permissions(username: str):
     """
     Get detailed permissions for a user including allowed operations
@@ -0,0 +1,42 @@
+# common/executors.py
+import os
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+CPU_WORKERS = int(os.environ.get("CONVERSQL_CPU_WORKERS", os.cpu_count() or 2))
+IO_WORKERS = int(os.environ.get("CONVERSQL_IO_WORKERS", 32))
+
+_cpu_executor = None
+_io_executor = None
+
+def get_cpu_executor():
+    """Pool for CPU-bound stages (stanza, recognizers, query building, RSA)"""
+    global _cpu_executor
+    if _cpu_executor is None:
+        _cpu_executor = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix="conversql-cpu")
+    return _cpu_executor
+
+def get_io_executor():
+    """Pool for blocking I/O stages (MySQL, log files)"""
+    global _io_executor
+    if _io_executor is None:
+        _io_executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="conversql-io")
+    return _io_executor
+
+async def run_cpu(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_cpu_executor(), functools.partial(func, *args, **kwargs))
+
+async def run_io(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_io_executor(), functools.partial(func, *args, **kwargs))
+
+def shutdown_executors():
+    global _cpu_executor, _io_executor
+    if _cpu_executor:
+        _cpu_executor.shutdown(wait=False)
+        _cpu_executor = None
+    if _io_executor:
+        _io_executor.shutdown(wait=False)
+        _io_executor = None
@@ -0,0 +1,106 @@
+# common/llm_cache.py
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+LLM_CACHE_ENABLED = os.environ.get("CONVERSQL_LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_PATH = os.environ.get("CONVERSQL_LLM_CACHE_DB", "llm_cache.db")
+LLM_CACHE_MAX_ENTRIES = int(os.environ.get("CONVERSQL_LLM_CACHE_MAX", "5000"))
+# evict down to this fraction of the bound so a full cache does not delete on every insert
+EVICT_TO_FRACTION = 0.9
+
+class LLMResponseCache:
+    """
+    Generated texts keyed by a hash of (model, prompt, options), kept in
+    SQLite so they survive restarts. Bounded to max_entries; the least
+    recently used entries are evicted first.
+    """
+    def __init__(self, path: str = LLM_CACHE_PATH, max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._count_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_responses (
+                key TEXT PRIMARY KEY, model TEXT NOT NULL, response TEXT NOT NULL,
+                created_at REAL NOT NULL, last_used REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0)
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS llm_responses_last_used ON llm_responses(last_used)")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def make_key(model: str, prompt: str, options: dict = None) -> str:
+        payload = json.dumps([model, prompt, options or {}], sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        conn = self._conn()
+        row = conn.execute("SELECT response FROM llm_responses WHERE key=?", (key,)).fetchone()
+        with self._count_lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        conn.execute("UPDATE llm_responses SET last_used=?, hits=hits+1 WHERE key=?", (time.time(), key))
+        return row[0]
+
+    def put(self, key: str, model: str, response: str):
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_responses (key, model, response, created_at, last_used, hits) VALUES (?, ?, ?, ?, ?, 0)",
+                (key, model, response, now, now)
+            )
+            count = conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+            if count > self.max_entries:
+                excess = count - int(self.max_entries * EVICT_TO_FRACTION)
+                conn.execute(
+                    "DELETE FROM llm_responses WHERE key IN (SELECT key FROM llm_responses ORDER BY last_used LIMIT ?)",
+                    (excess,)
+                )
+                with self._count_lock:
+                    self.evictions += excess
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+
+    def clear(self):
+        self._conn().execute("DELETE FROM llm_responses")
+
+    def stats(self):
+        entries = self._conn().execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+        with self._count_lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+def get_llm_cache():
+    """The persistent cache, or None when CONVERSQL_LLM_CACHE_ENABLED=0"""
+    if not LLM_CACHE_ENABLED:
+        return None
+    return LLMResponseCache(LLM_CACHE_PATH)
@@ -0,0 +1,249 @@
+# common/llm_gateway.py
+import os
+import time
+import asyncio
+import httpx
+from common.executors import run_io
+
+OLLAMA_URL = os.environ.get("CONVERSQL_OLLAMA_URL", "http://localhost:11434")
+LLM_MODEL = os.environ.get("CONVERSQL_LLM_MODEL", "gemma:2b")
+# how long Ollama keeps the model loaded after a call, so the next one skips the load
+LLM_KEEP_ALIVE = os.environ.get("CONVERSQL_LLM_KEEP_ALIVE", "30m")
+# a local model serves one or two generations at a time; more just queue inside Ollama
+LLM_MAX_CONCURRENCY = int(os.environ.get("CONVERSQL_LLM_MAX_CONCURRENCY", "2"))
+# callers give up if no slot frees up within this long instead of piling up behind a slow model
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.environ.get("CONVERSQL_LLM_QUEUE_TIMEOUT", "1.0"))
+LLM_DEFAULT_DEADLINE_SECONDS = float(os.environ.get("CONVERSQL_LLM_DEADLINE", "8.0"))
+LLM_CONNECT_TIMEOUT_SECONDS = 1.0
+
+# consecutive failures that open the breaker, and how long it stays open before one probe
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_COOLDOWN_SECONDS = 30.0
+HEALTH_TTL_SECONDS = 15.0
+
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+
+class LLMUnavailable(Exception):
+    """Ollama is down, overloaded or too slow; callers fall back to templates"""
+
+class LLMGateway:
+    """
+    The single way the server talks to Ollama. One pooled HTTP client, a
+    semaphore bounding concurrent generations, a deadline on every call and a
+    circuit breaker: after repeated failures calls fail immediately for a
+    cooldown, then a cached health probe decides whether to let traffic back in.
+    With a cache (an LLMResponseCache) repeated prompts are answered from it, and
+    identical prompts already being generated are joined instead of sent again.
+    """
+    def __init__(self, base_url: str = OLLAMA_URL, model: str = LLM_MODEL,
+                 max_concurrency: int = LLM_MAX_CONCURRENCY, keep_alive: str = LLM_KEEP_ALIVE, cache=None):
+        self.base_url = base_url
+        self.cache = cache
+        self._pending = {}           # cache key -> task generating it
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.keep_alive = keep_alive
+        self._client = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._in_flight = 0
+        self.state = BREAKER_CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._health = None          # (healthy, checked_at)
+        self._probe_lock = asyncio.Lock()
+        self.calls = 0
+        self.successes = 0
+        self.failures = 0
+        self.rejected_open = 0
+        self.rejected_busy = 0
+        self.timeouts = 0
+        self.coalesced = 0
+
+    def _get_client(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(LLM_DEFAULT_DEADLINE_SECONDS, connect=LLM_CONNECT_TIMEOUT_SECONDS),
+                limits=httpx.Limits(max_connections=self.max_concurrency + 2, max_keepalive_connections=self.max_concurrency),
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def check_health(self, force: bool = False) -> bool:
+        """GET /api/tags, cached for HEALTH_TTL_SECONDS so it never runs per request"""
+        now = time.monotonic()
+        if not force and self._health and now - self._health[1] < HEALTH_TTL_SECONDS:
+            return self._health[0]
+        try:
+            response = await self._get_client().get("/api/tags", timeout=LLM_CONNECT_TIMEOUT_SECONDS * 2)
+            response.raise_for_status()
+            healthy = True
+        except Exception:
+            healthy = False
+        self._health = (healthy, time.monotonic())
+        return healthy
+
+    async def warmup(self, attempts: int = 10, delay_seconds: float = 1.0):
+        """Wait for Ollama to come up, then load the model with keep_alive so the first question is not slow"""
+        for _ in range(attempts):
+            if await self.check_health(force=True):
+                break
+            await asyncio.sleep(delay_seconds)
+        else:
+            print(f"[WARN] Ollama not reachable at {self.base_url}; AI features will use templates")
+            self._open()
+            return
+        try:
+            # a generate request without a prompt only loads the model
+            response = await self._get_client().post(
+                "/api/generate",
+                json={"model": self.model, "keep_alive": self.keep_alive},
+                timeout=httpx.Timeout(120.0, connect=LLM_CONNECT_TIMEOUT_SECONDS),
+            )
+            response.raise_for_status()
+            print(f"[INFO] Ollama model {self.model} loaded (keep_alive={self.keep_alive})")
+        except Exception as e:
+            print(f"[WARN] Ollama model warmup failed: {e}")
+
+    def _open(self):
+        self.state = BREAKER_OPEN
+        self._opened_at = time.monotonic()
+
+    def _record_success(self):
+        self.successes += 1
+        self._failures = 0
+        self.state = BREAKER_CLOSED
+
+    def _record_failure(self):
+        self.failures += 1
+        self._failures += 1
+        if self.state == BREAKER_HALF_OPEN or self._failures >= BREAKER_FAILURE_THRESHOLD:
+            self._open()
+
+    async def _admit(self):
+        """Raise LLMUnavailable unless the breaker lets this call through"""
+        if self.state == BREAKER_CLOSED:
+            return
+        if self.state == BREAKER_HALF_OPEN:
+            # a trial call is already deciding whether to close the breaker
+            self.rejected_open += 1
+            raise LLMUnavailable("Ollama circuit half-open")
+        if time.monotonic() - self._opened_at < BREAKER_COOLDOWN_SECONDS:
+            self.rejected_open += 1
+            raise LLMUnavailable("Ollama circuit open")
+        # cooldown over: one caller probes health and makes the trial call, everyone else keeps failing fast
+        if self._probe_lock.locked():
+            self.rejected_open += 1
+            raise LLMUnavailable("Ollama circuit half-open")
+        async with self._probe_lock:
+            if await self.check_health(force=True):
+                self.state = BREAKER_HALF_OPEN
+            else:
+                self._open()
+                self.rejected_open += 1
+                raise LLMUnavailable("Ollama health check failed")
+
+    async def generate(self, prompt: str, options: dict = None, deadline: float = LLM_DEFAULT_DEADLINE_SECONDS) -> str:
+        """
+        Text generated for prompt. Raises LLMUnavailable when the breaker is open,
+        no slot frees up within LLM_QUEUE_TIMEOUT_SECONDS, or the call misses its deadline.
+        """
+        if self.cache is None:
+            return await self._generate(prompt, options, deadline)
+        key = self.cache.make_key(self.model, prompt, options)
+        task = self._pending.get(key)
+        if task is None:
+            cached = await run_io(self.cache.get, key)
+            if cached is not None:
+                return cached
+            # another caller may have started the same prompt while we read the cache
+            task = self._pending.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._generate_and_store(key, prompt, options, deadline))
+            self._pending[key] = task
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+        else:
+            self.coalesced += 1
+        # shielded: one waiter giving up must not cancel the generation the others are waiting on
+        return await asyncio.shield(task)
+
+    async def _generate_and_store(self, key: str, prompt: str, options: dict, deadline: float) -> str:
+        text = await self._generate(prompt, options, deadline)
+        if text:
+            try:
+                await run_io(self.cache.put, key, self.model, text)
+            except Exception as e:
+                print(f"[WARN] Could not store LLM response: {e}")
+        return text
+
+    async def _generate(self, prompt: str, options: dict, deadline: float) -> str:
+        await self._admit()
+        trial = self.state == BREAKER_HALF_OPEN
+        try:
+            return await self._post_generate(prompt, options, deadline)
+        finally:
+            # a trial that ended without a verdict (cancelled by its caller) reopens the
+            # breaker for a new cooldown instead of leaving it half-open for good
+            if trial and self.state == BREAKER_HALF_OPEN:
+                self._open()
+
+    async def _post_generate(self, prompt: str, options: dict, deadline: float) -> str:
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), LLM_QUEUE_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            self.rejected_busy += 1
+            raise LLMUnavailable("Ollama busy")
+        self.calls += 1
+        self._in_flight += 1
+        try:
+            response = await asyncio.wait_for(
+                self._get_client().post(
+                    "/api/generate",
+                    json={
+                        "prompt": prompt,
+                        "model": self.model,
+                        "stream": False,
+                        "keep_alive": self.keep_alive,
+                        "options": options or {},
+                    },
+                    timeout=httpx.Timeout(deadline, connect=LLM_CONNECT_TIMEOUT_SECONDS),
+                ),
+                deadline,
+            )
+            response.raise_for_status()
+            text = response.json().get("response", "").strip()
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            self._record_failure()
+            raise LLMUnavailable(f"Ollama did not answer within {deadline:.1f}s")
+        except Exception as e:
+            self._record_failure()
+            raise LLMUnavailable(f"Ollama request failed: {e}")
+        finally:
+            self._in_flight -= 1
+            self._semaphore.release()
+        self._record_success()
+        return text
+
+    def stats(self):
+        return {
+            "model": self.model,
+            "state": self.state,
+            "healthy": self._health[0] if self._health else None,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self._in_flight,
+            "calls": self.calls,
+            "successes": self.successes,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "rejected_open": self.rejected_open,
+            "rejected_busy": self.rejected_busy,
+            "coalesced": self.coalesced,
+            "pending": len(self._pending),
+        }
@@ -0,0 +1,85 @@
+# common/micro_batcher.py
+import asyncio
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+class MicroBatcher:
+    """
+    Collects items submitted by concurrent coroutines for up to max_wait_ms or
+    max_batch_size items, hands them to process_batch as one list and resolves
+    each caller with its own result. process_batch must return results in input order.
+    """
+    def __init__(self, process_batch, max_batch_size: int = 16, max_wait_ms: float = 2.0):
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._pending = []
+        self._timer = None
+        self.batches = 0
+        self.items = 0
+        self.max_seen = 0
+        self.flushed_full = 0
+        self.flushed_timeout = 0
+        self.size_histogram = {bucket: 0 for bucket in BATCH_SIZE_BUCKETS}
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch_size:
+            self.flushed_full += 1
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_ms / 1000.0, self._flush_on_timeout)
+        return await future
+
+    def _flush_on_timeout(self):
+        self._timer = None
+        if self._pending:
+            self.flushed_timeout += 1
+        self._flush()
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            self._record(len(batch))
+            asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch):
+        try:
+            results = await self.process_batch([item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def _record(self, size: int):
+        self.batches += 1
+        self.items += size
+        self.max_seen = max(self.max_seen, size)
+        for bucket in BATCH_SIZE_BUCKETS:
+            if size <= bucket:
+                self.size_histogram[bucket] += 1
+                break
+        else:
+            self.size_histogram[BATCH_SIZE_BUCKETS[-1]] += 1
+
+    def stats(self):
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": round(self.items / self.batches, 3) if self.batches else 0.0,
+            "max_seen_batch_size": self.max_seen,
+            "flushed_full": self.flushed_full,
+            "flushed_timeout": self.flushed_timeout,
+            "size_histogram": {f"<={bucket}": count for bucket, count in self.size_histogram.items()},
+        }
@@ -0,0 +1,42 @@
+# common/page_token.py
+import os
+import json
+import time
+import hmac
+import base64
+import hashlib
+
+# tokens signed with a random secret stop verifying after a restart; set one to keep them valid
+PAGE_TOKEN_SECRET = os.environ.get("CONVERSQL_PAGE_TOKEN_SECRET", "").encode() or os.urandom(32)
+PAGE_TOKEN_TTL_SECONDS = int(os.environ.get("CONVERSQL_PAGE_TOKEN_TTL", "3600"))
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+def _sign(body: str) -> str:
+    return _b64encode(hmac.new(PAGE_TOKEN_SECRET, body.encode(), hashlib.sha256).digest())
+
+def encode_page_token(state: dict) -> str:
+    """
+    Pack pagination state (SQL, database, key column, last-seen key) into an
+    opaque 'body.signature' string. The signature stops clients from editing the SQL.
+    """
+    payload = dict(state, iat=int(time.time()))
+    body = _b64encode(json.dumps(payload, separators=(",", ":"), default=str).encode())
+    return f"{body}.{_sign(body)}"
+
+def decode_page_token(token: str) -> dict:
+    """Verify and unpack a token from encode_page_token; raises ValueError if it is forged or expired"""
+    try:
+        body, signature = token.split(".", 1)
+    except (AttributeError, ValueError):
+        raise ValueError("Malformed page token.")
+    if not hmac.compare_digest(signature, _sign(body)):
+        raise ValueError("Invalid page token.")
+    state = json.loads(_b64decode(body))
+    if time.time() - state.get("iat", 0) > PAGE_TOKEN_TTL_SECONDS:
+        raise ValueError("Page token has expired; run the query again.")
+    return state
@@ -0,0 +1,73 @@
+# common/plan_cache.py
+import threading
+from collections import OrderedDict
+
+LITERAL_PLACEHOLDER = "__V{}__"
+
+def mask_literals(text: str, values: list) -> str:
+    """Replace every recognised literal span with its type so 'magnitude > 20' and '> 25' share a key"""
+    masked = text
+    for val in sorted(values, key=lambda v: v["span"][0], reverse=True):
+        lo, hi = val["span"]
+        masked = masked[:lo] + f"<{val['type']}>" + masked[hi:]
+    return masked
+
+def sentinel_values(values: list) -> list:
+    return [
+        {"type": val["type"], "value": LITERAL_PLACEHOLDER.format(i), "span": val["span"]}
+        for i, val in enumerate(values)
+    ]
+
+def bind_literals(sql_template: str, values: list) -> str:
+    sql = sql_template
+    for i, val in enumerate(values):
+        sql = sql.replace(LITERAL_PLACEHOLDER.format(i), str(val["value"]))
+    return sql
+
+class PlanCache:
+    """
+    LRU cache of resolved query plans (intent, entities, operators and a
+    SQL template with literal placeholders) keyed by the literal-masked question.
+    """
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._plans = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is None:
+                self.misses += 1
+                return None
+            self._plans.move_to_end(key)
+            self.hits += 1
+            return plan
+
+    def put(self, key: str, plan: dict):
+        with self._lock:
+            self._plans[key] = plan
+            self._plans.move_to_end(key)
+            while len(self._plans) > self.max_entries:
+                self._plans.popitem(last=False)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._plans
+
+    def clear(self):
+        with self._lock:
+            self._plans.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._plans),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,136 @@
+# common/response_cache.py
+import copy
+import time
+import threading
+from collections import OrderedDict
+
+class ResponseCache:
+    """
+    Bounded LRU/TTL cache of finished /query payloads.
+    Entries remember the database they were read from so a destructive
+    operation can drop everything cached for that database.
+    """
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 300.0, negative_ttl_seconds: float = 60.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._entries = OrderedDict()
+        self._keys_by_db = {}
+        self._lock = threading.Lock()
+        self._version_store = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(question: str, role: str, allowed_databases, language: str = None, phrase_version=None) -> tuple:
+        """phrase_version (tokenizer_stanza.phrase_version) retires answers parsed with an older phrase trie"""
+        return (question, role, tuple(sorted(allowed_databases or ())), language, phrase_version)
+
+    def share_invalidations(self, store):
+        """
+        Check cached responses against the database version counters in store
+        (a session store). invalidate_database() bumps them, so with the shared
+        SQLite store a write in one worker retires that database's answers in
+        every worker on their next lookup. Without a store invalidation only
+        reaches the current process.
+        """
+        self._version_store = store
+
+    def database_versions(self) -> dict:
+        """Snapshot to pass to put(); take it before running the query the answer comes from"""
+        return self._version_store.database_versions() if self._version_store is not None else {}
+
+    def _current_version(self, key):
+        if self._version_store is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+        db = entry[1] if entry is not None else None
+        return self._version_store.database_version(db) if db else None
+
+    def _is_stale(self, entry, current_version, now: float) -> bool:
+        expires_at, db, _, version = entry
+        return expires_at < now or (current_version is not None and version != current_version)
+
+    def get(self, key):
+        current_version = self._current_version(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if self._is_stale(entry, current_version, time.monotonic()):
+                self._remove(key)
+                self.misses += 1
+                return None
+            payload = entry[2]
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(payload)
+
+    def put(self, key, payload: dict, db: str = None, negative: bool = False, versions: dict = None):
+        """versions is database_versions() from before the query ran; read now when not given"""
+        ttl = self.negative_ttl_seconds if negative else self.ttl_seconds
+        version = None
+        if db and self._version_store is not None:
+            if versions is None:
+                versions = self.database_versions()
+            version = versions.get(db.lower(), 0)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, db, copy.deepcopy(payload), version)
+            if db:
+                self._keys_by_db.setdefault(db.lower(), set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate_database(self, db: str):
+        if not db:
+            return 0
+        if self._version_store is not None:
+            self._version_store.bump_database_version(db)
+        with self._lock:
+            keys = self._keys_by_db.pop(db.lower(), set())
+            for key in keys:
+                self._entries.pop(key, None)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def __contains__(self, key):
+        """Membership test that ignores expired or stale entries and leaves hit/miss counters alone"""
+        current_version = self._current_version(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and not self._is_stale(entry, current_version, time.monotonic())
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_db.clear()
+
+    def _remove(self, key):
+        _, db, _, _ = self._entries.pop(key)
+        if db:
+            keys = self._keys_by_db.get(db.lower())
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_db[db.lower()]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
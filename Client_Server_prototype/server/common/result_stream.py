@@ -0,0 +1,40 @@
+# common/result_stream.py
+import json
+
+def _dumps(obj):
+    return json.dumps(obj, default=str)
+
+def ndjson_events(batches, meta: dict):
+    """
+    Turn a stream_query() generator into NDJSON lines: one meta line with the
+    column names, one line per row, then an end line with the row count.
+    """
+    row_count = 0
+    try:
+        columns = next(batches, [])
+        yield _dumps(dict(meta, type="meta", columns=columns)) + "\n"
+        for rows in batches:
+            row_count += len(rows)
+            yield "".join(_dumps({"type": "row", "row": row}) + "\n" for row in rows)
+        yield _dumps({"type": "end", "row_count": row_count}) + "\n"
+    except Exception as e:
+        print(f"[ERROR] Streaming query failed after {row_count} rows: {e}")
+        yield _dumps({"type": "error", "error": str(e), "row_count": row_count}) + "\n"
+    finally:
+        batches.close()
+
+def sse_events(batches, meta: dict):
+    """Same stream as ndjson_events, framed as Server-Sent Events with one event per row batch"""
+    row_count = 0
+    try:
+        columns = next(batches, [])
+        yield f"event: meta\ndata: {_dumps(dict(meta, columns=columns))}\n\n"
+        for rows in batches:
+            row_count += len(rows)
+            yield f"event: rows\ndata: {_dumps(rows)}\n\n"
+        yield f"event: end\ndata: {_dumps({'row_count': row_count})}\n\n"
+    except Exception as e:
+        print(f"[ERROR] Streaming query failed after {row_count} rows: {e}")
+        yield f"event: error\ndata: {_dumps({'error': str(e), 'row_count': row_count})}\n\n"
+    finally:
+        batches.close()
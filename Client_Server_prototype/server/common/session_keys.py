@@ -0,0 +1,50 @@
+# common/session_keys.py
+import os
+import time
+import secrets
+from common.session_store import NONCE_REUSED, NONCE_EXHAUSTED
+
+SESSION_KEY_TTL_SECONDS = int(os.environ.get("CONVERSQL_SESSION_TTL", "28800"))
+# AES-GCM under one key is only safe for a bounded number of random nonces
+MAX_MESSAGES_PER_SESSION = 100000
+
+class SessionKeyError(Exception):
+    pass
+
+class SessionKeyStore:
+    """
+    Symmetric keys agreed at /login, referenced by an opaque session id.
+    Every nonce a client uses is remembered for the life of the session so a
+    replayed or nonce-reusing request is rejected. Keys and nonces live in the
+    shared session store so any worker can serve the session.
+    """
+    def __init__(self, store, ttl_seconds: int = SESSION_KEY_TTL_SECONDS):
+        self.store = store
+        self.ttl_seconds = ttl_seconds
+
+    def create(self, username: str, key: bytes) -> str:
+        session_id = secrets.token_urlsafe(24)
+        self.store.put_session_key(session_id, username, key, time.time() + self.ttl_seconds)
+        return session_id
+
+    def key_for(self, session_id: str):
+        """Return (username, key) for a live session"""
+        session = self.store.get_session_key(session_id)
+        if session is None:
+            raise SessionKeyError("Unknown session.")
+        username, key, expires_at = session
+        if expires_at < time.time():
+            self.store.delete_session_key(session_id)
+            raise SessionKeyError("Session expired.")
+        return username, key
+
+    def claim_nonce(self, session_id: str, nonce: bytes):
+        """Record a nonce once its message has authenticated; a second use is rejected"""
+        outcome = self.store.claim_nonce(session_id, nonce, MAX_MESSAGES_PER_SESSION)
+        if outcome == NONCE_REUSED:
+            raise SessionKeyError("Nonce reuse detected.")
+        if outcome == NONCE_EXHAUSTED:
+            raise SessionKeyError("Session key exhausted; log in again.")
+
+    def drop_user(self, username: str) -> int:
+        return self.store.drop_session_keys(username)
@@ -0,0 +1,378 @@
+# common/session_store.py
+import os
+import time
+import sqlite3
+import threading
+
+SESSION_STORE_BACKEND = os.environ.get("CONVERSQL_SESSION_STORE", "memory")
+SESSION_STORE_PATH = os.environ.get("CONVERSQL_SESSION_DB", "session_store.db")
+# 0 keeps a login until /logout (or an admin lock), as before; set seconds to expire idle logins
+LOGIN_TTL_SECONDS = float(os.environ.get("CONVERSQL_LOGIN_TTL", "0"))
+
+# a failure streak is forgotten this long after the last failed attempt (or the lock ending)
+FAILURE_WINDOW_SECONDS = 15 * 60
+
+NONCE_OK = "ok"
+NONCE_REUSED = "reused"
+NONCE_EXHAUSTED = "exhausted"
+
+# user_version() counts bumps for one user plus bumps of this name, which stands for everyone
+ALL_USERS = "*"
+
+def _live(expires_at, now: float) -> bool:
+    return expires_at is None or expires_at > now
+
+class MemorySessionStore:
+    """
+    Login state for a single server process: active logins, failed-login
+    counters with lockouts, and the session keys agreed at /login.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._active = {}      # username -> expires_at, None for no expiry
+        self._failures = {}    # username -> [count, lock_until, expires_at]
+        self._keys = {}        # session_id -> (username, key, expires_at)
+        self._nonces = {}      # session_id -> set of nonces
+        self._user_versions = {}   # username -> bumps since start
+        self._database_versions = {}   # lower-cased database -> writes since start
+
+    def activate(self, username: str, ttl_seconds: float = LOGIN_TTL_SECONDS) -> bool:
+        """Mark a user logged in (until logout when ttl_seconds is 0); False if they already have a live login"""
+        now = time.time()
+        with self._lock:
+            if username in self._active and _live(self._active[username], now):
+                return False
+            self._active[username] = now + ttl_seconds if ttl_seconds else None
+            return True
+
+    def is_active(self, username: str) -> bool:
+        with self._lock:
+            return username in self._active and _live(self._active[username], time.time())
+
+    def deactivate(self, username: str):
+        with self._lock:
+            self._active.pop(username, None)
+
+    def lock_remaining(self, username: str) -> float:
+        """Seconds until a locked-out user may try again, 0 if not locked"""
+        with self._lock:
+            entry = self._failures.get(username)
+            if not entry:
+                return 0.0
+            return max(0.0, entry[1] - time.time())
+
+    def record_failure(self, username: str, max_attempts: int, lock_seconds: float) -> bool:
+        """Count a failed login; returns True when this failure triggers a lockout"""
+        now = time.time()
+        with self._lock:
+            entry = self._failures.get(username)
+            if not entry or entry[2] < now:
+                entry = [0, 0.0, 0.0]
+            entry[0] += 1
+            locked = entry[0] >= max_attempts
+            if locked:
+                entry[1] = now + lock_seconds
+            entry[2] = max(now, entry[1]) + FAILURE_WINDOW_SECONDS
+            self._failures[username] = entry
+            return locked
+
+    def clear_failures(self, username: str):
+        with self._lock:
+            self._failures.pop(username, None)
+
+    def lock(self, username: str, seconds: float):
+        until = time.time() + seconds
+        with self._lock:
+            self._failures[username] = [999, until, until + FAILURE_WINDOW_SECONDS]
+
+    def put_session_key(self, session_id: str, username: str, key: bytes, expires_at: float):
+        with self._lock:
+            self._keys[session_id] = (username, key, expires_at)
+            self._nonces[session_id] = set()
+            self._purge_expired_keys()
+
+    def get_session_key(self, session_id: str):
+        """(username, key, expires_at) for a session id, or None"""
+        with self._lock:
+            return self._keys.get(session_id)
+
+    def delete_session_key(self, session_id: str):
+        with self._lock:
+            self._keys.pop(session_id, None)
+            self._nonces.pop(session_id, None)
+
+    def drop_session_keys(self, username: str) -> int:
+        with self._lock:
+            stale = [sid for sid, (user, _, _) in self._keys.items() if user == username]
+            for sid in stale:
+                del self._keys[sid]
+                self._nonces.pop(sid, None)
+            return len(stale)
+
+    def claim_nonce(self, session_id: str, nonce: bytes, max_messages: int) -> str:
+        with self._lock:
+            seen = self._nonces.get(session_id)
+            if seen is None:
+                return NONCE_EXHAUSTED
+            if nonce in seen:
+                return NONCE_REUSED
+            if len(seen) >= max_messages:
+                return NONCE_EXHAUSTED
+            seen.add(nonce)
+            return NONCE_OK
+
+    def bump_user_version(self, username: str):
+        """Mark cached copies of a user's account (or everyone's, for ALL_USERS) as stale"""
+        with self._lock:
+            self._user_versions[username] = self._user_versions.get(username, 0) + 1
+
+    def user_version(self, username: str) -> int:
+        with self._lock:
+            return self._user_versions.get(username, 0) + self._user_versions.get(ALL_USERS, 0)
+
+    def bump_database_version(self, database: str):
+        """Mark responses cached from a database as stale after a write to it"""
+        with self._lock:
+            key = database.lower()
+            self._database_versions[key] = self._database_versions.get(key, 0) + 1
+
+    def database_version(self, database: str) -> int:
+        with self._lock:
+            return self._database_versions.get(database.lower(), 0)
+
+    def database_versions(self) -> dict:
+        """Every database's version at once, taken before a query runs so its answer is stamped with what it read"""
+        with self._lock:
+            return dict(self._database_versions)
+
+    def _purge_expired_keys(self):
+        now = time.time()
+        for sid in [sid for sid, (_, _, expires_at) in self._keys.items() if expires_at < now]:
+            del self._keys[sid]
+            self._nonces.pop(sid, None)
+
+class SQLiteSessionStore:
+    """
+    Same interface as MemorySessionStore, kept in a SQLite database in WAL
+    mode so every uvicorn worker on the host shares logins and lockouts.
+    Read-modify-write steps run inside BEGIN IMMEDIATE so counters stay atomic
+    across processes.
+    """
+    def __init__(self, path: str = SESSION_STORE_PATH):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS active_logins (
+                username TEXT PRIMARY KEY, expires_at REAL);
+            CREATE TABLE IF NOT EXISTS failed_logins (
+                username TEXT PRIMARY KEY, count INTEGER NOT NULL,
+                lock_until REAL NOT NULL, expires_at REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS session_keys (
+                session_id TEXT PRIMARY KEY, username TEXT NOT NULL,
+                key BLOB NOT NULL, expires_at REAL NOT NULL);
+            CREATE INDEX IF NOT EXISTS session_keys_username ON session_keys(username);
+            CREATE TABLE IF NOT EXISTS session_nonces (
+                session_id TEXT NOT NULL, nonce BLOB NOT NULL,
+                PRIMARY KEY (session_id, nonce));
+            CREATE TABLE IF NOT EXISTS user_versions (
+                username TEXT PRIMARY KEY, version INTEGER NOT NULL);
+            CREATE TABLE IF NOT EXISTS database_versions (
+                database TEXT PRIMARY KEY, version INTEGER NOT NULL);
+        """)
+        # stores created when every login had an expiry declared it NOT NULL; active logins are transient
+        if any(col[1] == "expires_at" and col[3] for col in conn.execute("PRAGMA table_info(active_logins)")):
+            conn.executescript("""
+                DROP TABLE active_logins;
+                CREATE TABLE active_logins (username TEXT PRIMARY KEY, expires_at REAL);
+            """)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # autocommit mode; multi-statement updates open their own transaction
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        return conn
+
+    def activate(self, username: str, ttl_seconds: float = LOGIN_TTL_SECONDS) -> bool:
+        now = time.time()
+        conn = self._transaction()
+        try:
+            row = conn.execute("SELECT expires_at FROM active_logins WHERE username=?", (username,)).fetchone()
+            if row and _live(row[0], now):
+                conn.execute("ROLLBACK")
+                return False
+            conn.execute(
+                "INSERT OR REPLACE INTO active_logins (username, expires_at) VALUES (?, ?)",
+                (username, now + ttl_seconds if ttl_seconds else None)
+            )
+            conn.execute("COMMIT")
+            return True
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+
+    def is_active(self, username: str) -> bool:
+        row = self._conn().execute(
+            "SELECT 1 FROM active_logins WHERE username=? AND (expires_at IS NULL OR expires_at > ?)",
+            (username, time.time())
+        ).fetchone()
+        return row is not None
+
+    def deactivate(self, username: str):
+        self._conn().execute("DELETE FROM active_logins WHERE username=?", (username,))
+
+    def lock_remaining(self, username: str) -> float:
+        row = self._conn().execute(
+            "SELECT lock_until FROM failed_logins WHERE username=?", (username,)
+        ).fetchone()
+        return max(0.0, row[0] - time.time()) if row else 0.0
+
+    def record_failure(self, username: str, max_attempts: int, lock_seconds: float) -> bool:
+        now = time.time()
+        conn = self._transaction()
+        try:
+            row = conn.execute(
+                "SELECT count, lock_until, expires_at FROM failed_logins WHERE username=?", (username,)
+            ).fetchone()
+            count, lock_until = (row[0], row[1]) if row and row[2] >= now else (0, 0.0)
+            count += 1
+            locked = count >= max_attempts
+            if locked:
+                lock_until = now + lock_seconds
+            conn.execute(
+                "INSERT OR REPLACE INTO failed_logins (username, count, lock_until, expires_at) VALUES (?, ?, ?, ?)",
+                (username, count, lock_until, max(now, lock_until) + FAILURE_WINDOW_SECONDS)
+            )
+            conn.execute("COMMIT")
+            return locked
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+
+    def clear_failures(self, username: str):
+        self._conn().execute("DELETE FROM failed_logins WHERE username=?", (username,))
+
+    def lock(self, username: str, seconds: float):
+        until = time.time() + seconds
+        self._conn().execute(
+            "INSERT OR REPLACE INTO failed_logins (username, count, lock_until, expires_at) VALUES (?, 999, ?, ?)",
+            (username, until, until + FAILURE_WINDOW_SECONDS)
+        )
+
+    def put_session_key(self, session_id: str, username: str, key: bytes, expires_at: float):
+        conn = self._transaction()
+        try:
+            stale = "SELECT session_id FROM session_keys WHERE expires_at < ?"
+            now = time.time()
+            conn.execute(f"DELETE FROM session_nonces WHERE session_id IN ({stale})", (now,))
+            conn.execute("DELETE FROM session_keys WHERE expires_at < ?", (now,))
+            conn.execute(
+                "INSERT OR REPLACE INTO session_keys (session_id, username, key, expires_at) VALUES (?, ?, ?, ?)",
+                (session_id, username, key, expires_at)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+
+    def get_session_key(self, session_id: str):
+        row = self._conn().execute(
+            "SELECT username, key, expires_at FROM session_keys WHERE session_id=?", (session_id,)
+        ).fetchone()
+        return (row[0], bytes(row[1]), row[2]) if row else None
+
+    def delete_session_key(self, session_id: str):
+        conn = self._transaction()
+        try:
+            conn.execute("DELETE FROM session_nonces WHERE session_id=?", (session_id,))
+            conn.execute("DELETE FROM session_keys WHERE session_id=?", (session_id,))
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+
+    def drop_session_keys(self, username: str) -> int:
+        conn = self._transaction()
+        try:
+            conn.execute(
+                "DELETE FROM session_nonces WHERE session_id IN (SELECT session_id FROM session_keys WHERE username=?)",
+                (username,)
+            )
+            dropped = conn.execute("DELETE FROM session_keys WHERE username=?", (username,)).rowcount
+            conn.execute("COMMIT")
+            return dropped
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+
+    def claim_nonce(self, session_id: str, nonce: bytes, max_messages: int) -> str:
+        conn = self._transaction()
+        try:
+            if conn.execute("SELECT 1 FROM session_keys WHERE session_id=?", (session_id,)).fetchone() is None:
+                conn.execute("ROLLBACK")
+                return NONCE_EXHAUSTED
+            used = conn.execute("SELECT COUNT(*) FROM session_nonces WHERE session_id=?", (session_id,)).fetchone()[0]
+            if used >= max_messages:
+                conn.execute("ROLLBACK")
+                return NONCE_EXHAUSTED
+            try:
+                conn.execute("INSERT INTO session_nonces (session_id, nonce) VALUES (?, ?)", (session_id, nonce))
+            except sqlite3.IntegrityError:
+                conn.execute("ROLLBACK")
+                return NONCE_REUSED
+            conn.execute("COMMIT")
+            return NONCE_OK
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+
+    def bump_user_version(self, username: str):
+        self._conn().execute(
+            "INSERT INTO user_versions (username, version) VALUES (?, 1) "
+            "ON CONFLICT(username) DO UPDATE SET version = version + 1",
+            (username,)
+        )
+
+    def user_version(self, username: str) -> int:
+        row = self._conn().execute(
+            "SELECT COALESCE(SUM(version), 0) FROM user_versions WHERE username IN (?, ?)", (username, ALL_USERS)
+        ).fetchone()
+        return row[0]
+
+    def bump_database_version(self, database: str):
+        self._conn().execute(
+            "INSERT INTO database_versions (database, version) VALUES (?, 1) "
+            "ON CONFLICT(database) DO UPDATE SET version = version + 1",
+            (database.lower(),)
+        )
+
+    def database_version(self, database: str) -> int:
+        row = self._conn().execute(
+            "SELECT version FROM database_versions WHERE database=?", (database.lower(),)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def database_versions(self) -> dict:
+        return dict(self._conn().execute("SELECT database, version FROM database_versions"))
+
+def get_session_store():
+    """Backend chosen by CONVERSQL_SESSION_STORE: 'memory' (default, single worker) or 'sqlite'"""
+    if SESSION_STORE_BACKEND == "sqlite":
+        print(f"[INFO] Using shared SQLite session store at {SESSION_STORE_PATH}")
+        return SQLiteSessionStore(SESSION_STORE_PATH)
+    return MemorySessionStore()
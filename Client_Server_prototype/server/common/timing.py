@@ -0,0 +1,48 @@
+# common/timing.py
+import time
+from contextlib import contextmanager
+
+class StageTimer:
+    """
+    Records wall time per pipeline stage and renders it as a
+    Server-Timing header or a plain dict for the response payload.
+    Create it when the request starts: total is the wall time since then,
+    so un-instrumented work counts and overlapping stages do not count twice.
+    """
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+        self._descriptions = {}
+
+    @contextmanager
+    def stage(self, name: str, description: str = None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000.0
+            # a stage may run more than once per request (e.g. commentary)
+            self.stages[name] = self.stages.get(name, 0.0) + elapsed_ms
+            if description:
+                self._descriptions[name] = description
+
+    def as_dict(self):
+        return {name: round(ms, 3) for name, ms in self.stages.items()}
+
+    def total_ms(self):
+        return round((time.perf_counter() - self.started) * 1000.0, 3)
+
+    def server_timing_header(self):
+        parts = []
+        for name, ms in self.stages.items():
+            desc = self._descriptions.get(name)
+            if desc:
+                parts.append(f'{name};desc="{desc}";dur={ms:.3f}')
+            else:
+                parts.append(f"{name};dur={ms:.3f}")
+        parts.append(f"total;dur={self.total_ms():.3f}")
+        return ", ".join(parts)
+
+    def summary(self):
+        stages = " | ".join(f"{name}={ms:.1f}ms" for name, ms in self.stages.items())
+        return f"{stages} | total={self.total_ms():.1f}ms"
@@ -1,15 +1,15 @@
-import re
 import json
 from datetime import datetime, timedelta
 import base64
 import os
 import subprocess
 import time
-import httpx
+import asyncio
 import shutil
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+from typing import List, Optional
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
 import mysql.connector
 from common.encryption_utils import (
@@ -19,18 +19,28 @@ from common.encryption_utils import (
     aes_decrypt,
     aes_encrypt
 )
-from NLP_pipeline.tokenizer_stanza import tokenize, SCHEMA_MAP
+from common.executors import run_cpu, run_io, shutdown_executors
+from common.timing import StageTimer
+from common.llm_gateway import LLMGateway, LLMUnavailable
+from common.llm_cache import get_llm_cache
+from common.result_stream import ndjson_events, sse_events
+from common.session_store import get_session_store, LOGIN_TTL_SECONDS
+from common.session_keys import SessionKeyStore, SessionKeyError
+from NLP_pipeline import tokenizer_stanza
+from NLP_pipeline.tokenizer_stanza import SUPPORTED_LANGUAGES
+from NLP_pipeline import tokenizer_pool
 from NLP_pipeline.schema_entity_recognizer import schema_entity_recognizer
-from NLP_pipeline.comparison_operator_recognizer import comparison_operator_recognizer
 from NLP_pipeline.value_entity_recognizer import value_entity_recognizer
 from NLP_pipeline.normalize_units import normalize_units
 from NLP_pipeline.normalize_dates import normalize_dates
 from NLP_pipeline.intent_recognizer import IntentRecognizer
-from Query_Builder.query_builder_factory import build_query, is_destructive_operation
-from Query_Builder.query_verifier import verify_query
+from NLP_pipeline.automate_schema import generate_schema_json_from_selected_dbs
 from Query_Builder.query_logger import log_query, log_access
-from Query_Builder.users_manager import get_user, user_exists, create_user
-from Query_Builder.rbac import validate_query_access, explain_denial, is_admin_only_operation
+from Query_Builder.query_verifier import stream_query
+from Query_Builder.keyset_pagination import DEFAULT_PAGE_SIZE
+from Query_Builder.users_manager import get_user, user_exists, create_user, update_user_role, invalidate_user, user_cache_stats, share_invalidations
+from Query_Builder.rbac import ROLE_DATABASE_ACCESS
+from query_pipeline import QueryPipeline, MAX_BATCH_QUERIES, TOTAL_ROWS_MODES
 
 app = FastAPI()
 app.add_middleware(
@@ -39,6 +49,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
 UPLOAD_DIRECTORY = "./uploads"
@@ -46,235 +57,23 @@ if not os.path.exists(UPLOAD_DIRECTORY):
     os.makedirs(UPLOAD_DIRECTORY)
 
 _priv_key = load_private_key("common/server_private_key.pem")
-YEAR_PATTERN = re.compile(r"^\d{4}$")
 
-intent_recognizer = IntentRecognizer("NLP_pipeline/json/intent.json", use_ai_fallback=True)
-
-_failed_logins = {}
-_active_sessions = {}
+llm_cache = get_llm_cache()
+llm_gateway = LLMGateway(cache=llm_cache)
+intent_recognizer = IntentRecognizer("NLP_pipeline/json/intent.json", use_ai_fallback=True, llm=llm_gateway)
+query_pipeline = QueryPipeline(intent_recognizer)
+query_pipeline.llm = llm_gateway
+
+MAX_LOGIN_ATTEMPTS = 3
+LOCKOUT_SECONDS = 5 * 60
+# summaries of long documents legitimately take a while; questions use the gateway's shorter defaults
+SUMMARY_DEADLINE_SECONDS = 60.0
+
+session_store = get_session_store()
+_session_keys = SessionKeyStore(session_store)
+share_invalidations(session_store)
+query_pipeline.response_cache.share_invalidations(session_store)
 _llm_process = None
-_ollama_client = None
-
-def enhanced_operator_column_linking(entities, operators, intent):
-    all_identified_columns = [e['value'] for e in entities if e['type'] == 'column']
-    
-    agg_column = None
-    if any(agg_intent in intent for agg_intent in ["AGGREGATE_AVG", "AGGREGATE_SUM", "AGGREGATE_MIN", "AGGREGATE_MAX"]):
-        if all_identified_columns:
-            agg_column = all_identified_columns[0]
-            
-    structured_ops = []
-    if operators and all_identified_columns:
-        filter_columns = []
-        
-        if agg_column:
-            filter_columns = [col for col in all_identified_columns if col != agg_column]
-            if not filter_columns:
-                filter_columns = [all_identified_columns[0]]
-        else:
-            filter_columns = all_identified_columns
-            
-        for i, operator_item in enumerate(operators):
-            if isinstance(operator_item, tuple) and len(operator_item) >= 2:
-                op_symbol = operator_item[0]
-                op_text = operator_item[1]
-            else:
-                op_symbol = str(operator_item)
-                op_text = str(operator_item)
-                
-            if i < len(filter_columns):
-                target_column = filter_columns[i]
-            else:
-                target_column = filter_columns[-1] if filter_columns else all_identified_columns[0]
-                
-            structured_ops.append((target_column, op_symbol, op_text))
-    elif operators:
-        for operator_item in operators:
-            if isinstance(operator_item, tuple) and len(operator_item) >= 2:
-                op_symbol = operator_item[0]
-                op_text = operator_item[1]
-            else:
-                op_symbol = str(operator_item)
-                op_text = str(operator_item)
-                
-            structured_ops.append((None, op_symbol, op_text))
-            
-    return structured_ops, agg_column
-
-async def generate_sql_with_query_builder(original_query: str, intent: list, entities: list, operators: list, values: list, user_role: str):
-    try:
-        print(f"\n--- Query Builder SQL Generation ---")
-        print(f"Original Query: {original_query}")
-        print(f"Intent: {intent}")
-        print(f"Entities: {entities}")
-        print(f"Operators: {operators}")
-        print(f"Values: {values}")
-        print(f"User Role: {user_role}")
-        
-        structured_ops, agg_column = enhanced_operator_column_linking(entities, operators, intent)
-        
-        print(f"Structured Operators: {structured_ops}")
-        print(f"Aggregate Column: {agg_column}")
-        
-        query_str, resolved_db = build_query(intent, entities, structured_ops, values)
-        
-        print(f"\n--- Query Builder Generated SQL ---\n{query_str}\nDB: {resolved_db}\n---------------------")
-        
-        if query_str and not query_str.startswith("ERROR:"):
-            if not resolved_db:
-                db_entities = [e for e in entities if e.get('type') == 'database' and e.get('value')]
-                if db_entities:
-                    resolved_db = db_entities[0]['value']
-                
-                if not resolved_db:
-                    table_entities = [e for e in entities if e.get('type') == 'table' and e.get('value')]
-                    if table_entities:
-                        table_name = table_entities[0]['value']
-                        if table_name in SCHEMA_MAP.get("table_to_db", {}):
-                            resolved_db = SCHEMA_MAP["table_to_db"][table_name]
-                
-                if not resolved_db:
-                    column_entities = [e for e in entities if e.get('type') == 'column' and e.get('value')]
-                    if column_entities:
-                        column_name = column_entities[0]['value']
-                        col_info = SCHEMA_MAP.get("column_to_table_db", {}).get(column_name)
-                        if col_info:
-                            if isinstance(col_info, dict) and col_info.get('db'):
-                                resolved_db = col_info['db']
-                            elif isinstance(col_info, tuple) and len(col_info) > 0:
-                                resolved_db = col_info[0]
-                
-                if not resolved_db and SCHEMA_MAP.get("db_to_tables"):
-                    resolved_db = list(SCHEMA_MAP["db_to_tables"].keys())[0]
-            
-            return query_str, resolved_db
-        
-        return None, None
-        
-    except Exception as e:
-        print(f"Query Builder SQL Generation Error: {e}")
-        return None, None
-
-def has_meaningful_schema_entities(entities: list) -> bool:
-    meaningful_entities = [
-        e for e in entities 
-        if e.get('type') in ['database', 'table', 'column'] 
-        and e.get('value') 
-        and e.get('type') != 'unmatched'
-        and len(e.get('value', '').strip()) > 0
-    ]
-    return len(meaningful_entities) > 0
-
-async def get_optimized_commentary(input_data, ai_already_used: bool = False):
-    original_query = input_data.get('original_query', 'N/A')
-    query_status = input_data.get('query_status', 'N/A')
-    denial_reason = input_data.get('denial_reason', '')
-    sql_error = input_data.get('sql', '')
-    sample_rows_count = input_data.get('sample_rows_count', 0)
-    intent = input_data.get('intent', [])
-    is_aggregate_query = input_data.get('is_aggregate_query', False)
-    has_schema_entities = input_data.get('has_schema_entities', True)
-    
-    use_ai_commentary = (
-        not has_schema_entities and 
-        not ai_already_used and 
-        query_status in ["general_chat", "no_sql"]
-    )
-    
-    if use_ai_commentary:
-        print(f"[DEBUG] Using AI commentary for general chat query")
-        return await get_ai_commentary(input_data)
-    else:
-        print(f"[DEBUG] Using template-based commentary (AI already used: {ai_already_used}, Has schema: {has_schema_entities})")
-        return get_template_commentary(input_data)
-
-async def get_ai_commentary(input_data):
-    try:
-        original_query = input_data.get('original_query', 'N/A')
-        query_status = input_data.get('query_status', 'N/A')
-        
-        base_instruction = "You are ConversQL, a friendly database assistant. The user's input doesn't seem to be a database query."
-        
-        if query_status == "general_chat":
-            prompt = f"""{base_instruction}
-
-User said: "{original_query}"
-
-Please respond as a helpful AI assistant. If they're trying to ask about data, gently guide them to be more specific about what database information they need.
-
-Response:"""
-        else:
-            prompt = f"""{base_instruction}
-
-User requested: "{original_query}"
-
-I couldn't understand this as a database query. Please provide a brief, helpful response explaining that I need more specific database-related questions, and give an example of how they could rephrase their request.
-
-Response:"""
-        
-        print(f"\n--- AI Commentary Prompt ---\n{prompt}\n---------------------")
-        
-        response = await _ollama_client.post(
-            "http://localhost:11434/api/generate",
-            json={
-                "prompt": prompt,
-                "model": "gemma:2b",
-                "stream": False,
-                "options": {
-                    "temperature": 0.5,
-                    "top_p": 0.7,
-                    "num_predict": 100,
-                    "stop": ["\n\n", "User:", "ConversQL:"]
-                }
-            }
-        )
-        response.raise_for_status()
-        
-        json_response = response.json()
-        ollama_text = json_response.get("response", "").strip()
-        
-        if ollama_text:
-            return ollama_text
-        else:
-            return get_template_commentary(input_data)
-            
-    except Exception as e:
-        print(f"AI commentary error: {e}")
-        return get_template_commentary(input_data)
-
-def get_template_commentary(input_data):
-    original_query = input_data.get('original_query', 'N/A')
-    query_status = input_data.get('query_status', 'N/A')
-    denial_reason = input_data.get('denial_reason', '')
-    sql_error = input_data.get('sql', '')
-    sample_rows_count = input_data.get('sample_rows_count', 0)
-    intent = input_data.get('intent', [])
-    is_aggregate_query = input_data.get('is_aggregate_query', False)
-    
-    is_destructive = any(destructive_intent in intent for destructive_intent in [
-        "INSERT_ROWS", "UPDATE_ROWS", "DELETE_ROWS", 
-        "DROP_TABLE", "DROP_DATABASE", "TRUNCATE_TABLE"
-    ])
-    
-    if query_status == "success":
-        if is_destructive:
-            return f"✅ Successfully executed your data modification request. The operation has been completed and logged for security purposes."
-        elif is_aggregate_query:
-            return f"✅ Successfully calculated the result for your query. The aggregate value has been retrieved from the database."
-        else:
-            return f"✅ Found {sample_rows_count} relevant entries matching your query criteria."
-    
-    elif query_status == "denied":
-        if is_destructive:
-            return f"❌ Access denied: Data modification operations require administrator privileges. Please contact your administrator if you need to make changes to the data."
-        else:
-            return f"❌ Access denied: {denial_reason}. Please check your permissions or contact your administrator."
-    
-    elif query_status == "fail":
-        return f"❌ Query execution failed: {sql_error}. Please check your query syntax and try again."
-    
-    else:
-        return f"❓ I couldn't process your request. Please try rephrasing your query with more specific database terms."
 
 def get_admin_conversations(admin_user: str):
     try:
@@ -321,49 +120,44 @@ def log_access_to_db(username: str, status: str):
 
 @app.on_event("startup")
 async def startup_event():
-    global _llm_process, _ollama_client
+    global _llm_process
+
+    # stanza loads in the background (or in the tokenizer worker processes);
+    # the first query waits for it if it is not ready yet
+    tokenizer_pool.start()
         
-    print("\n===== Running schema_automation.py =====")
+    print("\n===== Refreshing schema cache =====")
     try:
-        result = subprocess.run(
-            ["python", "NLP_pipeline/automate_schema.py"],
-            capture_output=True,
-            text=True,
-            check=True         
-        )
-        print("schema_automation.py output:\n", result.stdout)
-        if result.stderr:
-            print("schema_automation.py errors:\n", result.stderr)
-        print("===== schema_automation.py finished =====")
-    except subprocess.CalledProcessError as e:
-        print(f"ERROR: schema_automation.py failed with exit code {e.returncode}")
-        print("Stdout:", e.stdout)
-        print("Stderr:", e.stderr)
-    except FileNotFoundError:
-        print("ERROR: python command or NLP_pipeline/schema_automation.py not found.")
+        started = time.perf_counter()
+        changed = await run_io(generate_schema_json_from_selected_dbs)
+        if changed:
+            query_pipeline.reload_schema()
+        print(f"===== Schema cache ready in {(time.perf_counter() - started) * 1000:.0f}ms (changed={changed}) =====")
     except Exception as e:
-        print(f"An unexpected error occurred while running schema_automation.py: {e}")
+        # the cached plugin_schema.json loaded at import keeps the server usable
+        print(f"ERROR: Schema refresh failed, using cached schema: {e}")
+    # lets the phrase trie match inflected schema names; runs once stanza is up
+    asyncio.create_task(tokenizer_pool.learn_schema_phrase_lemmas())
 
     _llm_process = subprocess.Popen(
         [r"C:\Users\hbhan\AppData\Local\Programs\Ollama\ollama.exe", "serve"],
         stdout=subprocess.DEVNULL,
         stderr=subprocess.DEVNULL
     )
-    time.sleep(2)
-        
-    _ollama_client = httpx.AsyncClient(timeout=30.0)
-    
+    # waits for `ollama serve` and loads the model off the startup path
+    asyncio.create_task(llm_gateway.warmup())
+
     print("✅ Optimized AI system initialized - Max 1 AI call per query")
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    global _llm_process, _ollama_client, intent_recognizer
+    global _llm_process
     if _llm_process:
         _llm_process.terminate()
-    if _ollama_client:
-        await _ollama_client.aclose()
-    if intent_recognizer:
-        await intent_recognizer.close()
+    await llm_gateway.close()
+    # writes the lemma cache, so keep it off the event loop like every other save
+    await run_io(tokenizer_pool.shutdown)
+    shutdown_executors()
 
 class SecureLoginRequest(BaseModel):
     encrypted_key: str
@@ -375,14 +169,39 @@ class SimpleLoginRequest(BaseModel):
     password: str
 
 class EncryptedQueryRequest(BaseModel):
-    encrypted_key: str
     nonce: str
     ciphertext: str
+    # either a per-request RSA-wrapped key, or the session_id returned by /login
+    encrypted_key: Optional[str] = None
+    session_id: Optional[str] = None
 
 class SimpleQueryRequest(BaseModel):
     username: str
     password: str
     query: str
+    include_timings: bool = False
+    total_rows: Optional[str] = None
+    language: Optional[str] = None
+
+class SimpleBatchQueryRequest(BaseModel):
+    username: str
+    password: str
+    queries: List[str]
+    include_timings: bool = False
+    language: Optional[str] = None
+
+class StreamQueryRequest(BaseModel):
+    username: str
+    password: str
+    query: str
+    format: str = "ndjson"
+    language: Optional[str] = None
+
+class PageQueryRequest(BaseModel):
+    username: str
+    password: str
+    page_token: str
+    page_size: int = DEFAULT_PAGE_SIZE
 
 class LockUserRequest(BaseModel):
     admin_user: str
@@ -408,13 +227,25 @@ class AddUserRequest(BaseModel):
     department: str
     position: str
 
+class UpdateRoleRequest(BaseModel):
+    admin_user: str
+    admin_pass: str
+    target_user: str
+    role: str
+
 class LogoutRequest(BaseModel):
     username: str
     password: str
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy", "message": "Server is running"}
+    return {
+        "status": "healthy",
+        "message": "Server is running",
+        "nlp_ready": tokenizer_pool.is_ready(),
+        "nlp_error": tokenizer_pool.init_error(),
+        "llm_state": llm_gateway.state
+    }
 
 @app.get("/public-key")
 async def get_public_key():
@@ -449,29 +280,34 @@ def login(req: SecureLoginRequest):
         print(f"ERROR: Invalid encrypted payload - {e}")
         raise HTTPException(400, "Invalid encrypted payload")
     
-    info = _failed_logins.get(username, {"count": 0, "lock_until": None})
-    if info["lock_until"] and datetime.now() < info["lock_until"]:
-        wait = (info["lock_until"] - datetime.now()).seconds
+    wait = int(session_store.lock_remaining(username))
+    if wait:
         raise HTTPException(403, f"Locked. Try after {wait//60}m{wait%60}s.")
-    if username in _active_sessions:
+    if session_store.is_active(username):
         raise HTTPException(403, "User already logged in elsewhere.")
     
     user = get_user(username, password)
     if user:
-        _failed_logins.pop(username, None)
-        _active_sessions[username] = True
+        # a concurrent login on another worker may have won the race
+        if not session_store.activate(username, LOGIN_TTL_SECONDS):
+            raise HTTPException(403, "User already logged in elsewhere.")
+        session_store.clear_failures(username)
+        # the key this login was wrapped with becomes the session key for later requests
+        session_id = _session_keys.create(username, sym_key)
         log_access(username, "LOGIN_SUCCESS")
         log_access_to_db(username, "LOGIN_SUCCESS")
-        return {"message": "Login successful", "role": user["role"]}
+        return {
+            "message": "Login successful",
+            "role": user["role"],
+            "session_id": session_id,
+            "session_expires_in": _session_keys.ttl_seconds
+        }
     
-    info["count"] += 1
     log_access(username, "LOGIN_FAILURE")
     log_access_to_db(username, "LOGIN_FAILURE")
-    if info["count"] >= 3:
-        info["lock_until"] = datetime.now() + timedelta(minutes=5)
+    if session_store.record_failure(username, MAX_LOGIN_ATTEMPTS, LOCKOUT_SECONDS):
         log_access(username, "LOCKOUT")
         log_access_to_db(username, "LOCKOUT")
-    _failed_logins[username] = info
     raise HTTPException(401, "Invalid credentials.")
 
 @app.post("/login/simple")
@@ -479,29 +315,27 @@ def simple_login(req: SimpleLoginRequest):
     username = req.username
     password = req.password
         
-    info = _failed_logins.get(username, {"count": 0, "lock_until": None})
-    if info["lock_until"] and datetime.now() < info["lock_until"]:
-        wait = (info["lock_until"] - datetime.now()).seconds
+    wait = int(session_store.lock_remaining(username))
+    if wait:
         raise HTTPException(403, f"Locked. Try after {wait//60}m{wait%60}s.")
-    if username in _active_sessions:
+    if session_store.is_active(username):
         raise HTTPException(403, "User already logged in elsewhere.")
         
     user = get_user(username, password)
     if user:
-        _failed_logins.pop(username, None)
-        _active_sessions[username] = True
+        # a concurrent login on another worker may have won the race
+        if not session_store.activate(username, LOGIN_TTL_SECONDS):
+            raise HTTPException(403, "User already logged in elsewhere.")
+        session_store.clear_failures(username)
         log_access(username, "LOGIN_SUCCESS")
         log_access_to_db(username, "LOGIN_SUCCESS")
         return {"message": "Login successful", "role": user["role"]}
         
-    info["count"] += 1
     log_access(username, "LOGIN_FAILURE")
     log_access_to_db(username, "LOGIN_FAILURE")
-    if info["count"] >= 3:
-        info["lock_until"] = datetime.now() + timedelta(minutes=5)
+    if session_store.record_failure(username, MAX_LOGIN_ATTEMPTS, LOCKOUT_SECONDS):
         log_access(username, "LOCKOUT")
         log_access_to_db(username, "LOCKOUT")
-    _failed_logins[username] = info
     raise HTTPException(401, "Invalid credentials.")
 
 @app.post("/logout")
@@ -509,421 +343,221 @@ def logout(data: LogoutRequest):
     user = get_user(data.username, data.password)
     if not user:
         raise HTTPException(401, "Invalid credentials.")
-    _active_sessions.pop(data.username, None)
+    session_store.deactivate(data.username)
+    _session_keys.drop_user(data.username)
     log_access_to_db(data.username, "LOGOUT")
     return {"message": "Logged out successfully."}
 
+async def open_envelope(req: EncryptedQueryRequest):
+    """
+    Decrypt an encrypted request. With a session_id only AES-GCM runs, using
+    the key agreed at /login; otherwise the per-request key is RSA-unwrapped.
+    Returns (data, sym_key) so the response can be sealed with the same key.
+    """
+    nonce = b64dec(req.nonce)
+    ct = b64dec(req.ciphertext)
+    if req.session_id:
+        username, sym_key = _session_keys.key_for(req.session_id)
+        data = json.loads(aes_decrypt(nonce, ct, sym_key))
+        if data.get("username") != username:
+            raise SessionKeyError("Session does not belong to this user.")
+        _session_keys.claim_nonce(req.session_id, nonce)
+    else:
+        wrapped = b64dec(req.encrypted_key)
+        sym_key = await run_cpu(decrypt_key_rsa, wrapped, _priv_key)
+        data = json.loads(aes_decrypt(nonce, ct, sym_key))
+    return data, sym_key
+
 @app.post("/query")
-async def encrypted_query(req: EncryptedQueryRequest):
+async def encrypted_query(req: EncryptedQueryRequest, response: Response):
     print("\n===== ENCRYPTED QUERY PAYLOAD RECEIVED =====")
+    timer = StageTimer()
     try:
-        wrapped = b64dec(req.encrypted_key)
-        sym_key = decrypt_key_rsa(wrapped, _priv_key)
-        nonce = b64dec(req.nonce)
-        ct = b64dec(req.ciphertext)
-        raw = aes_decrypt(nonce, ct, sym_key)
-        data = json.loads(raw)
+        with timer.stage("decrypt"):
+            data, sym_key = await open_envelope(req)
+    except SessionKeyError as e:
+        raise HTTPException(401, str(e))
     except Exception as e:
         print(f"ERROR: Failed to decrypt query payload - {e}")
         raise HTTPException(400, "Invalid encrypted payload for query")
 
-    user = get_user(data["username"], data["password"])
+    with timer.stage("auth"):
+        user = await run_io(get_user, data["username"], data["password"])
     if not user:
         raise HTTPException(401, "Invalid credentials.")
-    if data["username"] not in _active_sessions:
+    if not session_store.is_active(data["username"]):
         raise HTTPException(403, "User not actively logged in.")
 
     q = data["query"].strip().lower()
     if not q:
         raise HTTPException(400, "Empty query.")
 
-    print("\n===== RAW INPUT =====")
-    print(q)
+    total_rows = data.get("total_rows")
+    if total_rows is not None and total_rows not in TOTAL_ROWS_MODES:
+        raise HTTPException(400, "total_rows must be 'exact' or 'estimate'.")
 
-    t1, dates = normalize_dates(q)
-    t2, units = normalize_units(t1 if dates else q)
-    tok = tokenize(t2 if units else t1)
-    final_tokens = tok["Final Tokens"]
-    
-    ents = schema_entity_recognizer(final_tokens)
-    has_schema_entities = has_meaningful_schema_entities(ents)
-    
-    intent, ai_used_for_intent = intent_recognizer.predict_from_tokens(final_tokens, ents)
-    print(f"\n===== DETECTED INTENT =====\n{intent} (AI used: {ai_used_for_intent})")
+    language = resolve_language(data.get("language"))
+    response_payload = await query_pipeline.run(user, q, timer, total_rows=total_rows, language=language)
+    if data.get("include_timings"):
+        response_payload["timings"] = timer.as_dict()
 
-    is_aggregate_intent = any(agg_intent in intent for agg_intent in ["AGGREGATE_AVG", "AGGREGATE_SUM", "AGGREGATE_MIN", "AGGREGATE_MAX"])
-
-    if is_admin_only_operation(intent) and user["role"] != "admin":
-        query_status = "denied"
-        reason = f"Access denied: Only administrators can perform {', '.join([i for i in intent if 'INSERT' in i or 'UPDATE' in i or 'DELETE' in i or 'DROP' in i or 'TRUNCATE' in i])} operations."
-                
-        ollama_input_data = {
-            "original_query": q,
-            "intent": intent,
-            "query_str": "N/A (Access denied)",
-            "query_status": query_status,
-            "denial_reason": reason,
-            "sql": "",
-            "sample_rows_count": 0,
-            "is_aggregate_query": is_aggregate_intent,
-            "has_schema_entities": has_schema_entities
-        }
-                
-        commentary = await get_optimized_commentary(ollama_input_data, ai_used_for_intent)
-        log_query(user["username"], user["role"], q, "N/A", "denied", sql="N/A (Admin-only operation)")
-                
-        response_payload = {
-            "sample_rows": [],
-            "commentary": commentary,
-            "text_response": commentary,
-            "error": reason
-        }
-                
+    with timer.stage("encrypt"):
         resp_plain = json.dumps(response_payload, default=str).encode()
         out = aes_encrypt(resp_plain, sym_key)
-        return {
-            "nonce": base64.b64encode(out["nonce"]).decode(),
-            "ciphertext": base64.b64encode(out["ciphertext"]).decode()
-        }
-
-    ops_raw = comparison_operator_recognizer(t2)
-        
-    raw_vals = value_entity_recognizer(t2)
-    vals = []
-    for typ, val, lo, hi in raw_vals:
-        if typ == "STRING":
-            continue
-        if typ == "INTEGER" and YEAR_PATTERN.match(val):
-            typ = "DATE"
-        vals.append({"type": typ, "value": val, "span": (lo, hi)})
-
-    query_str = None
-    resolved_db = None
-    rows = []
-    commentary = ""
-    error_message = None
-    query_status = "no_sql"
-    
-    is_general_chat = not has_schema_entities and any(i in intent for i in ['greeting', 'general_question', 'unknown'])
-
-    ollama_input_data = {
-        "original_query": q,
-        "intent": intent,
-        "query_str": "N/A (No SQL generated yet)",
-        "query_status": query_status,
-        "denial_reason": "",
-        "sql": "",
-        "sample_rows_count": 0,
-        "is_aggregate_query": is_aggregate_intent,
-        "has_schema_entities": has_schema_entities
-    }
-
-    if is_general_chat:
-        query_status = "general_chat"
-        ollama_input_data["query_status"] = query_status
-        commentary = await get_optimized_commentary(ollama_input_data, ai_used_for_intent)
-    else:
-        query_str, resolved_db = await generate_sql_with_query_builder(q, intent, ents, ops_raw, vals, user["role"])
-        
-        if query_str and resolved_db:
-            print(f"\n===== Query Builder Generated SQL =====\nSQL: {query_str}\nDB: {resolved_db}")
-            
-            if not validate_query_access(user["role"], resolved_db, intent):
-                query_status = "denied"
-                reason = explain_denial(user["role"], resolved_db, intent)
-                log_query(user["username"], user["role"], q, resolved_db, "denied", sql=query_str)
-                ollama_input_data.update({
-                    "query_str": query_str,
-                    "query_status": query_status,
-                    "denial_reason": reason,
-                })
-                commentary = await get_optimized_commentary(ollama_input_data, ai_used_for_intent)
-                error_message = reason
-            else:
-                action_type = "read"
-                if is_destructive_operation(intent):
-                    if "INSERT_ROWS" in intent:
-                        action_type = "insert"
-                    elif "UPDATE_ROWS" in intent:
-                        action_type = "update"
-                    elif "DELETE_ROWS" in intent:
-                        action_type = "delete"
-                    elif any(drop_intent in intent for drop_intent in ["DROP_TABLE", "DROP_DATABASE", "TRUNCATE_TABLE"]):
-                        action_type = "drop"
-                                
-                success, result = verify_query(
-                    query_str,
-                    host='localhost', user='root', password='root',
-                    database=resolved_db
-                )
-                                
-                if success:
-                    query_status = "success"
-                    log_query(user["username"], user["role"], q, resolved_db, action_type, sql=f"[QUERY_BUILDER] {query_str}")
-                                            
-                    if is_destructive_operation(intent):
-                        rows = []
-                        ollama_input_data.update({
-                            "query_str": query_str,
-                            "query_status": query_status,
-                            "sample_rows_count": 0,
-                        })
-                    elif is_aggregate_intent:
-                        rows = result
-                        ollama_input_data.update({
-                            "query_str": query_str,
-                            "query_status": query_status,
-                            "sample_rows_count": 1,
-                        })
-                    else:
-                        rows = result[:5]
-                        ollama_input_data.update({
-                            "query_str": query_str,
-                            "query_status": query_status,
-                            "sample_rows_count": len(rows),
-                        })
-                                            
-                    commentary = await get_optimized_commentary(ollama_input_data, ai_used_for_intent)
-                else:
-                    query_status = "fail"
-                    log_query(user["username"], user["role"], q, resolved_db, "fail", sql=f"[QUERY_BUILDER_FAILED] {query_str}")
-                    error_message = f"SQL Failed: {result}"
-                    ollama_input_data.update({
-                        "query_str": query_str,
-                        "query_status": query_status,
-                        "sql": result,
-                    })
-                    commentary = await get_optimized_commentary(ollama_input_data, ai_used_for_intent)
-        else:
-            query_status = "no_sql"
-            ollama_input_data.update({
-                "query_status": query_status,
-                "query_str": "N/A (Query builder failed to generate SQL)"
-            })
-            commentary = await get_optimized_commentary(ollama_input_data, ai_used_for_intent)
-
-    print(f"\n===== OPTIMIZED COMMENTARY =====\n{commentary}")
-    print(f"[DEBUG] Total AI calls for this query: {1 if (ai_used_for_intent or (not has_schema_entities and query_status in ['general_chat', 'no_sql'])) else 0}")
-
-    response_payload = {
-        "sample_rows": rows,
-        "commentary": commentary,
-        "text_response": commentary,
-        "query_status": query_status,
-        "generated_sql": query_str if query_str else None,
-        "operation_type": "destructive" if is_destructive_operation(intent) else "read",
-        "used_query_builder": True if query_str else False,
-        "ai_calls_used": 1 if (ai_used_for_intent or (not has_schema_entities and query_status in ['general_chat', 'no_sql'])) else 0
-    }
-        
-    if error_message:
-        response_payload["error"] = error_message
-
-    resp_plain = json.dumps(response_payload, default=str).encode()
-    out = aes_encrypt(resp_plain, sym_key)
+    response.headers["Server-Timing"] = timer.server_timing_header()
     return {
         "nonce": base64.b64encode(out["nonce"]).decode(),
         "ciphertext": base64.b64encode(out["ciphertext"]).decode()
     }
 
 @app.post("/query/simple")
-async def simple_query(req: SimpleQueryRequest):
-    user = get_user(req.username, req.password)
+async def simple_query(req: SimpleQueryRequest, response: Response):
+    timer = StageTimer()
+    with timer.stage("auth"):
+        user = await run_io(get_user, req.username, req.password)
     if not user:
         raise HTTPException(401, "Invalid credentials.")
-    if req.username not in _active_sessions:
+    if not session_store.is_active(req.username):
         raise HTTPException(403, "User not actively logged in.")
-        
+
     q = req.query.strip().lower()
     if not q:
         raise HTTPException(400, "Empty query.")
 
-    print("\n===== RAW INPUT =====")
-    print(q)
-        
-    t1, dates = normalize_dates(q)
-    t2, units = normalize_units(t1 if dates else t1)
-    tok = tokenize(t2 if units else t1)
-    final_tokens = tok["Final Tokens"]
-    
-    ents = schema_entity_recognizer(final_tokens)
-    has_schema_entities = has_meaningful_schema_entities(ents)
-    
-    intent, ai_used_for_intent = intent_recognizer.predict_from_tokens(final_tokens, ents)
-    print(f"\n===== DETECTED INTENT =====\n{intent} (AI used: {ai_used_for_intent})")
-        
-    is_aggregate_intent = any(agg_intent in intent for agg_intent in ["AGGREGATE_AVG", "AGGREGATE_SUM", "AGGREGATE_MIN", "AGGREGATE_MAX"])
+    if req.total_rows is not None and req.total_rows not in TOTAL_ROWS_MODES:
+        raise HTTPException(400, "total_rows must be 'exact' or 'estimate'.")
 
-    if is_admin_only_operation(intent) and user["role"] != "admin":
-        query_status = "denied"
-        reason = f"Access denied: Only administrators can perform {', '.join([i for i in intent if 'INSERT' in i or 'UPDATE' in i or 'DELETE' in i or 'DROP' in i or 'TRUNCATE' in i])} operations."
-            
-        ollama_input_data = {
-            "original_query": q,
-            "intent": intent,
-            "query_str": "N/A (Access denied)",
-            "query_status": query_status,
-            "denial_reason": reason,
-            "sql": "",
-            "sample_rows_count": 0,
-            "is_aggregate_query": is_aggregate_intent,
-            "has_schema_entities": has_schema_entities
-        }
-                
-        commentary = await get_optimized_commentary(ollama_input_data, ai_used_for_intent)
-        log_query(user["username"], user["role"], q, "N/A", "denied", sql="N/A (Admin-only operation)")
-                
-        return {
-            "sample_rows": [],
-            "commentary": commentary,
-            "text_response": commentary,
-            "query_status": query_status,
-            "generated_sql": None,
-            "error": reason,
-            "ai_calls_used": 1 if (ai_used_for_intent or (not has_schema_entities and query_status in ['general_chat', 'no_sql'])) else 0
-        }
-        
-    ops_raw = comparison_operator_recognizer(t2)
-        
-    raw_vals = value_entity_recognizer(t2)
-    vals = []
-    for typ, val, lo, hi in raw_vals:
-        if typ == "STRING":
-            continue
-        if typ == "INTEGER" and YEAR_PATTERN.match(val):
-            typ = "DATE"
-        vals.append({"type": typ, "value": val, "span": (lo, hi)})
-
-    query_str = None
-    resolved_db = None
-    rows = []
-    commentary = ""
-    error_message = None
-    query_status = "no_sql"
-    
-    is_general_chat = not has_schema_entities and any(i in intent for i in ['greeting', 'general_question', 'unknown'])
-
-    ollama_input_data = {
-        "original_query": q,
-        "intent": intent,
-        "query_str": "N/A (No SQL generated yet)",
-        "query_status": query_status,
-        "denial_reason": "",
-        "sql": "",
-        "sample_rows_count": 0,
-        "is_aggregate_query": is_aggregate_intent,
-        "has_schema_entities": has_schema_entities
-    }
+    language = resolve_language(req.language)
+    response_payload = await query_pipeline.run(user, q, timer, total_rows=req.total_rows, language=language)
+    if req.include_timings:
+        response_payload["timings"] = timer.as_dict()
+    response.headers["Server-Timing"] = timer.server_timing_header()
+    return response_payload
 
-    if is_general_chat:
-        query_status = "general_chat"
-        ollama_input_data["query_status"] = query_status
-        commentary = await get_optimized_commentary(ollama_input_data, ai_used_for_intent)
-        
-    else:
-        query_str, resolved_db = await generate_sql_with_query_builder(q, intent, ents, ops_raw, vals, user["role"])
-        
-        if query_str and resolved_db:
-            print(f"\n===== Query Builder Generated SQL =====\nSQL: {query_str}\nDB: {resolved_db}")
-            
-            if not validate_query_access(user["role"], resolved_db, intent):
-                query_status = "denied"
-                reason = explain_denial(user["role"], resolved_db, intent)
-                log_query(user["username"], user["role"], q, resolved_db, "denied", sql=query_str)
-                ollama_input_data.update({
-                    "query_str": query_str,
-                    "query_status": query_status,
-                    "denial_reason": reason,
-                })
-                commentary = await get_optimized_commentary(ollama_input_data, ai_used_for_intent)
-                error_message = reason
-            else:
-                action_type = "read"
-                if is_destructive_operation(intent):
-                    if "INSERT_ROWS" in intent:
-                        action_type = "insert"
-                    elif "UPDATE_ROWS" in intent:
-                        action_type = "update"
-                    elif "DELETE_ROWS" in intent:
-                        action_type = "delete"
-                    elif any(drop_intent in intent for drop_intent in ["DROP_TABLE", "DROP_DATABASE", "TRUNCATE_TABLE"]):
-                        action_type = "drop"
-                                
-                success, result = verify_query(
-                    query_str,
-                    host='localhost', user='root', password='root',
-                    database=resolved_db
-                )
-                                
-                if success:
-                    query_status = "success"
-                    log_query(user["username"], user["role"], q, resolved_db, action_type, sql=f"[QUERY_BUILDER] {query_str}")
-                                            
-                    if is_destructive_operation(intent):
-                        rows = []
-                        ollama_input_data.update({
-                            "query_str": query_str,
-                            "query_status": query_status,
-                            "sample_rows_count": 0,
-                        })
-                    elif is_aggregate_intent:
-                        rows = result
-                        ollama_input_data.update({
-                            "query_str": query_str,
-                            "query_status": query_status,
-                            "sample_rows_count": 1,
-                        })
-                    else:
-                        rows = result[:5]
-                        ollama_input_data.update({
-                            "query_str": query_str,
-                            "query_status": query_status,
-                            "sample_rows_count": len(rows),
-                        })
-                                            
-                    commentary = await get_optimized_commentary(ollama_input_data, ai_used_for_intent)
-                else:
-                    query_status = "fail"
-                    log_query(user["username"], user["role"], q, resolved_db, "fail", sql=f"[QUERY_BUILDER_FAILED] {query_str}")
-                    error_message = f"SQL Failed: {result}"
-                    ollama_input_data.update({
-                        "query_str": query_str,
-                        "query_status": query_status,
-                        "sql": result,
-                    })
-                    commentary = await get_optimized_commentary(ollama_input_data, ai_used_for_intent)
-        else:
-            query_status = "no_sql"
-            ollama_input_data.update({
-                "query_status": query_status,
-                "query_str": "N/A (Query builder failed to generate SQL)"
-            })
-            commentary = await get_optimized_commentary(ollama_input_data, ai_used_for_intent)
+@app.post("/query/stream")
+async def stream_query_rows(req: StreamQueryRequest):
+    user = await run_io(get_user, req.username, req.password)
+    if not user:
+        raise HTTPException(401, "Invalid credentials.")
+    if not session_store.is_active(req.username):
+        raise HTTPException(403, "User not actively logged in.")
+    if req.format not in ("ndjson", "sse"):
+        raise HTTPException(400, "format must be 'ndjson' or 'sse'.")
 
-    print(f"\n===== OPTIMIZED COMMENTARY =====\n{commentary}")
-    
-    ai_calls_used = 0
-    if ai_used_for_intent:
-        ai_calls_used += 1
-    if not has_schema_entities and query_status in ['general_chat', 'no_sql'] and not ai_used_for_intent:
-        ai_calls_used += 1
-    
-    print(f"[DEBUG] Total AI calls for this query: {ai_calls_used}")
-
-    response_payload = {
-        "sample_rows": rows,
-        "commentary": commentary,
-        "text_response": commentary,
-        "query_status": query_status,
-        "generated_sql": query_str if query_str else None,
-        "operation_type": "destructive" if is_destructive_operation(intent) else "read",
-        "used_query_builder": True if query_str else False,
-        "ai_calls_used": ai_calls_used
+    q = req.query.strip().lower()
+    if not q:
+        raise HTTPException(400, "Empty query.")
+
+    language = resolve_language(req.language)
+    plan, error = await query_pipeline.plan_read_query(user, q, language=language)
+    if error:
+        raise HTTPException(*error)
+
+    query_str = plan["query_str"]
+    resolved_db = plan["resolved_db"]
+    await run_io(log_query, user["username"], user["role"], q, resolved_db, "read", sql=f"[STREAM] {query_str}")
+
+    batches = stream_query(
+        query_str,
+        host='localhost', user='root', password='root',
+        database=resolved_db
+    )
+    meta = {"generated_sql": query_str, "database": resolved_db}
+    if req.format == "sse":
+        return StreamingResponse(sse_events(batches, meta), media_type="text/event-stream")
+    return StreamingResponse(ndjson_events(batches, meta), media_type="application/x-ndjson")
+
+@app.post("/query/page")
+async def query_page(req: PageQueryRequest, response: Response):
+    """Next page of an earlier /query result, addressed by the page_token it returned"""
+    timer = StageTimer()
+    with timer.stage("auth"):
+        user = await run_io(get_user, req.username, req.password)
+    if not user:
+        raise HTTPException(401, "Invalid credentials.")
+    if not session_store.is_active(req.username):
+        raise HTTPException(403, "User not actively logged in.")
+
+    payload, error = await query_pipeline.fetch_page(user, req.page_token, req.page_size, timer)
+    if error:
+        raise HTTPException(*error)
+    await run_io(log_query, user["username"], user["role"], "[PAGE]", payload["database"], "read", sql=f"[KEYSET_PAGE] {payload['generated_sql']}")
+    response.headers["Server-Timing"] = timer.server_timing_header()
+    return payload
+
+def resolve_language(language):
+    """Per-request stanza language, defaulting to the server-wide one"""
+    if language is None:
+        return tokenizer_stanza.lang
+    language = str(language).strip().lower()
+    if language not in SUPPORTED_LANGUAGES:
+        raise HTTPException(400, f"Unsupported language '{language}'. Supported: {', '.join(SUPPORTED_LANGUAGES)}.")
+    return language
+
+def clean_batch_queries(raw_queries):
+    if not isinstance(raw_queries, list):
+        raise HTTPException(400, "Expected a list of queries.")
+    queries = [str(q).strip().lower() for q in raw_queries]
+    queries = [q for q in queries if q]
+    if not queries:
+        raise HTTPException(400, "Empty query batch.")
+    if len(queries) > MAX_BATCH_QUERIES:
+        raise HTTPException(400, f"Too many queries in one batch (max {MAX_BATCH_QUERIES}).")
+    return queries
+
+@app.post("/query/batch")
+async def encrypted_batch_query(req: EncryptedQueryRequest, response: Response):
+    print("\n===== ENCRYPTED BATCH QUERY PAYLOAD RECEIVED =====")
+    timer = StageTimer()
+    try:
+        with timer.stage("decrypt"):
+            data, sym_key = await open_envelope(req)
+    except SessionKeyError as e:
+        raise HTTPException(401, str(e))
+    except Exception as e:
+        print(f"ERROR: Failed to decrypt batch query payload - {e}")
+        raise HTTPException(400, "Invalid encrypted payload for query")
+
+    with timer.stage("auth"):
+        user = await run_io(get_user, data["username"], data["password"])
+    if not user:
+        raise HTTPException(401, "Invalid credentials.")
+    if not session_store.is_active(data["username"]):
+        raise HTTPException(403, "User not actively logged in.")
+
+    queries = clean_batch_queries(data.get("queries"))
+    language = resolve_language(data.get("language"))
+    results = await query_pipeline.run_batch(user, queries, timer, bool(data.get("include_timings")), language)
+    response_payload = {"results": results}
+    if data.get("include_timings"):
+        response_payload["timings"] = timer.as_dict()
+
+    with timer.stage("encrypt"):
+        resp_plain = json.dumps(response_payload, default=str).encode()
+        out = aes_encrypt(resp_plain, sym_key)
+    response.headers["Server-Timing"] = timer.server_timing_header()
+    return {
+        "nonce": base64.b64encode(out["nonce"]).decode(),
+        "ciphertext": base64.b64encode(out["ciphertext"]).decode()
     }
-        
-    if error_message:
-        response_payload["error"] = error_message
 
+@app.post("/query/batch/simple")
+async def simple_batch_query(req: SimpleBatchQueryRequest, response: Response):
+    timer = StageTimer()
+    with timer.stage("auth"):
+        user = await run_io(get_user, req.username, req.password)
+    if not user:
+        raise HTTPException(401, "Invalid credentials.")
+    if not session_store.is_active(req.username):
+        raise HTTPException(403, "User not actively logged in.")
+
+    queries = clean_batch_queries(req.queries)
+    language = resolve_language(req.language)
+    results = await query_pipeline.run_batch(user, queries, timer, req.include_timings, language)
+    response_payload = {"results": results}
+    if req.include_timings:
+        response_payload["timings"] = timer.as_dict()
+    response.headers["Server-Timing"] = timer.server_timing_header()
     return response_payload
 
 @app.post("/analyze-document")
@@ -940,13 +574,14 @@ async def analyze_document(file: UploadFile = File(...)):
     finally:
         os.remove(temp_file_path)
         
-    normalized_text, _ = normalize_dates(content.lower())
-    normalized_text, _ = normalize_units(normalized_text)
+    normalized_text, _ = await run_cpu(normalize_dates, content.lower())
+    normalized_text, _ = await run_cpu(normalize_units, normalized_text)
         
-    tokens = tokenize(normalized_text)["Final Tokens"]
+    tok = await tokenizer_pool.tokenize_async(normalized_text)
+    tokens = tok["Final Tokens"]
         
-    schema_entities = schema_entity_recognizer(tokens)
-    value_entities = value_entity_recognizer(normalized_text)
+    schema_entities = await run_cpu(schema_entity_recognizer, tokens)
+    value_entities = await run_cpu(value_entity_recognizer, normalized_text)
         
     extracted_pills = set()
         
@@ -961,8 +596,6 @@ async def analyze_document(file: UploadFile = File(...)):
 
 @app.post("/summarize-document")
 async def summarize_document(file: UploadFile = File(...)):
-    global _ollama_client
-        
     temp_file_path = f"./temp_{file.filename}"
     with open(temp_file_path, "wb") as buffer:
         shutil.copyfileobj(file.file, buffer)
@@ -980,39 +613,29 @@ async def summarize_document(file: UploadFile = File(...)):
     try:
         prompt = f"Please provide a concise summary of the following document:\n\n---\n\n{content}\n\n---\n\nSummary:"
                 
-        response = await _ollama_client.post(
-            "http://localhost:11434/api/generate",
-            json={
-                "prompt": prompt,
-                "model": "gemma:2b",
-                "stream": False
-            }
-        )
-        response.raise_for_status()
-                
-        json_response = response.json()
-        summary = json_response.get("response", "").strip()
-                
-        if not summary:
-            raise HTTPException(status_code=500, detail="Failed to generate summary from the model.")
-                    
-        return {"summary": summary}
-            
+        summary = await llm_gateway.generate(prompt, deadline=SUMMARY_DEADLINE_SECONDS)
+    except LLMUnavailable as e:
+        print(f"Ollama summarization unavailable: {e}")
+        raise HTTPException(status_code=503, detail="The summarization model is unavailable right now; please try again shortly.")
     except Exception as e:
         print(f"Ollama summarization error: {e}")
         raise HTTPException(status_code=500, detail="An error occurred while generating the summary.")
 
+    if not summary:
+        raise HTTPException(status_code=500, detail="Failed to generate summary from the model.")
+    return {"summary": summary}
+
 @app.post("/summarize-document-with-auth")
 async def summarize_document_with_auth(
     file: UploadFile = File(...),
     username: str = Form(...),
     password: str = Form(...)
 ):
-    user = get_user(username, password)
+    user = await run_io(get_user, username, password)
     if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    if username not in _active_sessions:
+    if not session_store.is_active(username):
         raise HTTPException(status_code=403, detail="User not actively logged in")
     
     print(f"Document summarization requested by user: {username} ({user['role']})")
@@ -1074,6 +697,23 @@ def access_logs(admin_user: str, admin_pass: str):
     except Exception as e:
         return {"logs": [], "error": f"Unexpected error: {str(e)}"}
 
+@app.get("/admin/cache-stats")
+def cache_stats(admin_user: str, admin_pass: str):
+    user = get_user(admin_user, admin_pass)
+    if not user or user["role"] != "admin":
+        raise HTTPException(403, "Only admin can view cache statistics.")
+    return {
+        "response_cache": query_pipeline.response_cache.stats(),
+        "plan_cache": query_pipeline.plan_cache.stats(),
+        "user_cache": user_cache_stats(),
+        "tokenize_batcher": tokenizer_pool.batcher_stats(),
+        "lemma_cache": tokenizer_pool.lemma_cache_stats(),
+        "nlp_pipelines": tokenizer_stanza.pipelines.stats(),
+        "llm_gateway": llm_gateway.stats(),
+        "intent_classifier": intent_recognizer.classifier_stats(),
+        "llm_cache": llm_cache.stats() if llm_cache else {"enabled": False},
+    }
+
 @app.post("/admin/lock")
 def lock_user(data: LockUserRequest):
     user = get_user(data.admin_user, data.admin_pass)
@@ -1082,8 +722,10 @@ def lock_user(data: LockUserRequest):
     if not user_exists(data.target_user):
         raise HTTPException(404, f"User '{data.target_user}' not found.")
     until = datetime.now() + timedelta(minutes=data.duration_minutes)
-    _failed_logins[data.target_user] = {"count": 999, "lock_until": until}
-    _active_sessions.pop(data.target_user, None)
+    session_store.lock(data.target_user, data.duration_minutes * 60)
+    session_store.deactivate(data.target_user)
+    _session_keys.drop_user(data.target_user)
+    invalidate_user(data.target_user)
     log_access(data.target_user, f"ADMIN_LOCKOUT_{data.duration_minutes}m")
     log_access_to_db(data.target_user, f"ADMIN_LOCKOUT_{data.duration_minutes}m")
     return {"locked_user": data.target_user, "until": until.strftime("%Y-%m-%d %H:%M:%S")}
@@ -1344,6 +986,20 @@ def add_user(data: AddUserRequest):
     pwd = create_user(data.target_user, data.department, data.position)
     return {"username": data.target_user, "password": pwd}
 
+@app.post("/admin/update_role")
+def update_role(data: UpdateRoleRequest):
+    user = get_user(data.admin_user, data.admin_pass)
+    if not user or user["role"] != "admin":
+        raise HTTPException(403, "Only admin can change roles.")
+    if data.role not in ROLE_DATABASE_ACCESS:
+        raise HTTPException(400, f"Unknown role '{data.role}'.")
+    if not user_exists(data.target_user):
+        raise HTTPException(404, f"User '{data.target_user}' not found.")
+    if not update_user_role(data.target_user, data.role):
+        raise HTTPException(500, "Could not update role.")
+    log_access(data.target_user, f"ROLE_CHANGED_TO_{data.role}")
+    return {"username": data.target_user, "role": data.role}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
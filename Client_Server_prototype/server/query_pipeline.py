@@ -0,0 +1,754 @@
+import re
+import asyncio
+from NLP_pipeline import tokenizer_stanza
+from NLP_pipeline.tokenizer_stanza import load_schema
+from NLP_pipeline.schema_index import get_schema_index
+from NLP_pipeline.tokenizer_pool import tokenize_async, tokenize_batch_async
+from NLP_pipeline.schema_entity_recognizer import schema_entity_recognizer
+from NLP_pipeline.comparison_operator_recognizer import comparison_operator_recognizer
+from NLP_pipeline.value_entity_recognizer import value_entity_recognizer
+from NLP_pipeline.normalize_units import normalize_units
+from NLP_pipeline.normalize_dates import normalize_dates
+from Query_Builder.query_builder_factory import build_query, is_destructive_operation
+from Query_Builder.query_verifier import verify_query, count_rows
+from Query_Builder.select_builder import strip_preview_limit
+from Query_Builder.keyset_pagination import parse_select, get_primary_key, fetch_page, clear_primary_key_cache, MAX_PAGE_SIZE
+from Query_Builder.query_logger import log_query
+from Query_Builder.rbac import validate_query_access, explain_denial, is_admin_only_operation, ROLE_DATABASE_ACCESS
+from common.executors import run_cpu, run_io
+from common.timing import StageTimer
+from common.response_cache import ResponseCache
+from common.plan_cache import PlanCache, mask_literals, sentinel_values, bind_literals
+from common.page_token import encode_page_token, decode_page_token
+
+YEAR_PATTERN = re.compile(r"^\d{4}$")
+TRAILING_PUNCT_PATTERN = re.compile(r"[\s?!.]+$")
+
+AGGREGATE_INTENTS = ["AGGREGATE_AVG", "AGGREGATE_SUM", "AGGREGATE_MIN", "AGGREGATE_MAX"]
+SAMPLE_ROWS = 5
+MAX_BATCH_QUERIES = 50
+TOTAL_ROWS_MODES = ("exact", "estimate")
+BATCH_CONCURRENCY = 8
+AI_COMMENTARY_DEADLINE_SECONDS = 8.0
+
+DESTRUCTIVE_INTENTS = [
+    "INSERT_ROWS", "UPDATE_ROWS", "DELETE_ROWS",
+    "DROP_TABLE", "DROP_DATABASE", "TRUNCATE_TABLE"
+]
+
+def enhanced_operator_column_linking(entities, operators, intent):
+    all_identified_columns = [e['value'] for e in entities if e['type'] == 'column']
+
+    agg_column = None
+    if any(agg_intent in intent for agg_intent in AGGREGATE_INTENTS):
+        if all_identified_columns:
+            agg_column = all_identified_columns[0]
+
+    structured_ops = []
+    if operators and all_identified_columns:
+        filter_columns = []
+
+        if agg_column:
+            filter_columns = [col for col in all_identified_columns if col != agg_column]
+            if not filter_columns:
+                filter_columns = [all_identified_columns[0]]
+        else:
+            filter_columns = all_identified_columns
+
+        for i, operator_item in enumerate(operators):
+            if isinstance(operator_item, tuple) and len(operator_item) >= 2:
+                op_symbol = operator_item[0]
+                op_text = operator_item[1]
+            else:
+                op_symbol = str(operator_item)
+                op_text = str(operator_item)
+
+            if i < len(filter_columns):
+                target_column = filter_columns[i]
+            else:
+                target_column = filter_columns[-1] if filter_columns else all_identified_columns[0]
+
+            structured_ops.append((target_column, op_symbol, op_text))
+    elif operators:
+        for operator_item in operators:
+            if isinstance(operator_item, tuple) and len(operator_item) >= 2:
+                op_symbol = operator_item[0]
+                op_text = operator_item[1]
+            else:
+                op_symbol = str(operator_item)
+                op_text = str(operator_item)
+
+            structured_ops.append((None, op_symbol, op_text))
+
+    return structured_ops, agg_column
+
+def generate_sql_with_query_builder(original_query: str, intent: list, entities: list, operators: list, values: list, user_role: str):
+    try:
+        print(f"\n--- Query Builder SQL Generation ---")
+        print(f"Original Query: {original_query}")
+        print(f"Intent: {intent}")
+        print(f"Entities: {entities}")
+        print(f"Operators: {operators}")
+        print(f"Values: {values}")
+        print(f"User Role: {user_role}")
+
+        structured_ops, agg_column = enhanced_operator_column_linking(entities, operators, intent)
+
+        print(f"Structured Operators: {structured_ops}")
+        print(f"Aggregate Column: {agg_column}")
+
+        query_str, resolved_db = build_query(intent, entities, structured_ops, values, preview_limit=SAMPLE_ROWS)
+
+        print(f"\n--- Query Builder Generated SQL ---\n{query_str}\nDB: {resolved_db}\n---------------------")
+
+        if query_str and not query_str.startswith("ERROR:"):
+            if not resolved_db:
+                db_entities = [e for e in entities if e.get('type') == 'database' and e.get('value')]
+                if db_entities:
+                    resolved_db = db_entities[0]['value']
+
+                schema_index = get_schema_index()
+                if not resolved_db:
+                    table_entities = [e for e in entities if e.get('type') == 'table' and e.get('value')]
+                    if table_entities:
+                        resolved_db = schema_index.db_for(table_entities[0]['value'])
+
+                if not resolved_db:
+                    column_entities = [e for e in entities if e.get('type') == 'column' and e.get('value')]
+                    if column_entities:
+                        resolved_db = schema_index.db_for(column_entities[0]['value'])
+
+                if not resolved_db:
+                    resolved_db = schema_index.first_db
+
+            return query_str, resolved_db
+
+        return None, None
+
+    except Exception as e:
+        print(f"Query Builder SQL Generation Error: {e}")
+        return None, None
+
+def build_sql_template(original_query: str, intent: list, entities: list, operators: list, values: list, user_role: str, query_str: str):
+    """
+    Rebuild the SQL with placeholder literals. The template is only usable
+    when binding the real values reproduces the SQL we just generated.
+    """
+    sql_template, _ = generate_sql_with_query_builder(original_query, intent, entities, operators, sentinel_values(values), user_role)
+    if sql_template and bind_literals(sql_template, values) == query_str:
+        return sql_template
+    return None
+
+def has_meaningful_schema_entities(entities: list) -> bool:
+    meaningful_entities = [
+        e for e in entities
+        if e.get('type') in ['database', 'table', 'column']
+        and e.get('value')
+        and e.get('type') != 'unmatched'
+        and len(e.get('value', '').strip()) > 0
+    ]
+    return len(meaningful_entities) > 0
+
+def extract_values(text: str):
+    raw_vals = value_entity_recognizer(text)
+    vals = []
+    for typ, val, lo, hi in raw_vals:
+        if typ == "STRING":
+            continue
+        if typ == "INTEGER" and YEAR_PATTERN.match(val):
+            typ = "DATE"
+        vals.append({"type": typ, "value": val, "span": (lo, hi)})
+    return vals
+
+def canonicalize_question(q: str) -> str:
+    """Collapse whitespace, trailing punctuation, dates and units so equivalent questions share a cache key"""
+    text = TRAILING_PUNCT_PATTERN.sub("", " ".join(q.lower().split()))
+    text, _ = normalize_dates(text)
+    text, _ = normalize_units(text)
+    return text
+
+def plan_cache_key(language: str, text: str, values: list) -> tuple:
+    """
+    Plans depend on how the phrase trie combined the tokens, so the key carries
+    its version: plans made before schema phrase lemmas were learned are never reused
+    """
+    return (language, tokenizer_stanza.phrase_version(language), mask_literals(text, values))
+
+def response_cache_key(q: str, role: str, language: str) -> tuple:
+    return ResponseCache.make_key(
+        canonicalize_question(q), role, ROLE_DATABASE_ACCESS.get(role), language,
+        tokenizer_stanza.phrase_version(language)
+    )
+
+def get_action_type(intent):
+    if not is_destructive_operation(intent):
+        return "read"
+    if "INSERT_ROWS" in intent:
+        return "insert"
+    elif "UPDATE_ROWS" in intent:
+        return "update"
+    elif "DELETE_ROWS" in intent:
+        return "delete"
+    elif any(drop_intent in intent for drop_intent in ["DROP_TABLE", "DROP_DATABASE", "TRUNCATE_TABLE"]):
+        return "drop"
+    return "read"
+
+def get_template_commentary(input_data):
+    original_query = input_data.get('original_query', 'N/A')
+    query_status = input_data.get('query_status', 'N/A')
+    denial_reason = input_data.get('denial_reason', '')
+    sql_error = input_data.get('sql', '')
+    sample_rows_count = input_data.get('sample_rows_count', 0)
+    intent = input_data.get('intent', [])
+    is_aggregate_query = input_data.get('is_aggregate_query', False)
+
+    is_destructive = any(destructive_intent in intent for destructive_intent in DESTRUCTIVE_INTENTS)
+
+    if query_status == "success":
+        if is_destructive:
+            return f"✅ Successfully executed your data modification request. The operation has been completed and logged for security purposes."
+        elif is_aggregate_query:
+            return f"✅ Successfully calculated the result for your query. The aggregate value has been retrieved from the database."
+        else:
+            return f"✅ Found {sample_rows_count} relevant entries matching your query criteria."
+
+    elif query_status == "denied":
+        if is_destructive:
+            return f"❌ Access denied: Data modification operations require administrator privileges. Please contact your administrator if you need to make changes to the data."
+        else:
+            return f"❌ Access denied: {denial_reason}. Please check your permissions or contact your administrator."
+
+    elif query_status == "fail":
+        return f"❌ Query execution failed: {sql_error}. Please check your query syntax and try again."
+
+    else:
+        return f"❓ I couldn't process your request. Please try rephrasing your query with more specific database terms."
+
+class QueryPipeline:
+    """
+    Shared natural-language query pipeline used by every /query endpoint.
+    CPU-bound stages run on the CPU executor and MySQL/log writes on the
+    I/O executor so a slow parse or query never blocks the event loop.
+    """
+    def __init__(self, intent_recognizer, response_cache: ResponseCache = None, plan_cache: PlanCache = None):
+        self.intent_recognizer = intent_recognizer
+        self.llm = None
+        self.response_cache = response_cache or ResponseCache()
+        self.plan_cache = plan_cache or PlanCache()
+
+    def reload_schema(self):
+        """Pick up a rewritten plugin_schema.json and drop everything resolved against the old one"""
+        load_schema()
+        self.plan_cache.clear()
+        self.response_cache.clear()
+        clear_primary_key_cache()
+        print("[DEBUG] Schema reloaded; plan and response caches cleared")
+
+    async def get_optimized_commentary(self, input_data, ai_already_used: bool = False):
+        query_status = input_data.get('query_status', 'N/A')
+        has_schema_entities = input_data.get('has_schema_entities', True)
+
+        use_ai_commentary = (
+            not has_schema_entities and
+            not ai_already_used and
+            query_status in ["general_chat", "no_sql"]
+        )
+
+        if use_ai_commentary:
+            print(f"[DEBUG] Using AI commentary for general chat query")
+            return await self.get_ai_commentary(input_data)
+        else:
+            print(f"[DEBUG] Using template-based commentary (AI already used: {ai_already_used}, Has schema: {has_schema_entities})")
+            return get_template_commentary(input_data)
+
+    async def get_ai_commentary(self, input_data):
+        try:
+            original_query = input_data.get('original_query', 'N/A')
+            query_status = input_data.get('query_status', 'N/A')
+
+            base_instruction = "You are ConversQL, a friendly database assistant. The user's input doesn't seem to be a database query."
+
+            if query_status == "general_chat":
+                prompt = f"""{base_instruction}
+
+User said: "{original_query}"
+
+Please respond as a helpful AI assistant. If they're trying to ask about data, gently guide them to be more specific about what database information they need.
+
+Response:"""
+            else:
+                prompt = f"""{base_instruction}
+
+User requested: "{original_query}"
+
+I couldn't understand this as a database query. Please provide a brief, helpful response explaining that I need more specific database-related questions, and give an example of how they could rephrase their request.
+
+Response:"""
+
+            print(f"\n--- AI Commentary Prompt ---\n{prompt}\n---------------------")
+
+            ollama_text = await self.llm.generate(
+                prompt,
+                options={
+                    "temperature": 0.5,
+                    "top_p": 0.7,
+                    "num_predict": 100,
+                    "stop": ["\n\n", "User:", "ConversQL:"]
+                },
+                deadline=AI_COMMENTARY_DEADLINE_SECONDS
+            )
+
+            if ollama_text:
+                return ollama_text
+            else:
+                return get_template_commentary(input_data)
+
+        except Exception as e:
+            print(f"AI commentary error: {e}")
+            return get_template_commentary(input_data)
+
+    async def plan(self, q: str, role: str, timer: StageTimer = None, tok: dict = None, language: str = None) -> dict:
+        """
+        Resolve a question into intent, entities, operators, values and SQL.
+        Questions that only differ in their literals reuse a cached plan and
+        just bind the new values into its SQL template.
+        """
+        timer = timer or StageTimer()
+        language = language or tokenizer_stanza.lang
+        with timer.stage("normalize_dates"):
+            t1, dates = await run_cpu(normalize_dates, q)
+        with timer.stage("normalize_units"):
+            t2, units = await run_cpu(normalize_units, t1)
+        with timer.stage("value_entity_recognizer"):
+            vals = await run_cpu(extract_values, t2)
+
+        plan_key = plan_cache_key(language, t2, vals)
+        cached_plan = self.plan_cache.get(plan_key)
+        if cached_plan is not None:
+            print(f"[DEBUG] Plan cache hit for: {plan_key}")
+            with timer.stage("build_query"):
+                query_str = bind_literals(cached_plan["sql_template"], vals)
+            return dict(
+                cached_plan,
+                query=q,
+                text=t2,
+                values=vals,
+                query_str=query_str,
+                ai_used_for_intent=False,
+                plan_cache_hit=True,
+            )
+
+        if tok is None:
+            with timer.stage("tokenize"):
+                tok = await tokenize_async(t2, language)
+        final_tokens = tok["Final Tokens"]
+
+        with timer.stage("schema_entity_recognizer"):
+            ents = await run_cpu(schema_entity_recognizer, final_tokens)
+        has_schema_entities = has_meaningful_schema_entities(ents)
+
+        with timer.stage("intent", "IntentRecognizer.predict_from_tokens"):
+            intent = await run_cpu(self.intent_recognizer.match_or_classify, final_tokens, ents, t2)
+            ai_used_for_intent = False
+            if intent is None:
+                # only the AI can tell; it runs on the event loop through the shared LLM gateway
+                intent, ai_used_for_intent = await self.intent_recognizer.apredict_with_ai(final_tokens)
+        print(f"\n===== DETECTED INTENT =====\n{intent} (AI used: {ai_used_for_intent})")
+
+        result = {
+            "query": q,
+            "text": t2,
+            "tokens": final_tokens,
+            "entities": ents,
+            "has_schema_entities": has_schema_entities,
+            "intent": intent,
+            "ai_used_for_intent": ai_used_for_intent,
+            "is_aggregate": any(agg_intent in intent for agg_intent in AGGREGATE_INTENTS),
+            "is_general_chat": not has_schema_entities and any(i in intent for i in ['greeting', 'general_question', 'unknown']),
+            "admin_only": is_admin_only_operation(intent) and role != "admin",
+            "operators": [],
+            "values": vals,
+            "query_str": None,
+            "resolved_db": None,
+            "plan_cache_hit": False,
+        }
+        if result["admin_only"]:
+            return result
+
+        with timer.stage("comparison_operator_recognizer"):
+            ops_raw = await run_cpu(comparison_operator_recognizer, t2)
+        result["operators"] = ops_raw
+        if result["is_general_chat"]:
+            return result
+
+        with timer.stage("build_query"):
+            query_str, resolved_db = await run_cpu(generate_sql_with_query_builder, q, intent, ents, ops_raw, vals, role)
+        result["query_str"] = query_str
+        result["resolved_db"] = resolved_db
+
+        if query_str and resolved_db and not is_destructive_operation(intent):
+            sql_template = await run_cpu(build_sql_template, q, intent, ents, ops_raw, vals, role, query_str)
+            if sql_template:
+                structured_ops, _ = enhanced_operator_column_linking(ents, ops_raw, intent)
+                self.plan_cache.put(plan_key, {
+                    "tokens": final_tokens,
+                    "entities": ents,
+                    "has_schema_entities": has_schema_entities,
+                    "intent": intent,
+                    "is_aggregate": result["is_aggregate"],
+                    "is_general_chat": False,
+                    "admin_only": False,
+                    "operators": ops_raw,
+                    "structured_operators": structured_ops,
+                    "resolved_db": resolved_db,
+                    "sql_template": sql_template,
+                })
+        return result
+
+    async def run(self, user: dict, q: str, timer: StageTimer = None, tok: dict = None, total_rows: str = None,
+                  language: str = None) -> dict:
+        """
+        Answer a question from the response cache, or run the pipeline and cache the result.
+        total_rows ("exact" or "estimate") additionally reports how many rows the query matches.
+        language picks the stanza pipeline; it defaults to the server-wide language.
+        """
+        timer = timer or StageTimer()
+        language = language or tokenizer_stanza.lang
+        with timer.stage("response_cache"):
+            cache_key = response_cache_key(q, user["role"], language)
+            cached = self.response_cache.get(cache_key)
+        if cached is not None:
+            print(f"[DEBUG] Response cache hit for: {q}")
+            if cached.get("query_status") == "success":
+                await run_io(log_query, user["username"], user["role"], q, cached.get("database"), "read", sql=f"[RESPONSE_CACHE] {cached.get('generated_sql')}")
+            cached["cached"] = True
+            cached["ai_calls_used"] = 0
+            await self.add_total_rows(cached, total_rows, timer)
+            return cached
+
+        # read before the query so a write landing while it runs leaves the answer already stale
+        versions = self.response_cache.database_versions()
+        response_payload = await self.execute(user, q, timer, tok, language)
+
+        query_status = response_payload.get("query_status")
+        if query_status == "success" and response_payload.get("operation_type") == "read":
+            self.response_cache.put(cache_key, response_payload, db=response_payload.get("database"), versions=versions)
+        elif query_status in ("general_chat", "no_sql"):
+            self.response_cache.put(cache_key, response_payload, negative=True)
+        await self.add_total_rows(response_payload, total_rows, timer)
+        return response_payload
+
+    async def add_total_rows(self, payload: dict, mode: str, timer: StageTimer = None):
+        """
+        Attach total_rows to a successful read. Kept out of the cached payload and
+        only run on request, so the preview query itself stays LIMITed and cheap.
+        """
+        if mode not in TOTAL_ROWS_MODES or payload.get("query_status") != "success":
+            return
+        if payload.get("operation_type") != "read" or not payload.get("generated_sql"):
+            return
+        timer = timer or StageTimer()
+        with timer.stage("count_rows"):
+            success, result = await run_io(
+                count_rows,
+                payload["generated_sql"],
+                host='localhost', user='root', password='root',
+                database=payload.get("database"),
+                exact=(mode == "exact")
+            )
+        if success:
+            payload["total_rows"] = result
+            payload["total_rows_exact"] = mode == "exact"
+        else:
+            print(f"[DEBUG] Could not count rows: {result}")
+
+    async def plan_read_query(self, user: dict, q: str, timer: StageTimer = None, language: str = None):
+        """
+        Plan a question whose rows will be delivered directly (streaming, paging).
+        Returns (plan, None) when the user may read the generated SQL,
+        otherwise (None, (http_status, reason)).
+        """
+        plan = await self.plan(q, user["role"], timer, language=language)
+        intent = plan["intent"]
+        if plan["admin_only"] or is_destructive_operation(intent):
+            return None, (400, "Only read queries can be streamed or paged; use /query for data modifications.")
+        if plan["is_general_chat"] or not plan["query_str"] or not plan["resolved_db"]:
+            return None, (400, "Could not generate SQL for this question.")
+        if not validate_query_access(user["role"], plan["resolved_db"], intent):
+            reason = explain_denial(user["role"], plan["resolved_db"], intent)
+            await run_io(log_query, user["username"], user["role"], q, plan["resolved_db"], "denied", sql=plan["query_str"])
+            return None, (403, reason)
+        # callers of this deliver every row, so drop the preview LIMIT
+        return dict(plan, query_str=strip_preview_limit(plan["query_str"])), None
+
+    async def preview_page(self, user: dict, query_str: str, database: str, intent: list, timer: StageTimer = None):
+        """
+        The preview rows of a row-returning SELECT read in primary-key order,
+        plus a continuation token that resumes right after the last of them
+        (None when they are all the rows there are). Returns None when the
+        query cannot be keyset-paged; the caller then runs the plain preview query.
+        """
+        parts = parse_select(query_str)
+        if not parts:
+            return None
+        key = await run_io(get_primary_key, parts["db"], parts["table"], host='localhost', user='root', password='root')
+        if not key:
+            return None
+        timer = timer or StageTimer()
+        sql = strip_preview_limit(query_str)
+        with timer.stage("verify_query"):
+            success, result = await run_io(
+                fetch_page,
+                sql, key, None, SAMPLE_ROWS,
+                host='localhost', user='root', password='root',
+                database=database
+            )
+        if not success:
+            print(f"[DEBUG] Keyset preview failed, using the plain preview query: {result}")
+            return None
+        _, rows, last_key = result
+        page_token = None
+        if last_key is not None:
+            page_token = encode_page_token({
+                "sql": sql, "db": database, "key": key,
+                "intent": intent, "role": user["role"], "after": last_key,
+            })
+        return rows, page_token
+
+    async def fetch_page(self, user: dict, token: str, page_size: int, timer: StageTimer = None):
+        """
+        Fetch the page a continuation token points at with a keyset rewrite of
+        the stored SQL; the NL pipeline is not re-run.
+        Returns (payload, None) or (None, (http_status, reason)).
+        """
+        timer = timer or StageTimer()
+        try:
+            state = decode_page_token(token)
+        except ValueError as e:
+            return None, (400, str(e))
+        if state["role"] != user["role"] or not validate_query_access(user["role"], state["db"], state["intent"]):
+            return None, (403, explain_denial(user["role"], state["db"], state["intent"]))
+
+        page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+        with timer.stage("fetch_page"):
+            success, result = await run_io(
+                fetch_page,
+                state["sql"], state["key"], state["after"], page_size,
+                host='localhost', user='root', password='root',
+                database=state["db"]
+            )
+        if not success:
+            return None, (500, f"SQL Failed: {result}")
+
+        columns, rows, last_key = result
+        next_token = None
+        if last_key is not None:
+            next_token = encode_page_token(dict(state, after=last_key))
+        return {
+            "columns": columns,
+            "rows": rows,
+            "row_count": len(rows),
+            "generated_sql": state["sql"],
+            "database": state["db"],
+            "page_token": next_token,
+        }, None
+
+    def _texts_needing_tokenize(self, user: dict, queries: list, language: str) -> list:
+        """(query, normalized text) pairs that neither cache can answer"""
+        pending = []
+        for q in queries:
+            if response_cache_key(q, user["role"], language) in self.response_cache:
+                continue
+            t1, _ = normalize_dates(q)
+            t2, _ = normalize_units(t1)
+            if plan_cache_key(language, t2, extract_values(t2)) not in self.plan_cache:
+                pending.append((q, t2))
+        return pending
+
+    async def run_batch(self, user: dict, queries: list, timer: StageTimer = None, include_timings: bool = False,
+                        language: str = None) -> list:
+        """
+        Answer several questions at once. Identical questions are answered once,
+        uncached ones are tokenized in a single multi-document stanza call and
+        the resulting SQL runs concurrently on pooled connections.
+        """
+        timer = timer or StageTimer()
+        language = language or tokenizer_stanza.lang
+        unique = list(dict.fromkeys(queries))
+
+        pending = await run_cpu(self._texts_needing_tokenize, user, unique, language)
+        tokens_by_query = {}
+        if pending:
+            with timer.stage("tokenize", f"batch of {len(pending)}"):
+                parsed = await tokenize_batch_async([t2 for _, t2 in pending], language)
+            tokens_by_query = {q: tok for (q, _), tok in zip(pending, parsed)}
+
+        semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+        async def answer(q):
+            async with semaphore:
+                item_timer = StageTimer()
+                payload = await self.run(user, q, item_timer, tokens_by_query.get(q), language=language)
+                if include_timings:
+                    payload["timings"] = item_timer.as_dict()
+                return q, payload
+
+        with timer.stage("pipeline"):
+            answered = dict(await asyncio.gather(*(answer(q) for q in unique)))
+        return [dict(answered[q], query=q) for q in queries]
+
+    async def execute(self, user: dict, q: str, timer: StageTimer = None, tok: dict = None, language: str = None) -> dict:
+        """Execute a question end to end and return the response payload"""
+        timer = timer or StageTimer()
+        print("\n===== RAW INPUT =====")
+        print(q)
+
+        plan = await self.plan(q, user["role"], timer, tok, language)
+        intent = plan["intent"]
+        ai_used_for_intent = plan["ai_used_for_intent"]
+        has_schema_entities = plan["has_schema_entities"]
+        is_aggregate_intent = plan["is_aggregate"]
+
+        if plan["admin_only"]:
+            query_status = "denied"
+            reason = f"Access denied: Only administrators can perform {', '.join([i for i in intent if 'INSERT' in i or 'UPDATE' in i or 'DELETE' in i or 'DROP' in i or 'TRUNCATE' in i])} operations."
+
+            ollama_input_data = {
+                "original_query": q,
+                "intent": intent,
+                "query_str": "N/A (Access denied)",
+                "query_status": query_status,
+                "denial_reason": reason,
+                "sql": "",
+                "sample_rows_count": 0,
+                "is_aggregate_query": is_aggregate_intent,
+                "has_schema_entities": has_schema_entities
+            }
+
+            with timer.stage("commentary"):
+                commentary = await self.get_optimized_commentary(ollama_input_data, ai_used_for_intent)
+            await run_io(log_query, user["username"], user["role"], q, "N/A", "denied", sql="N/A (Admin-only operation)")
+
+            return {
+                "sample_rows": [],
+                "commentary": commentary,
+                "text_response": commentary,
+                "query_status": query_status,
+                "generated_sql": None,
+                "error": reason,
+                "ai_calls_used": 1 if ai_used_for_intent else 0
+            }
+
+        query_str = plan["query_str"]
+        resolved_db = plan["resolved_db"]
+        rows = []
+        page_token = None
+        commentary = ""
+        error_message = None
+        query_status = "no_sql"
+
+        ollama_input_data = {
+            "original_query": q,
+            "intent": intent,
+            "query_str": "N/A (No SQL generated yet)",
+            "query_status": query_status,
+            "denial_reason": "",
+            "sql": "",
+            "sample_rows_count": 0,
+            "is_aggregate_query": is_aggregate_intent,
+            "has_schema_entities": has_schema_entities
+        }
+
+        if plan["is_general_chat"]:
+            query_status = "general_chat"
+            ollama_input_data["query_status"] = query_status
+        elif query_str and resolved_db:
+            print(f"\n===== Query Builder Generated SQL =====\nSQL: {query_str}\nDB: {resolved_db}")
+
+            if not validate_query_access(user["role"], resolved_db, intent):
+                query_status = "denied"
+                reason = explain_denial(user["role"], resolved_db, intent)
+                await run_io(log_query, user["username"], user["role"], q, resolved_db, "denied", sql=query_str)
+                ollama_input_data.update({
+                    "query_str": query_str,
+                    "query_status": query_status,
+                    "denial_reason": reason,
+                })
+                error_message = reason
+            else:
+                # plain row queries preview in key order so their page token continues after the preview
+                preview = None
+                if not is_destructive_operation(intent) and not is_aggregate_intent:
+                    preview = await self.preview_page(user, query_str, resolved_db, intent, timer)
+                if preview is not None:
+                    success, (result, page_token) = True, preview
+                else:
+                    with timer.stage("verify_query"):
+                        success, result = await run_io(
+                            verify_query,
+                            query_str,
+                            host='localhost', user='root', password='root',
+                            database=resolved_db
+                        )
+
+                if success:
+                    query_status = "success"
+                    await run_io(log_query, user["username"], user["role"], q, resolved_db, get_action_type(intent), sql=f"[QUERY_BUILDER] {query_str}")
+
+                    if is_destructive_operation(intent):
+                        dropped = self.response_cache.invalidate_database(resolved_db)
+                        print(f"[DEBUG] Invalidated {dropped} cached responses for {resolved_db}")
+                        rows = []
+                        sample_rows_count = 0
+                    elif is_aggregate_intent:
+                        rows = result
+                        sample_rows_count = 1
+                    else:
+                        rows = result[:SAMPLE_ROWS]
+                        sample_rows_count = len(rows)
+                    ollama_input_data.update({
+                        "query_str": query_str,
+                        "query_status": query_status,
+                        "sample_rows_count": sample_rows_count,
+                    })
+                else:
+                    query_status = "fail"
+                    await run_io(log_query, user["username"], user["role"], q, resolved_db, "fail", sql=f"[QUERY_BUILDER_FAILED] {query_str}")
+                    error_message = f"SQL Failed: {result}"
+                    ollama_input_data.update({
+                        "query_str": query_str,
+                        "query_status": query_status,
+                        "sql": result,
+                    })
+        else:
+            query_status = "no_sql"
+            ollama_input_data.update({
+                "query_status": query_status,
+                "query_str": "N/A (Query builder failed to generate SQL)"
+            })
+
+        with timer.stage("commentary"):
+            commentary = await self.get_optimized_commentary(ollama_input_data, ai_used_for_intent)
+        print(f"\n===== OPTIMIZED COMMENTARY =====\n{commentary}")
+        print(f"[TIMING] {timer.summary()}")
+
+        ai_calls_used = 1 if (ai_used_for_intent or (not has_schema_entities and query_status in ['general_chat', 'no_sql'])) else 0
+        print(f"[DEBUG] Total AI calls for this query: {ai_calls_used}")
+
+        response_payload = {
+            "sample_rows": rows,
+            "commentary": commentary,
+            "text_response": commentary,
+            "query_status": query_status,
+            "generated_sql": query_str if query_str else None,
+            "database": resolved_db,
+            "operation_type": "destructive" if is_destructive_operation(intent) else "read",
+            "used_query_builder": True if query_str else False,
+            "ai_calls_used": ai_calls_used,
+            "page_token": page_token
+        }
+
+        if error_message:
+            response_payload["error"] = error_message
+
+        return response_payload
@@ -0,0 +1,68 @@
+import json
+
+import pytest
+
+pytest.importorskip("mysql.connector")
+
+from NLP_pipeline import automate_schema
+
+ROWS = [
+    ("stars_db", "stars", "name"),
+    ("stars_db", "stars", "magnitude"),
+    ("stars_db", "constellations", "name"),
+    ("rockets_db", "rockets", "rocket_name"),
+]
+
+class FakeCursor:
+    def __init__(self, queries):
+        self.queries = queries
+
+    def execute(self, sql, params=None):
+        self.queries.append((sql, params))
+
+    def fetchall(self):
+        return list(ROWS)
+
+    def close(self):
+        pass
+
+class FakeConnection:
+    def __init__(self, queries):
+        self.queries = queries
+
+    def cursor(self):
+        return FakeCursor(self.queries)
+
+    def close(self):
+        pass
+
+@pytest.fixture
+def server(monkeypatch):
+    queries = []
+    monkeypatch.setattr(automate_schema.mysql.connector, "connect", lambda **kwargs: FakeConnection(queries))
+    return queries
+
+def test_one_query_reads_every_database(server):
+    schema = automate_schema.fetch_schema()
+    assert len(server) == 1 and "information_schema.COLUMNS" in server[0][0]
+    assert [db["name"] for db in schema["databases"]] == ["rockets_db", "stars_db"]
+    assert schema["databases"][1]["tables"] == [
+        {"name": "stars", "columns": ["name", "magnitude"]},
+        {"name": "constellations", "columns": ["name"]},
+    ]
+
+def test_files_are_only_rewritten_when_the_schema_changed(server, tmp_path):
+    output = tmp_path / "plugin_schema.json"
+    kwargs = dict(output_path=str(output), individual_dir=str(tmp_path / "db_schemas"))
+    assert automate_schema.generate_schema_json_from_selected_dbs(**kwargs)
+    assert json.loads((tmp_path / "db_schemas" / "stars_db.json").read_text())["name"] == "stars_db"
+
+    assert not automate_schema.generate_schema_json_from_selected_dbs(**kwargs)
+
+    ROWS.append(("stars_db", "stars", "distance"))
+    try:
+        assert automate_schema.generate_schema_json_from_selected_dbs(**kwargs)
+    finally:
+        ROWS.pop()
+    assert "distance" in output.read_text()
+    assert not list(tmp_path.glob("**/*.tmp"))
@@ -0,0 +1,32 @@
+import time
+import asyncio
+import threading
+
+from common.executors import run_cpu, run_io
+
+def test_blocking_stages_leave_the_event_loop_free():
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.005)
+                ticks += 1
+
+        task = asyncio.ensure_future(ticker())
+        await asyncio.gather(run_io(time.sleep, 0.1), run_cpu(time.sleep, 0.1))
+        task.cancel()
+        return ticks
+
+    assert asyncio.run(scenario()) >= 5
+
+def test_stages_run_on_their_own_pools():
+    async def scenario():
+        return await asyncio.gather(
+            run_cpu(lambda: threading.current_thread().name),
+            run_io(lambda: threading.current_thread().name),
+        )
+
+    cpu_thread, io_thread = asyncio.run(scenario())
+    assert cpu_thread.startswith("conversql-cpu") and io_thread.startswith("conversql-io")
@@ -0,0 +1,51 @@
+import os
+
+from NLP_pipeline.intent_classifier import IntentClassifier, INTENT_CONFIDENCE_THRESHOLD, training_examples, features
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def confident(classifier, text):
+    intent, confidence = classifier.predict(text)
+    return intent if confidence >= INTENT_CONFIDENCE_THRESHOLD else None
+
+def test_features_are_unigrams_and_bigrams_with_numbers_collapsed():
+    assert features("Top 10 stars") == ["top", "<num>", "stars", "top <num>", "<num> stars"]
+
+def test_unknown_words_are_never_confident():
+    classifier = IntentClassifier.train([("count the rows", "COUNT_ROWS"), ("delete the rows", "DELETE_ROWS")])
+    assert classifier.predict("zorblax quux") == (None, 0.0)
+    _, confidence = classifier.predict("count zorblax quux flib")
+    assert confidence < INTENT_CONFIDENCE_THRESHOLD
+
+def test_shipped_model_recognizes_chat_instead_of_guessing_sql():
+    classifier = IntentClassifier.load()
+    assert classifier is not None
+    assert confident(classifier, "hi") == "greeting"
+    assert confident(classifier, "Hi there!") == "greeting"
+    assert confident(classifier, "thanks a lot") == "greeting"
+    assert confident(classifier, "what can you do") == "general_question"
+    assert confident(classifier, "tell me a joke") == "general_question"
+    assert confident(classifier, "what is the average mass") == "AGGREGATE_AVG"
+
+def test_training_data_includes_the_chat_classes():
+    intent_file = os.path.join(SERVER_DIR, "NLP_pipeline", "json", "intent.json")
+    query_log = os.path.join(SERVER_DIR, "Query_Builder", "query_log.txt")
+    intents = {intent for _, intent in training_examples(intent_file, query_log)}
+    assert {"greeting", "general_question", "SELECT_ROWS"} <= intents
+    assert {"greeting", "general_question"} <= set(IntentClassifier.load().doc_counts)
+
+def test_training_questions_with_one_label_are_answered_exactly():
+    classifier = IntentClassifier.train([
+        ("hi", "greeting"), ("count the rows", "COUNT_ROWS"), ("count the rows", "SELECT_ROWS"),
+        ("show the rows", "SELECT_ROWS"), ("show all rows", "SELECT_ROWS"),
+    ])
+    assert classifier.predict("Hi!") == ("greeting", 1.0)
+    # labelled two ways: left to the n-gram model
+    assert classifier.predict("count the rows")[1] < 1.0
+    assert classifier.predict("hi there")[1] < 1.0
+
+def test_exact_questions_survive_save_and_load(tmp_path):
+    classifier = IntentClassifier.train([("hi", "greeting"), ("show the rows", "SELECT_ROWS")])
+    path = str(tmp_path / "model.json")
+    classifier.save(path)
+    assert IntentClassifier.load(path).predict("hi") == ("greeting", 1.0)
@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("httpx")
+
+from NLP_pipeline import intent_recognizer, tokenizer_stanza
+from NLP_pipeline.intent_recognizer import IntentRecognizer
+
+class FakeGateway:
+    instances = []
+
+    def __init__(self, answer="COUNT_ROWS"):
+        self.answer = answer
+        self.prompts = []
+        self.closed = False
+        FakeGateway.instances.append(self)
+
+    async def generate(self, prompt, options=None, deadline=None):
+        self.prompts.append(prompt)
+        return self.answer
+
+    async def close(self):
+        self.closed = True
+
+@pytest.fixture(autouse=True)
+def fake_gateway(monkeypatch):
+    FakeGateway.instances.clear()
+    monkeypatch.setattr(intent_recognizer, "LLMGateway", FakeGateway)
+
+def test_patterns_answer_without_the_ai():
+    recognizer = IntentRecognizer()
+    assert recognizer.predict_from_tokens(["how", "many", "stars"]) == (["COUNT_ROWS"], False)
+    assert FakeGateway.instances == []
+
+def test_sync_predict_still_falls_back_to_the_ai():
+    recognizer = IntentRecognizer()
+    intents, ai_used = recognizer.predict_from_tokens(["zorblax", "quux"])
+    assert (intents, ai_used) == (["COUNT_ROWS"], True)
+    gateway, = FakeGateway.instances
+    assert gateway.closed
+
+def test_sync_predict_without_ai_fallback_uses_select_rows():
+    recognizer = IntentRecognizer(use_ai_fallback=False)
+    assert recognizer.predict_from_tokens(["zorblax", "quux"]) == (["SELECT_ROWS"], False)
+
+def test_async_predict_uses_the_shared_gateway():
+    shared = FakeGateway(answer="DESCRIPTION")
+    recognizer = IntentRecognizer(llm=shared)
+    intents, ai_used = asyncio.run(recognizer.apredict_from_tokens(["zorblax", "quux"]))
+    assert (intents, ai_used) == (["DESCRIPTION"], True)
+    assert len(shared.prompts) == 1
+
+# Final Tokens as the tokenizer hands them over: lemmatized, stopwords removed
+RUNTIME_FORMS = [
+    ("what can you do", [], "general_question"),
+    ("hi", ["hi"], "greeting"),
+    ("thanks a lot", ["thanks", "lot"], "greeting"),
+    ("tell me a joke", ["tell", "joke"], "general_question"),
+]
+
+@pytest.mark.parametrize("question, tokens, intent", RUNTIME_FORMS)
+def test_classifier_sees_the_question_not_the_final_tokens(question, tokens, intent):
+    recognizer = IntentRecognizer()
+    assert recognizer.predict_from_tokens(tokens, text=question) == ([intent], False)
+    assert asyncio.run(recognizer.apredict_from_tokens(tokens, text=question)) == ([intent], False)
+    assert FakeGateway.instances == []
+    assert recognizer.classifier_hits == 2
+
+def test_real_tokenizer_output_reaches_the_classifier():
+    pytest.importorskip("stanza")
+    pytest.importorskip("nltk")
+    recognizer = IntentRecognizer(use_ai_fallback=False)
+    for question, _, intent in RUNTIME_FORMS:
+        tokens = tokenizer_stanza.tokenize(question)["Final Tokens"]
+        assert recognizer.predict_from_tokens(tokens, text=question) == ([intent], False), tokens
@@ -0,0 +1,66 @@
+import json
+import threading
+
+from NLP_pipeline import lemma_cache
+from NLP_pipeline.lemma_cache import LemmaCache, fast_tokens, split_questions
+
+def parse(text, tags):
+    """A stanza-shaped (pos_tags, lemmas) pair from 'word/XPOS/lemma' items"""
+    items = [item.split("/") for item in tags.split()]
+    return [(word, xpos) for word, xpos, _ in items], [lemma for _, _, lemma in items]
+
+def test_fast_tokens_refuses_shapes_stanza_splits_differently():
+    assert fast_tokens("show stars with mass 5") == ["show", "stars", "with", "mass", "5"]
+    assert fast_tokens("mass above 3.5") is None
+    assert fast_tokens("missions by the u.s.") is None
+    assert fast_tokens("Show stars") is None
+
+def test_words_answer_only_after_min_seen_parses():
+    cache = LemmaCache(path=None, min_seen=2)
+    text = "show stars"
+    stanza = parse(text, "show/VB/show stars/NNS/star")
+    cache.learn(text, "en", *stanza)
+    assert cache.lookup(text, "en") is None
+    cache.learn(text, "en", *stanza)
+    assert cache.lookup(text, "en") == stanza
+
+def test_word_tagged_two_ways_is_never_answered():
+    cache = LemmaCache(path=None, min_seen=1)
+    cache.learn("list missions", "en", *parse("", "list/VB/list missions/NNS/mission"))
+    cache.learn("the list", "en", *parse("", "the/DT/the list/NN/list"))
+    assert cache.lookup("list missions", "en") is None
+    assert cache.stats()["ambiguous"] == 1
+
+def test_numbers_share_one_entry():
+    cache = LemmaCache(path=None, min_seen=1)
+    cache.learn("top 5", "en", *parse("", "top/JJ/top 5/CD/5"))
+    pos_tags, lemmas = cache.lookup("top 12", "en")
+    assert lemmas == ["top", "12"]
+
+def test_learn_reports_when_a_save_is_due(monkeypatch):
+    monkeypatch.setattr(lemma_cache, "SAVE_EVERY_NEW_WORDS", 2)
+    cache = LemmaCache(path=None)
+    assert not cache.learn("stars", "en", *parse("", "stars/NNS/star"))
+    assert cache.learn("planets moons", "en", *parse("", "planets/NNS/planet moons/NNS/moon"))
+
+def test_concurrent_saves_leave_a_complete_file(tmp_path):
+    path = str(tmp_path / "lemma_cache.json")
+    cache = LemmaCache(path=path, min_seen=1)
+    for i in range(50):
+        word = "w" + "x" * i
+        cache.learn(word, "en", *parse("", f"{word}/NN/{word}"))
+    threads = [threading.Thread(target=cache.save) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(json.load(open(path))["languages"]["en"]) == 50
+    assert [p.name for p in tmp_path.iterdir()] == ["lemma_cache.json"]
+    assert LemmaCache(path=path, min_seen=1).lookup("wxx", "en") is not None
+
+def test_held_out_split_never_overlaps_the_learned_questions():
+    questions = [f"q{i}" for i in range(20)] + ["q3", "q5"]
+    learn, held_out = split_questions(questions)
+    assert not set(learn) & set(held_out)
+    assert len(learn) + len(held_out) == 20
+    assert len(held_out) == 4
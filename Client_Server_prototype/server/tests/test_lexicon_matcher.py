@@ -0,0 +1,62 @@
+import re
+import json
+import random
+
+from NLP_pipeline.lexicon_matcher import (
+    LexiconMatcher, get_lexicon, is_regex_phrase, INTENT_FILE, INTENT_LEXICON, BOUNDARY_ISOLATED,
+)
+from NLP_pipeline.comparison_operator_recognizer import comparison_operator_recognizer, OPERATOR_SYNONYMS
+
+with open(INTENT_FILE, "r") as f:
+    INTENT_PHRASES = json.load(f)
+
+def regex_intents(text):
+    """The per-phrase regex search the automaton replaced"""
+    return {
+        intent for intent, phrases in INTENT_PHRASES.items() for phrase in phrases
+        if re.search(rf"\b({phrase})\b", text, re.IGNORECASE)
+    }
+
+def regex_operators(text):
+    compiled = []
+    for op, phrases in OPERATOR_SYNONYMS.items():
+        for phrase in phrases:
+            p = re.escape(phrase.strip())
+            if " " in phrase:
+                compiled.append((op, re.compile(r"\b" + p + r"\b", re.IGNORECASE)))
+            else:
+                compiled.append((op, re.compile(r"(?<!\w)" + p + r"(?!\w)", re.IGNORECASE)))
+    compiled.sort(key=lambda x: len(x[1].pattern), reverse=True)
+    unique = {}
+    for op, regex in compiled:
+        for m in regex.finditer(text):
+            lo, hi = m.span()
+            if (lo, hi) not in unique:
+                unique[(lo, hi)] = (op, m.group(0), lo, hi)
+    return sorted(unique.values(), key=lambda x: x[2])
+
+def phrase_mixes(count, seed):
+    """Texts stitched from lexicon phrases, operator synonyms and filler, with and without spaces between"""
+    pieces = [p for phrases in INTENT_PHRASES.values() for p in phrases if not is_regex_phrase(p)]
+    pieces += [p.strip() for phrases in OPERATOR_SYNONYMS.values() for p in phrases]
+    pieces += ["stars", "20", "first 5", "top 10", "magnitude", "_", "x"]
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield "".join(rng.choice(pieces) + rng.choice([" ", " ", "", ", "]) for _ in range(rng.randint(1, 6))).strip()
+
+def test_intents_match_the_regex_search():
+    lexicon = get_lexicon()
+    for text in phrase_mixes(1500, seed=11):
+        text = text.lower()
+        assert {intent for _, intent, _, _, _ in lexicon.find(text, INTENT_LEXICON)} == regex_intents(text), text
+
+def test_operators_match_the_regex_scan():
+    for text in phrase_mixes(1500, seed=12):
+        assert comparison_operator_recognizer(text) == regex_operators(text), text
+
+def test_a_phrase_never_overlaps_itself():
+    matcher = LexiconMatcher()
+    matcher.add("op", "eq", "==", BOUNDARY_ISOLATED)
+    text = "a ===== b"
+    expected = [m.span() for m in re.finditer(r"(?<!\w)==(?!\w)", text)]
+    assert [hit[2:4] for hit in matcher.find(text)] == expected == [(2, 4), (4, 6)]
@@ -0,0 +1,32 @@
+from common import llm_cache
+from common.llm_cache import LLMResponseCache
+
+def test_responses_survive_a_restart(tmp_path):
+    path = str(tmp_path / "llm.db")
+    key = LLMResponseCache.make_key("gemma:2b", "Summarize the stars table", {"temperature": 0})
+    LLMResponseCache(path).put(key, "gemma:2b", "Twelve stars.")
+    cache = LLMResponseCache(path)
+    assert cache.get(key) == "Twelve stars."
+    assert cache.stats()["hits"] == 1
+
+def test_keys_depend_on_model_prompt_and_options():
+    key = LLMResponseCache.make_key("gemma:2b", "q", {"temperature": 0, "top_k": 1})
+    assert key == LLMResponseCache.make_key("gemma:2b", "q", {"top_k": 1, "temperature": 0})
+    assert key != LLMResponseCache.make_key("gemma:2b", "q", {"temperature": 1, "top_k": 1})
+    assert key != LLMResponseCache.make_key("llama3", "q", {"temperature": 0, "top_k": 1})
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(llm_cache.time, "time", lambda: now[0])
+    cache = LLMResponseCache(str(tmp_path / "llm.db"), max_entries=3)
+    for key in ("a", "b", "c"):
+        now[0] += 1
+        cache.put(key, "m", key.upper())
+    now[0] += 1
+    cache.get("a")
+    now[0] += 1
+    cache.put("d", "m", "D")
+    # over the bound: evicted down to 90% of it, least recently used first
+    assert cache.get("b") is None and cache.get("c") is None
+    assert cache.get("a") == "A" and cache.get("d") == "D"
+    assert cache.stats()["evictions"] == 2
@@ -0,0 +1,128 @@
+import time
+import asyncio
+
+import pytest
+
+pytest.importorskip("httpx")
+
+from common import llm_gateway
+from common.llm_cache import LLMResponseCache
+from common.llm_gateway import LLMGateway, LLMUnavailable, BREAKER_OPEN, BREAKER_CLOSED, BREAKER_HALF_OPEN
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"response": self.text}
+
+class FakeOllama:
+    """Answers /api/tags at once; /api/generate waits on `release` when it is set, or fails when `down`"""
+    def __init__(self):
+        self.release = None
+        self.down = False
+        self.generations = 0
+
+    async def get(self, path, **kwargs):
+        return FakeResponse("")
+
+    async def post(self, path, json=None, **kwargs):
+        self.generations += 1
+        if self.release is not None:
+            await self.release.wait()
+        if self.down:
+            raise ConnectionError("refused")
+        return FakeResponse(f"answer to {json['prompt']}")
+
+    async def aclose(self):
+        pass
+
+def make_gateway(cache=None):
+    gateway = LLMGateway(cache=cache)
+    gateway._client = FakeOllama()
+    return gateway
+
+def cool_down(gateway):
+    gateway._opened_at = time.monotonic() - llm_gateway.BREAKER_COOLDOWN_SECONDS - 1
+
+def test_breaker_opens_after_repeated_failures_and_fails_fast():
+    async def scenario():
+        gateway = make_gateway()
+        gateway._client.down = True
+        for _ in range(llm_gateway.BREAKER_FAILURE_THRESHOLD):
+            with pytest.raises(LLMUnavailable):
+                await gateway.generate("q")
+        assert gateway.state == BREAKER_OPEN
+        with pytest.raises(LLMUnavailable, match="circuit open"):
+            await gateway.generate("q")
+        assert gateway._client.generations == llm_gateway.BREAKER_FAILURE_THRESHOLD
+
+    asyncio.run(scenario())
+
+def test_half_open_trial_success_closes_the_breaker():
+    async def scenario():
+        gateway = make_gateway()
+        gateway._open()
+        cool_down(gateway)
+        assert await gateway.generate("q") == "answer to q"
+        assert gateway.state == BREAKER_CLOSED
+
+    asyncio.run(scenario())
+
+def test_cancelled_half_open_trial_reopens_the_breaker():
+    async def scenario():
+        gateway = make_gateway()
+        gateway._client.release = asyncio.Event()
+        gateway._open()
+        cool_down(gateway)
+
+        trial = asyncio.ensure_future(gateway.generate("q"))
+        while gateway._client.generations == 0:
+            await asyncio.sleep(0)
+        assert gateway.state == BREAKER_HALF_OPEN
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+        assert gateway.state == BREAKER_OPEN
+        assert gateway._in_flight == 0
+
+        # after the new cooldown the next caller gets its own trial
+        gateway._client.release = None
+        cool_down(gateway)
+        assert await gateway.generate("q") == "answer to q"
+        assert gateway.state == BREAKER_CLOSED
+
+    asyncio.run(scenario())
+
+def test_cancelled_closed_call_leaves_the_breaker_closed():
+    async def scenario():
+        gateway = make_gateway()
+        gateway._client.release = asyncio.Event()
+        call = asyncio.ensure_future(gateway.generate("q"))
+        while gateway._client.generations == 0:
+            await asyncio.sleep(0)
+        call.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await call
+        assert gateway.state == BREAKER_CLOSED
+
+    asyncio.run(scenario())
+
+def test_identical_prompts_in_flight_share_one_generation(tmp_path):
+    async def scenario():
+        gateway = make_gateway(cache=LLMResponseCache(str(tmp_path / "llm.db")))
+        gateway._client.release = asyncio.Event()
+        calls = [asyncio.ensure_future(gateway.generate("q")) for _ in range(3)]
+        # cache reads run on the I/O pool; hold the generation until every caller joined it
+        while gateway.coalesced < 2:
+            await asyncio.sleep(0.001)
+        gateway._client.release.set()
+        assert await asyncio.gather(*calls) == ["answer to q"] * 3
+        # answered from the cache from now on
+        assert await gateway.generate("q") == "answer to q"
+        assert gateway._client.generations == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,46 @@
+import asyncio
+
+from common.micro_batcher import MicroBatcher
+
+def test_concurrent_submits_share_one_batch_in_order():
+    calls = []
+
+    async def upper(items):
+        calls.append(list(items))
+        return [item.upper() for item in items]
+
+    async def main():
+        batcher = MicroBatcher(upper, max_batch_size=16, max_wait_ms=5)
+        return await asyncio.gather(*(batcher.submit(word) for word in ["vega", "rigel", "deneb"])), batcher
+
+    results, batcher = asyncio.run(main())
+    assert results == ["VEGA", "RIGEL", "DENEB"]
+    assert calls == [["vega", "rigel", "deneb"]]
+    assert batcher.stats()["flushed_timeout"] == 1
+
+def test_a_full_batch_flushes_without_waiting():
+    calls = []
+
+    async def echo(items):
+        calls.append(len(items))
+        return items
+
+    async def main():
+        # a wait this long would time the test out if full batches waited for it
+        batcher = MicroBatcher(echo, max_batch_size=2, max_wait_ms=60000)
+        return await asyncio.wait_for(asyncio.gather(*(batcher.submit(i) for i in range(4))), 1), batcher
+
+    results, batcher = asyncio.run(main())
+    assert results == [0, 1, 2, 3]
+    assert calls == [2, 2]
+    assert batcher.stats()["flushed_full"] == 2
+
+def test_a_failed_batch_fails_every_caller():
+    async def broken(items):
+        raise ValueError("stanza failed")
+
+    async def main():
+        batcher = MicroBatcher(broken, max_wait_ms=1)
+        return await asyncio.gather(batcher.submit("a"), batcher.submit("b"), return_exceptions=True)
+
+    assert [str(e) for e in asyncio.run(main())] == ["stanza failed", "stanza failed"]
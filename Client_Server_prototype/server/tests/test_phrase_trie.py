@@ -0,0 +1,50 @@
+import random
+
+from NLP_pipeline import tokenizer_stanza
+from NLP_pipeline.phrase_trie import PhraseTrie
+
+def scan_combine(tokens, phrases, max_len=6):
+    """The combiner the trie replaced: try every window from longest to shortest"""
+    combined = []
+    i = 0
+    while i < len(tokens):
+        for j in range(max_len, 0, -1):
+            if i + j <= len(tokens) and " ".join(tokens[i:i + j]) in phrases:
+                combined.append(" ".join(tokens[i:i + j]))
+                i += j
+                break
+        else:
+            combined.append(tokens[i])
+            i += 1
+    return combined
+
+def test_longest_match_wins():
+    trie = PhraseTrie()
+    for phrase in ["star", "star name", "star name alias"]:
+        trie.add(phrase.split(), phrase)
+    assert trie.combine(["show", "star", "name", "alias", "star", "name"]) == ["show", "star name alias", "star name"]
+    assert trie.combine(["star", "alias"]) == ["star", "alias"]
+
+def test_lemma_paths_lead_to_the_written_phrase():
+    trie = PhraseTrie()
+    trie.add(["missions", "status"], "missions status")
+    trie.add(["mission", "status"], "missions status", replace=False)
+    trie.add(["mission", "status"], "mission status")
+    assert trie.combine(["mission", "status"]) == ["mission status"]
+    assert trie.combine(["missions", "status"]) == ["missions status"]
+    assert trie.paths == 2
+
+def test_schema_phrases_combine_like_the_window_scan():
+    phrases = {p for p in tokenizer_stanza.SCHEMA_PHRASES if len(p.split(" ")) <= 6 and all(p.split(" "))}
+    trie = PhraseTrie()
+    for phrase in phrases:
+        trie.add(phrase.split(" "), phrase)
+    # questions stitched from whole phrases, their prefixes and filler words, so runs overlap
+    pieces = [phrase.split(" ") for phrase in sorted(phrases)] + [["show"], ["with"], ["and"], [">"]]
+    rng = random.Random(3)
+    for _ in range(2000):
+        tokens = []
+        for _ in range(rng.randint(1, 5)):
+            piece = rng.choice(pieces)
+            tokens += piece[:rng.randint(1, len(piece))]
+        assert trie.combine(tokens) == scan_combine(tokens, phrases), tokens
@@ -0,0 +1,29 @@
+from common.plan_cache import PlanCache, mask_literals, sentinel_values, bind_literals
+
+VALUES = [
+    {"type": "INTEGER", "value": "20", "span": (28, 30)},
+    {"type": "DATE", "value": "2001", "span": (40, 44)},
+]
+TEXT = "show stars with magnitude > 20 found in 2001"
+
+def test_questions_differing_in_literals_share_a_key():
+    other = [dict(VALUES[0], value="25"), dict(VALUES[1], value="1999", span=(40, 44))]
+    masked = mask_literals(TEXT, VALUES)
+    assert masked == "show stars with magnitude > <INTEGER> found in <DATE>"
+    assert mask_literals("show stars with magnitude > 25 found in 1999", other) == masked
+
+def test_sentinels_bind_back_to_the_values():
+    template = "SELECT * FROM stars WHERE magnitude > {} AND year = {};".format(
+        *(v["value"] for v in sentinel_values(VALUES))
+    )
+    assert bind_literals(template, VALUES) == "SELECT * FROM stars WHERE magnitude > 20 AND year = 2001;"
+
+def test_least_recently_used_plan_is_evicted():
+    cache = PlanCache(max_entries=2)
+    cache.put("a", {})
+    cache.put("b", {})
+    cache.get("a")
+    cache.put("c", {})
+    assert "a" in cache and "b" not in cache
+    assert cache.get("b") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
@@ -0,0 +1,223 @@
+import asyncio
+import threading
+
+import pytest
+
+pytest.importorskip("mysql.connector")
+pytest.importorskip("dateutil")
+
+import query_pipeline
+from query_pipeline import QueryPipeline, SAMPLE_ROWS
+
+real_build_sql_template = query_pipeline.build_sql_template
+
+QUERY = "SELECT `name` FROM `stars_db`.`stars` LIMIT 5;"
+USER = {"username": "ada", "role": "science"}
+
+@pytest.fixture
+def stars_table(monkeypatch):
+    """12 rows keyed by id, stored out of key order; fetch_page behaves like the keyset SQL would"""
+    rows = [(f"star-{i}", i) for i in (7, 2, 11, 4, 9, 1, 12, 5, 3, 10, 6, 8)]
+
+    def fake_fetch_page(sql, key, after, page_size, host, user, password, database=None):
+        ordered = sorted((r for r in rows if after is None or r[1] > int(after)), key=lambda r: r[1])
+        page = ordered[:page_size + 1]
+        has_more = len(page) > page_size
+        page = page[:page_size]
+        last_key = page[-1][-1] if has_more else None
+        return True, (["name"], [r[:-1] for r in page], last_key)
+
+    monkeypatch.setattr(query_pipeline, "get_primary_key", lambda *args, **kwargs: "id")
+    monkeypatch.setattr(query_pipeline, "fetch_page", fake_fetch_page)
+    return rows
+
+def test_page_token_continues_after_the_preview(stars_table):
+    pipeline = QueryPipeline(intent_recognizer=None)
+
+    async def walk():
+        preview_rows, token = await pipeline.preview_page(USER, QUERY, "stars_db", ["SELECT_ROWS"])
+        pages = [preview_rows]
+        while token:
+            payload, error = await pipeline.fetch_page(USER, token, page_size=4)
+            assert error is None
+            pages.append(payload["rows"])
+            token = payload["page_token"]
+        return pages
+
+    pages = asyncio.run(walk())
+    assert len(pages[0]) == SAMPLE_ROWS
+    seen = [name for page in pages for (name,) in page]
+    assert seen == [f"star-{i}" for i in range(1, 13)]
+
+def test_no_token_when_the_preview_holds_every_row(stars_table):
+    del stars_table[3:]
+    pipeline = QueryPipeline(intent_recognizer=None)
+    rows, token = asyncio.run(pipeline.preview_page(USER, QUERY, "stars_db", ["SELECT_ROWS"]))
+    assert len(rows) == 3
+    assert token is None
+
+class FixedIntent:
+    def match_or_classify(self, tokens, entities, text):
+        return ["SELECT_ROWS"]
+
+@pytest.fixture
+def phrase_schema(monkeypatch):
+    """A schema whose one phrase the lemmatizer reads differently, with no lemmas learned yet; the question is parsed without stanza"""
+    from NLP_pipeline import tokenizer_stanza, tokenizer_pool
+
+    monkeypatch.setattr(tokenizer_stanza, "SCHEMA_PHRASES", {"missions status"})
+    monkeypatch.setattr(tokenizer_stanza, "_schema_version", tokenizer_stanza._schema_version + 1000)
+    monkeypatch.setattr(tokenizer_stanza, "_phrase_lemmas", {})
+    monkeypatch.setattr(tokenizer_stanza, "_phrase_generation", {})
+    monkeypatch.setattr(tokenizer_stanza, "_phrase_tries", {})
+    monkeypatch.setattr(tokenizer_stanza, "_stopwords_by_language", {"en": {"show"}})
+    monkeypatch.setattr(tokenizer_pool, "_ensure_phrase_lemmas", lambda language: None)
+
+    lemmas = {"missions": "mission"}
+    tokenized = []
+
+    async def fake_tokenize(text, language=None):
+        words = text.split()
+        tokenized.append(text)
+        return tokenizer_stanza._build_token_result(
+            text, [(w, "NN") for w in words], [lemmas.get(w, w) for w in words], language
+        )
+
+    monkeypatch.setattr(query_pipeline, "tokenize_async", fake_tokenize)
+    monkeypatch.setattr(query_pipeline, "schema_entity_recognizer", lambda tokens: {"tokens": list(tokens)})
+    monkeypatch.setattr(query_pipeline, "has_meaningful_schema_entities", lambda ents: True)
+    monkeypatch.setattr(query_pipeline, "comparison_operator_recognizer", lambda text: [])
+    monkeypatch.setattr(query_pipeline, "generate_sql_with_query_builder",
+                        lambda q, intent, ents, ops, vals, role: ("SELECT 1;", "space_db"))
+    monkeypatch.setattr(query_pipeline, "build_sql_template", lambda *args: "SELECT 1;")
+    monkeypatch.setattr(query_pipeline, "enhanced_operator_column_linking", lambda ents, ops, intent: ([], None))
+    return tokenizer_stanza, tokenized
+
+def test_learning_phrase_lemmas_retires_cached_plans(phrase_schema):
+    tokenizer_stanza, tokenized = phrase_schema
+    pipeline = QueryPipeline(intent_recognizer=FixedIntent())
+    question = "show missions status"
+
+    before = asyncio.run(pipeline.plan(question, "science", language="en"))
+    assert "missions status" not in before["tokens"]
+    assert asyncio.run(pipeline.plan(question, "science", language="en"))["plan_cache_hit"]
+
+    tokenizer_stanza.set_phrase_lemmas("en", ["missions status"], [["mission", "status"]])
+    after = asyncio.run(pipeline.plan(question, "science", language="en"))
+    assert not after["plan_cache_hit"]
+    assert "missions status" in after["tokens"]
+    assert len(tokenized) == 2
+
+def test_relearning_the_same_lemmas_keeps_cached_plans(phrase_schema):
+    tokenizer_stanza, _ = phrase_schema
+    tokenizer_stanza.set_phrase_lemmas("en", ["missions status"], [["mission", "status"]])
+    pipeline = QueryPipeline(intent_recognizer=FixedIntent())
+    asyncio.run(pipeline.plan("show missions status", "science", language="en"))
+
+    tokenizer_stanza.set_phrase_lemmas("en", ["missions status"], [["mission", "status"]])
+    assert asyncio.run(pipeline.plan("show missions status", "science", language="en"))["plan_cache_hit"]
+
+def test_response_keys_follow_the_phrase_version(phrase_schema):
+    tokenizer_stanza, _ = phrase_schema
+    before = query_pipeline.response_cache_key("show missions status", "science", "en")
+    tokenizer_stanza.set_phrase_lemmas("en", ["missions status"], [["mission", "status"]])
+    assert query_pipeline.response_cache_key("show missions status", "science", "en") != before
+
+def test_equivalent_questions_share_a_response_key():
+    key = query_pipeline.response_cache_key("Show  all STARS?", "science", "en")
+    assert key == query_pipeline.response_cache_key("show all stars", "science", "en")
+    assert key != query_pipeline.response_cache_key("show all stars", "admin", "en")
+
+def test_cached_plans_bind_the_new_literals(phrase_schema, monkeypatch):
+    built = []
+
+    def fake_generate_sql(q, intent, ents, ops, vals, role):
+        built.append(q)
+        return f"SELECT `name` FROM `stars` WHERE `magnitude` > {vals[0]['value']};", "stars_db"
+
+    monkeypatch.setattr(query_pipeline, "generate_sql_with_query_builder", fake_generate_sql)
+    monkeypatch.setattr(query_pipeline, "build_sql_template", real_build_sql_template)
+    pipeline = QueryPipeline(intent_recognizer=FixedIntent())
+
+    first = asyncio.run(pipeline.plan("show stars with magnitude > 20", "science", language="en"))
+    second = asyncio.run(pipeline.plan("show stars with magnitude > 25", "science", language="en"))
+    assert not first["plan_cache_hit"] and second["plan_cache_hit"]
+    assert second["query_str"] == "SELECT `name` FROM `stars` WHERE `magnitude` > 25;"
+    # the question and its sentinel template, but nothing for the cache hit
+    assert len(built) == 2
+
+def test_batch_tokenizes_uncached_questions_once_in_one_call(monkeypatch):
+    batches = []
+
+    async def fake_tokenize_batch(texts, language=None):
+        batches.append(list(texts))
+        return [{"Final Tokens": text.split()} for text in texts]
+
+    monkeypatch.setattr(query_pipeline, "tokenize_batch_async", fake_tokenize_batch)
+    pipeline = QueryPipeline(intent_recognizer=None)
+    pipeline.response_cache.put(query_pipeline.response_cache_key("count stars", "science", "en"), {"cached": True})
+    answered = []
+
+    async def fake_run(user, q, timer=None, tok=None, total_rows=None, language=None):
+        answered.append(q)
+        return {"tokens": tok and tok["Final Tokens"]}
+
+    monkeypatch.setattr(pipeline, "run", fake_run)
+    questions = ["show stars", "count stars", "show planets", "show stars"]
+    results = asyncio.run(pipeline.run_batch(USER, questions, language="en"))
+
+    assert batches == [["show stars", "show planets"]]
+    assert sorted(answered) == ["count stars", "show planets", "show stars"]
+    assert [r["query"] for r in results] == questions
+    assert results[0]["tokens"] == ["show", "stars"] and results[1]["tokens"] is None
+
+def test_planning_stages_run_off_the_event_loop(phrase_schema, monkeypatch):
+    threads = []
+
+    def recording_recognizer(tokens):
+        threads.append(threading.current_thread().name)
+        return {"tokens": list(tokens)}
+
+    monkeypatch.setattr(query_pipeline, "schema_entity_recognizer", recording_recognizer)
+    pipeline = QueryPipeline(intent_recognizer=FixedIntent())
+    asyncio.run(pipeline.plan("show missions status", "science", language="en"))
+    assert threads and threads[0].startswith("conversql-cpu")
+
+def test_chat_questions_are_classified_from_the_question_text(phrase_schema, monkeypatch):
+    pytest.importorskip("httpx")
+    from NLP_pipeline.intent_recognizer import IntentRecognizer
+
+    tokenizer_stanza, _ = phrase_schema
+    monkeypatch.setattr(tokenizer_stanza, "_stopwords_by_language", {"en": {"a", "me"}})
+    monkeypatch.setattr(query_pipeline, "schema_entity_recognizer", lambda tokens: [])
+    monkeypatch.setattr(query_pipeline, "has_meaningful_schema_entities", lambda ents: False)
+    pipeline = QueryPipeline(intent_recognizer=IntentRecognizer(use_ai_fallback=False))
+
+    plan = asyncio.run(pipeline.plan("thanks a lot", "science", language="en"))
+    assert plan["tokens"] == ["thanks", "lot"]
+    assert plan["intent"] == ["greeting"] and plan["is_general_chat"]
+
+def test_intent_patterns_run_once_and_off_the_event_loop(phrase_schema, monkeypatch):
+    pytest.importorskip("httpx")
+    from NLP_pipeline.intent_recognizer import IntentRecognizer
+
+    class AnswersCount:
+        async def generate(self, prompt, options=None, deadline=None):
+            return "COUNT_ROWS"
+
+    recognizer = IntentRecognizer(llm=AnswersCount())
+    monkeypatch.setattr(recognizer, "classifier", None)
+    match = recognizer.match_from_tokens
+    threads = []
+
+    def counting_match(tokens, entities=None):
+        threads.append(threading.current_thread().name)
+        return match(tokens, entities)
+
+    monkeypatch.setattr(recognizer, "match_from_tokens", counting_match)
+    monkeypatch.setattr(query_pipeline, "schema_entity_recognizer", lambda tokens: [])
+    pipeline = QueryPipeline(intent_recognizer=recognizer)
+
+    plan = asyncio.run(pipeline.plan("zorblax quux", "science", language="en"))
+    assert plan["intent"] == ["COUNT_ROWS"] and plan["ai_used_for_intent"]
+    assert len(threads) == 1 and threads[0].startswith("conversql-cpu")
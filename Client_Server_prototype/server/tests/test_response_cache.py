@@ -0,0 +1,74 @@
+import pytest
+
+from common import response_cache
+from common.response_cache import ResponseCache
+from common.session_store import SQLiteSessionStore
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, "monotonic", lambda: now[0])
+    return now
+
+def test_hits_return_a_copy():
+    cache = ResponseCache()
+    cache.put("k", {"rows": [[1]]})
+    cache.get("k")["rows"].append([2])
+    assert cache.get("k") == {"rows": [[1]]}
+    assert cache.stats()["hits"] == 2
+
+def test_entries_expire(clock):
+    cache = ResponseCache(ttl_seconds=10, negative_ttl_seconds=1)
+    cache.put("answer", {"ok": True})
+    cache.put("denied", {"ok": False}, negative=True)
+    clock[0] += 5
+    assert "answer" in cache
+    assert cache.get("denied") is None
+    clock[0] += 10
+    assert cache.get("answer") is None
+
+def test_least_recently_used_is_evicted_first():
+    cache = ResponseCache(max_entries=2)
+    cache.put("a", {})
+    cache.put("b", {})
+    cache.get("a")
+    cache.put("c", {})
+    assert "a" in cache and "c" in cache and "b" not in cache
+    assert cache.stats()["evictions"] == 1
+
+def test_invalidate_database_drops_only_its_entries():
+    cache = ResponseCache()
+    cache.put("stars", {}, db="Stars_DB")
+    cache.put("planets", {}, db="planets_db")
+    assert cache.invalidate_database("stars_db") == 1
+    assert "stars" not in cache and "planets" in cache
+
+def test_invalidation_in_another_worker_retires_cached_answers(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    reader, writer = ResponseCache(), ResponseCache()
+    reader.share_invalidations(SQLiteSessionStore(path))
+    writer.share_invalidations(SQLiteSessionStore(path))
+    reader.put("stars", {"rows": [[1]]}, db="Stars_DB")
+    reader.put("planets", {"rows": [[2]]}, db="planets_db")
+
+    # the write happens in the other worker, which never cached these answers
+    assert writer.invalidate_database("stars_db") == 0
+
+    assert "stars" not in reader
+    assert reader.get("stars") is None
+    assert reader.get("planets") == {"rows": [[2]]}
+    reader.put("stars", {"rows": [[1], [3]]}, db="Stars_DB")
+    assert reader.get("stars") == {"rows": [[1], [3]]}
+
+def test_answer_read_before_a_concurrent_write_is_already_stale(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"))
+    cache = ResponseCache()
+    cache.share_invalidations(store)
+    versions = cache.database_versions()
+    store.bump_database_version("stars_db")
+    cache.put("stars", {}, db="stars_db", versions=versions)
+    assert "stars" not in cache
+
+def test_key_ignores_the_order_of_allowed_databases():
+    assert ResponseCache.make_key("q", "admin", ["b", "a"]) == ResponseCache.make_key("q", "admin", ("a", "b"))
+    assert ResponseCache.make_key("q", "admin", ["a"]) != ResponseCache.make_key("q", "science", ["a"])
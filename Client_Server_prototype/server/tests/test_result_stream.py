@@ -0,0 +1,39 @@
+import json
+
+from common.result_stream import ndjson_events, sse_events
+
+class Batches:
+    """A stream_query() stand-in: column names first, then row batches, optionally failing"""
+    def __init__(self, columns, batches, fail_after=None):
+        self.items = [columns] + batches
+        self.fail_after = fail_after
+        self.closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.fail_after is not None and len(self.items) <= self.fail_after:
+            raise RuntimeError("connection lost")
+        if not self.items:
+            raise StopIteration
+        return self.items.pop(0)
+
+    def close(self):
+        self.closed = True
+
+def test_ndjson_rows_between_meta_and_end():
+    batches = Batches(["id", "name"], [[[1, "Vega"], [2, "Rigel"]], [[3, "Deneb"]]])
+    lines = [json.loads(line) for chunk in ndjson_events(batches, {"database": "stars_db"}) for line in chunk.splitlines()]
+    assert lines[0] == {"database": "stars_db", "type": "meta", "columns": ["id", "name"]}
+    assert [line["row"] for line in lines[1:-1]] == [[1, "Vega"], [2, "Rigel"], [3, "Deneb"]]
+    assert lines[-1] == {"type": "end", "row_count": 3}
+    assert batches.closed
+
+def test_a_failure_mid_stream_ends_with_an_error_event():
+    batches = Batches(["id"], [[[1]], [[2]]], fail_after=1)
+    events = list(sse_events(batches, {}))
+    assert events[0].startswith("event: meta\n")
+    assert events[-1].startswith("event: error\n")
+    assert json.loads(events[-1].split("data: ", 1)[1]) == {"error": "connection lost", "row_count": 1}
+    assert batches.closed
@@ -0,0 +1,86 @@
+import random
+
+from NLP_pipeline import tokenizer_stanza, schema_index
+from NLP_pipeline.schema_index import SchemaIndex, get_schema_index
+from NLP_pipeline.schema_entity_recognizer import find_fuzzy_matches
+from NLP_pipeline.tokenizer_stanza import SCHEMA_MAP
+
+def misspell(word, rng):
+    """word with up to three random insertions, deletions or substitutions"""
+    chars = list(word)
+    for _ in range(rng.randint(0, 3)):
+        i = rng.randrange(len(chars) + 1)
+        char = rng.choice("abcdefghijklmnopqrstuvwxyz_")
+        edit = rng.randrange(3)
+        if edit == 0:
+            chars.insert(i, char)
+        elif i < len(chars):
+            if edit == 1:
+                del chars[i]
+            else:
+                chars[i] = char
+    return "".join(chars)
+
+def as_scan(matches):
+    return [(entry.original, score) for entry, score in matches]
+
+def test_fuzzy_matches_equal_the_full_scan():
+    index = get_schema_index()
+    rng = random.Random(7)
+    tokens = [misspell(rng.choice(index.terms), rng) for _ in range(300)]
+    tokens += ["star", "stars", "id", "is", "x", ""]
+    for token in tokens:
+        assert as_scan(index.fuzzy_matches(token)) == find_fuzzy_matches(token, index.terms), token
+
+def test_batches_equal_the_full_scan_at_any_threshold():
+    rng = random.Random(3)
+    for _ in range(100):
+        terms = list(dict.fromkeys("".join(rng.choice("aabbcdest_ ") for _ in range(rng.randint(0, 12))) for _ in range(30)))
+        index = SchemaIndex(SCHEMA_MAP, terms)
+        threshold = rng.choice([0.5, 0.75, 0.8, 0.9, 1.0])
+        tokens = [misspell(rng.choice(terms), rng) for _ in range(10)]
+        matches = index.fuzzy_matches_many(tokens, threshold)
+        for token in tokens:
+            assert as_scan(matches[token]) == find_fuzzy_matches(token, terms, threshold), (token, threshold)
+
+def test_terms_sharing_too_few_bigrams_are_never_compared(monkeypatch):
+    compared = []
+    class CountingMatcher(schema_index.SequenceMatcher):
+        def ratio(self):
+            compared.append(self.b)
+            return super().ratio()
+    monkeypatch.setattr(schema_index, "SequenceMatcher", CountingMatcher)
+    index = SchemaIndex(SCHEMA_MAP, ["asteroid_name", "astronaut_name", "mission_name", "diameter"])
+    assert as_scan(index.fuzzy_matches_many(["astronot_name", "misson_name"])["misson_name"]) == [("mission_name", 20 / 21)]
+    assert sorted(compared) == ["astronautname", "missionname"]
+
+def test_short_words_one_letter_apart_still_match():
+    index = SchemaIndex(SCHEMA_MAP, ["stars", "stat", "id"])
+    assert as_scan(index.fuzzy_matches("star")) == [("stars", 8 / 9)]
+    assert index.fuzzy_matches("is") == []
+
+def test_ties_keep_the_term_order():
+    index = SchemaIndex(SCHEMA_MAP, ["mass_b", "mass_a"])
+    assert [term for term, _ in as_scan(index.fuzzy_matches("mass"))] == ["mass_b", "mass_a"]
+    assert as_scan(index.fuzzy_matches("mass", 0.5)) == find_fuzzy_matches("mass", ["mass_b", "mass_a"], 0.5)
+
+SMALL_SCHEMA = {
+    "db_to_tables": {"stars": ["stars", "planets"]},
+    "table_to_db": {"stars": "stars", "planets": "stars"},
+    "table_to_columns": {"stars": ["star_name", "stars"], "planets": ["mass"]},
+    "column_to_table_db": {"star_name": ("stars", "stars"), "mass": ("stars", "planets"), "stars": ("stars", "stars")},
+}
+
+def test_database_then_table_then_column():
+    index = SchemaIndex(SMALL_SCHEMA, ["stars", "planets", "star_name", "mass", "Mass"])
+    assert index.lookup("Stars").type == "database"
+    assert index.lookup("planets") == ("table", "planets", "stars", "planets")
+    assert index.lookup("star name") == ("column", "star_name", "stars", "stars")
+    assert index.entity_type("MASS") == "column"
+    assert index.lookup("comet") is None
+
+def test_index_is_rebuilt_only_after_a_schema_reload(monkeypatch):
+    index = get_schema_index()
+    assert get_schema_index() is index
+    monkeypatch.setattr(tokenizer_stanza, "_schema_version", index.version + 1)
+    assert get_schema_index() is not index
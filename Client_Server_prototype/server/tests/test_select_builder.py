@@ -0,0 +1,24 @@
+from NLP_pipeline.schema_entity_recognizer import schema_entity_recognizer
+from Query_Builder.select_builder import SelectQueryBuilder, parse_select, strip_preview_limit, build_count_query
+
+ROWS_SQL = "SELECT `name` FROM `stars_db`.`stars` WHERE `magnitude` > 20 LIMIT 5;"
+
+def test_row_selects_get_the_preview_limit():
+    entities = schema_entity_recognizer(["close_approach"])
+    builder = SelectQueryBuilder()
+    assert builder.build_query(["SELECT_ROWS"], entities, [], [], preview_limit=5) == (
+        "SELECT * FROM `asteroids_db`.`close_approach` LIMIT 5;", "asteroids_db"
+    )
+    assert builder.build_query(["COUNT_ROWS"], entities, [], [], preview_limit=5) == (
+        "SELECT COUNT(*) FROM `asteroids_db`.`close_approach`;", "asteroids_db"
+    )
+    assert builder.build_query(["SELECT_ROWS"], entities, [], [])[0] == "SELECT * FROM `asteroids_db`.`close_approach`;"
+
+def test_streaming_and_paging_see_every_row():
+    assert strip_preview_limit(ROWS_SQL) == "SELECT `name` FROM `stars_db`.`stars` WHERE `magnitude` > 20;"
+    assert strip_preview_limit("SELECT COUNT(*) FROM `stars_db`.`stars`;") == "SELECT COUNT(*) FROM `stars_db`.`stars`;"
+
+def test_count_keeps_the_filter_and_drops_the_limit():
+    assert build_count_query(ROWS_SQL) == "SELECT COUNT(*) FROM `stars_db`.`stars` WHERE `magnitude` > 20;"
+    assert build_count_query("SELECT AVG(`mass`) FROM `stars_db`.`stars`;") is None
+    assert parse_select(ROWS_SQL)["limit"] == "5"
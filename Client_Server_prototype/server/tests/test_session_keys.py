@@ -0,0 +1,41 @@
+import time
+
+import pytest
+
+from common.session_keys import SessionKeyStore, SessionKeyError
+from common.session_store import MemorySessionStore
+
+@pytest.fixture
+def keys():
+    return SessionKeyStore(MemorySessionStore(), ttl_seconds=60)
+
+def test_a_session_resolves_to_its_user_and_key(keys):
+    session_id = keys.create("ada", b"k" * 32)
+    assert keys.key_for(session_id) == ("ada", b"k" * 32)
+    with pytest.raises(SessionKeyError):
+        keys.key_for("not-a-session")
+
+def test_replayed_nonces_are_rejected(keys):
+    session_id = keys.create("ada", b"k" * 32)
+    keys.claim_nonce(session_id, b"nonce-1")
+    keys.claim_nonce(session_id, b"nonce-2")
+    with pytest.raises(SessionKeyError, match="reuse"):
+        keys.claim_nonce(session_id, b"nonce-1")
+
+def test_expired_sessions_are_dropped(keys, monkeypatch):
+    session_id = keys.create("ada", b"k" * 32)
+    later = time.time() + 120
+    monkeypatch.setattr(time, "time", lambda: later)
+    with pytest.raises(SessionKeyError, match="expired"):
+        keys.key_for(session_id)
+    with pytest.raises(SessionKeyError, match="Unknown"):
+        keys.key_for(session_id)
+
+def test_logout_drops_every_session_of_the_user(keys):
+    sessions = [keys.create("ada", b"k" * 32), keys.create("ada", b"j" * 32)]
+    other = keys.create("grace", b"g" * 32)
+    assert keys.drop_user("ada") == 2
+    for session_id in sessions:
+        with pytest.raises(SessionKeyError):
+            keys.key_for(session_id)
+    assert keys.key_for(other)[0] == "grace"
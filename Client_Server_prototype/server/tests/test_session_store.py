@@ -0,0 +1,81 @@
+import time
+
+import pytest
+
+from common import session_store
+from common.session_store import MemorySessionStore, SQLiteSessionStore, NONCE_OK, NONCE_REUSED, NONCE_EXHAUSTED
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemorySessionStore()
+    return SQLiteSessionStore(str(tmp_path / "sessions.db"))
+
+def test_login_lasts_until_logout_by_default(store, monkeypatch):
+    assert store.activate("ada")
+    assert not store.activate("ada")
+    monkeypatch.setattr(time, "time", lambda: 10 ** 12)
+    assert store.is_active("ada")
+    store.deactivate("ada")
+    assert not store.is_active("ada")
+
+def test_login_ttl_when_configured(store):
+    assert store.activate("ada", ttl_seconds=0.05)
+    assert store.is_active("ada")
+    time.sleep(0.1)
+    assert not store.is_active("ada")
+    assert store.activate("ada", ttl_seconds=0.05)
+
+def test_lockout_after_max_attempts(store):
+    assert not store.record_failure("ada", max_attempts=3, lock_seconds=60)
+    assert not store.record_failure("ada", max_attempts=3, lock_seconds=60)
+    assert store.record_failure("ada", max_attempts=3, lock_seconds=60)
+    assert 55 < store.lock_remaining("ada") <= 60
+    store.clear_failures("ada")
+    assert store.lock_remaining("ada") == 0.0
+
+def test_nonces_are_single_use_and_bounded(store):
+    store.put_session_key("sid", "ada", b"k" * 32, time.time() + 60)
+    assert store.claim_nonce("sid", b"n1", max_messages=2) == NONCE_OK
+    assert store.claim_nonce("sid", b"n1", max_messages=2) == NONCE_REUSED
+    assert store.claim_nonce("sid", b"n2", max_messages=2) == NONCE_OK
+    assert store.claim_nonce("sid", b"n3", max_messages=2) == NONCE_EXHAUSTED
+    assert store.drop_session_keys("ada") == 1
+    assert store.get_session_key("sid") is None
+
+def test_user_versions_include_bumps_for_everyone(store):
+    assert store.user_version("ada") == 0
+    store.bump_user_version("ada")
+    store.bump_user_version(session_store.ALL_USERS)
+    assert store.user_version("ada") == 2
+    assert store.user_version("bob") == 1
+
+def test_database_versions_ignore_case(store):
+    assert store.database_versions() == {}
+    store.bump_database_version("Stars_DB")
+    store.bump_database_version("stars_db")
+    assert store.database_version("STARS_DB") == 2
+    assert store.database_versions() == {"stars_db": 2}
+
+def test_sqlite_store_upgrades_not_null_login_table(tmp_path):
+    import sqlite3
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE active_logins (username TEXT PRIMARY KEY, expires_at REAL NOT NULL)")
+    conn.commit()
+    conn.close()
+    store = SQLiteSessionStore(path)
+    assert store.activate("ada")
+    assert store.is_active("ada")
+
+def test_workers_sharing_the_sqlite_file_see_each_others_state(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    worker_a, worker_b = SQLiteSessionStore(path), SQLiteSessionStore(path)
+    assert worker_a.activate("ada")
+    assert worker_b.is_active("ada")
+    assert not worker_b.activate("ada")
+    worker_b.lock("grace", 60)
+    assert worker_a.lock_remaining("grace") > 55
+    worker_a.put_session_key("sid", "ada", b"k" * 32, time.time() + 60)
+    assert worker_b.claim_nonce("sid", b"n1", max_messages=10) == NONCE_OK
+    assert worker_a.claim_nonce("sid", b"n1", max_messages=10) == NONCE_REUSED
@@ -0,0 +1,39 @@
+from common import timing
+from common.timing import StageTimer
+
+def fake_clock(monkeypatch, ticks):
+    ticks = iter(ticks)
+    monkeypatch.setattr(timing.time, "perf_counter", lambda: next(ticks))
+
+def test_repeated_stages_add_up(monkeypatch):
+    fake_clock(monkeypatch, [0.0, 0.0, 0.010, 1.0, 1.005, 2.0, 2.002, 2.5])
+    timer = StageTimer()
+    with timer.stage("commentary"):
+        pass
+    with timer.stage("commentary"):
+        pass
+    with timer.stage("tokenize", "stanza"):
+        pass
+    assert timer.as_dict() == {"commentary": 15.0, "tokenize": 2.0}
+    assert timer.server_timing_header() == 'commentary;dur=15.000, tokenize;desc="stanza";dur=2.000, total;dur=2500.000'
+
+def test_total_is_wall_time_since_the_request_started(monkeypatch):
+    # created at 0; an un-instrumented gap, then two overlapping stages
+    fake_clock(monkeypatch, [0.0, 0.100, 0.120, 0.150, 0.170, 0.200])
+    timer = StageTimer()
+    outer = timer.stage("pipeline")
+    outer.__enter__()
+    with timer.stage("tokenize"):
+        pass
+    outer.__exit__(None, None, None)
+    assert timer.as_dict() == {"tokenize": 30.0, "pipeline": 70.0}
+    assert timer.total_ms() == 200.0
+
+def test_a_failing_stage_is_still_timed():
+    timer = StageTimer()
+    try:
+        with timer.stage("verify_query"):
+            raise RuntimeError
+    except RuntimeError:
+        pass
+    assert "verify_query" in timer.as_dict()
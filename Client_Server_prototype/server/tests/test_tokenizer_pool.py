@@ -0,0 +1,122 @@
+import os
+import sys
+import time
+import asyncio
+import subprocess
+import textwrap
+
+import pytest
+
+from NLP_pipeline import tokenizer_pool
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def run_script(tmp_path, source):
+    script = tmp_path / "app_main.py"
+    script.write_text(textwrap.dedent(source))
+    env = dict(os.environ, PYTHONPATH=SERVER_DIR)
+    return subprocess.run([sys.executable, str(script)], cwd=SERVER_DIR, env=env, capture_output=True, text=True, timeout=120)
+
+def test_worker_module_imports_only_the_tokenizer(tmp_path):
+    result = run_script(tmp_path, """
+        import sys
+        from NLP_pipeline import tokenizer_worker
+        loaded = [m for m in sys.modules if m.startswith(("NLP_pipeline", "common", "Query_Builder", "query_pipeline", "main"))]
+        print(sorted(loaded))
+    """)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "['NLP_pipeline', 'NLP_pipeline.phrase_trie', 'NLP_pipeline.tokenizer_stanza', 'NLP_pipeline.tokenizer_worker']"
+
+FAKE_WORKER = """
+import os, sys, time
+from NLP_pipeline import tokenizer_worker
+
+def init_worker(cpu=None):
+    # stands in for loading stanza: held until the test opens the gate
+    while not os.path.exists(os.environ["FAKE_WORKER_GATE"]):
+        time.sleep(0.01)
+    if os.environ.get("FAKE_WORKER_FAIL"):
+        raise RuntimeError("no stanza model")
+
+tokenizer_worker.init_worker = init_worker
+tokenizer_worker.parse = lambda texts, language=None: [(os.getpid(), text.upper()) for text in texts]
+sys.exit(tokenizer_worker.main())
+"""
+
+@pytest.fixture
+def fake_workers(tmp_path, monkeypatch):
+    (tmp_path / "fake_worker.py").write_text(FAKE_WORKER)
+    gate = tmp_path / "gate"
+    monkeypatch.setenv("PYTHONPATH", str(tmp_path))
+    monkeypatch.setenv("FAKE_WORKER_GATE", str(gate))
+    monkeypatch.setattr(tokenizer_pool, "WORKER_MODULE", "fake_worker")
+    monkeypatch.setattr(tokenizer_pool, "TOKENIZER_WORKERS", 2)
+    monkeypatch.setattr(tokenizer_pool, "lemma_cache", None)
+    yield gate
+    tokenizer_pool.shutdown()
+
+def test_pool_is_ready_only_after_every_worker_warmed_up(fake_workers):
+    tokenizer_pool.start()
+    time.sleep(0.5)
+    assert not tokenizer_pool.is_ready()
+
+    fake_workers.touch()
+    pids = {warmup.result(timeout=60) for warmup in tokenizer_pool._pool.warmups}
+    assert len(pids) == 2
+    assert tokenizer_pool.is_ready()
+    assert tokenizer_pool.init_error() is None
+
+    parsed = asyncio.run(tokenizer_pool.parse_texts(["show stars", "count planets", "list moons"]))
+    assert [lemmas for _, lemmas in parsed] == ["SHOW STARS", "COUNT PLANETS", "LIST MOONS"]
+    assert {pid for pid, _ in parsed} <= pids
+
+def test_failed_warm_up_breaks_the_pool_instead_of_hanging(fake_workers, monkeypatch):
+    monkeypatch.setenv("FAKE_WORKER_FAIL", "1")
+    fake_workers.touch()
+    tokenizer_pool.start()
+    for warmup in tokenizer_pool._pool.warmups:
+        with pytest.raises(RuntimeError, match="no stanza model"):
+            warmup.result(timeout=60)
+    assert not tokenizer_pool.is_ready()
+    assert "no stanza model" in tokenizer_pool.init_error()
+    with pytest.raises(RuntimeError, match="broken"):
+        asyncio.run(tokenizer_pool.parse_texts(["show stars"]))
+
+def test_workers_do_not_rerun_the_app_module(tmp_path):
+    (tmp_path / "fake_worker.py").write_text(FAKE_WORKER)
+    (tmp_path / "gate").touch()
+    marker = tmp_path / "imports.log"
+    result = run_script(tmp_path, f"""
+        import os
+        os.environ["FAKE_WORKER_GATE"] = {str(tmp_path / "gate")!r}
+        os.environ["PYTHONPATH"] = {str(tmp_path)!r}
+        from NLP_pipeline import tokenizer_pool
+
+        # stands in for main.py building the app at import time
+        with open({str(marker)!r}, "a") as f:
+            f.write(__name__ + "\\n")
+
+        if __name__ == "__main__":
+            tokenizer_pool.WORKER_MODULE = "fake_worker"
+            tokenizer_pool.TOKENIZER_WORKERS = 2
+            tokenizer_pool.lemma_cache = None
+            tokenizer_pool.start()
+            print(len({{w.result(timeout=60) for w in tokenizer_pool._pool.warmups}}))
+            tokenizer_pool.shutdown()
+    """)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split()[-1] == "2"
+    assert marker.read_text().split() == ["__main__"]
+
+def test_batched_items_get_one_parse_per_language(monkeypatch):
+    calls = []
+
+    async def fake_parse_texts(texts, language=None):
+        calls.append((language, list(texts)))
+        return [(f"{language}:{text}", None) for text in texts]
+
+    monkeypatch.setattr(tokenizer_pool, "parse_texts", fake_parse_texts)
+    items = [("show stars", "en"), ("taare dikhao", "hi"), ("count planets", "en")]
+    results = asyncio.run(tokenizer_pool._parse_batched_items(items))
+    assert [pos_tags for pos_tags, _ in results] == ["en:show stars", "hi:taare dikhao", "en:count planets"]
+    assert sorted(calls) == [("en", ["show stars", "count planets"]), ("hi", ["taare dikhao"])]
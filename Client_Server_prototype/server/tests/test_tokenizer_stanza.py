@@ -0,0 +1,60 @@
+import os
+import sys
+import time
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from NLP_pipeline import tokenizer_stanza
+from NLP_pipeline.tokenizer_stanza import PipelinePool
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_importing_the_tokenizer_loads_no_models():
+    source = (
+        "import sys\n"
+        "from NLP_pipeline import tokenizer_stanza\n"
+        "print(sorted(m for m in ('stanza', 'torch', 'nltk') if m in sys.modules), tokenizer_stanza.is_ready())\n"
+    )
+    result = subprocess.run([sys.executable, "-c", source], cwd=SERVER_DIR, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "[] False"
+
+@pytest.fixture
+def fake_models(monkeypatch):
+    """Pipelines are plain objects; en and hi take 600MB each"""
+    builds = []
+
+    def fake_get_pipeline(language):
+        builds.append(language)
+        time.sleep(0.05)
+        return f"pipeline:{language}"
+
+    monkeypatch.setattr(tokenizer_stanza, "get_pipeline", fake_get_pipeline)
+    monkeypatch.setattr(tokenizer_stanza, "verify_artifacts", lambda language: [])
+    monkeypatch.setattr(tokenizer_stanza, "_model_size_mb", lambda language: 600.0)
+    return builds
+
+def test_least_recently_used_pipeline_is_evicted_over_budget(fake_models):
+    pool = PipelinePool(budget_mb=1300)
+    pool.get("en")
+    pool.get("hi")
+    pool.get("en")
+    pool.get("fr")
+    assert pool.stats()["loaded"] == ["en", "fr"]
+    assert pool.evictions == 1
+    assert pool.get("en").pipeline == "pipeline:en"
+    assert fake_models == ["en", "hi", "fr"]
+
+def test_a_language_is_built_once_under_concurrent_use(fake_models):
+    pool = PipelinePool(budget_mb=2000)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        entries = list(executor.map(pool.get, ["en", "hi"] * 8))
+    assert sorted(fake_models) == ["en", "hi"]
+    assert {id(entry) for entry in entries[::2]} == {id(entries[0])}
+
+def test_missing_models_are_reported(monkeypatch):
+    monkeypatch.setattr(tokenizer_stanza, "verify_artifacts", lambda language: ["stanza models for 'xx'"])
+    with pytest.raises(RuntimeError, match="stanza models for 'xx'"):
+        PipelinePool().get("xx")
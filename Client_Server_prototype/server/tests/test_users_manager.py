@@ -0,0 +1,75 @@
+import pytest
+
+pytest.importorskip("mysql.connector")
+
+from Query_Builder import users_manager
+from common.session_store import SQLiteSessionStore
+
+class FakeUsersTable:
+    """Stands in for the MySQL users table; counts how often it is queried"""
+    def __init__(self, rows):
+        self.rows = rows
+        self.lookups = 0
+
+    def connect(self):
+        table = self
+
+        class Cursor:
+            def execute(self, sql, params):
+                table.lookups += 1
+                self.row = table.rows.get(params[0])
+
+            def fetchone(self):
+                return dict(self.row) if self.row else None
+
+            def close(self):
+                pass
+
+        class Connection:
+            def cursor(self, dictionary=False):
+                return Cursor()
+
+            def is_connected(self):
+                return True
+
+            def close(self):
+                pass
+
+        return Connection()
+
+@pytest.fixture
+def users(monkeypatch, tmp_path):
+    table = FakeUsersTable({"ada": {"username": "ada", "password": "pw", "role": "science"}})
+    monkeypatch.setattr(users_manager, "get_db_connection", table.connect)
+    monkeypatch.setattr(users_manager, "_version_store", None)
+    users_manager.invalidate_user()
+    yield table
+    users_manager.invalidate_user()
+
+def test_cached_user_skips_mysql(users):
+    assert users_manager.get_user("ada", "pw")["role"] == "science"
+    assert users_manager.get_user("ada", "pw")["role"] == "science"
+    assert users.lookups == 1
+    assert users_manager.get_user("ada", "wrong") is None
+    assert users.lookups == 2
+
+def test_invalidation_in_another_worker_evicts_cached_role(users, tmp_path):
+    path = str(tmp_path / "sessions.db")
+    users_manager.share_invalidations(SQLiteSessionStore(path))
+    assert users_manager.get_user("ada", "pw")["role"] == "science"
+
+    # another worker changes the role and bumps the shared counter through its own connection
+    users.rows["ada"]["role"] = "missions"
+    SQLiteSessionStore(path).bump_user_version("ada")
+
+    assert users_manager.get_user("ada", "pw")["role"] == "missions"
+    assert users.lookups == 2
+
+def test_invalidating_everyone_reaches_every_user(users, tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"))
+    users_manager.share_invalidations(store)
+    users_manager.get_user("ada", "pw")
+    users_manager.invalidate_user()
+    users_manager.get_user("ada", "pw")
+    assert users.lookups == 2
+    assert store.user_version("ada") == 1